@@ -0,0 +1,296 @@
+import io
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, NamedTuple, TextIO
+import computorv2
+from computorv2 import Interpreter
+from lexer import ExpressionError, tokenize
+
+BARRIER_COMMANDS: set[str] = {'variables', 'import', 'export', 'mode', 'reactive', 'cache', 'profile', 'time', 'save', 'load', 'table', 'precision', 'budget'}
+# commands only reading the function and the bounds they are given
+READING_COMMANDS: set[str] = {'roots', 'extrema'}
+KEYWORDS: set[str] = {'step'}
+FUNCTION_PATTERN: re.Pattern[str] = re.compile(r'\s*([a-zA-Z]+)\(([a-zA-Z0-9]+)\)\s*')
+ERROR_PATTERN: re.Pattern[str] = re.compile(r'^(\s*Error )\d+(:)', re.MULTILINE)
+
+
+class LineEffects(NamedTuple):
+	"""
+		The names a script line reads and writes.
+
+		Attributes:
+			reads (frozenset[str]): Variables and functions whose value the line uses.
+			writes (frozenset[str]): Variables and functions the line assigns.
+			barrier (bool): True when the line is a command touching the whole session or files, like 'variables'.
+	"""
+	reads: frozenset[str]
+	writes: frozenset[str]
+	barrier: bool
+
+
+class LineResult(NamedTuple):
+	line_number: int
+	output: str
+	errors: str
+
+
+def names_in(expression: str) -> set[str]:
+	"""
+		Lists the variable and function names an expression mentions.
+
+		Args:
+			expression (str): The expression to scan.
+
+		Returns:
+			set[str]: The lowercased names, or an empty set if the expression cannot be tokenized.
+	"""
+	try:
+		return {token.value for token in tokenize(expression) if token.kind == 'name'} - KEYWORDS
+	except ExpressionError:
+		return set()
+
+
+def analyze_line(user_input: str) -> LineEffects:
+	"""
+		Statically computes what a line reads and writes, following the same
+		'=' splitting as process_variable_assignment.
+
+		Args:
+			user_input (str): The line to analyze.
+
+		Returns:
+			LineEffects: The names the line reads and writes.
+	"""
+	if user_input.split()[:1] in ([command] for command in BARRIER_COMMANDS):
+		return LineEffects(frozenset(), frozenset(), True)
+	if user_input.split()[:1] in ([command] for command in READING_COMMANDS) and '=' not in user_input:
+		return LineEffects(frozenset(names_in(' '.join(user_input.split()[1:4]))), frozenset(), False)
+	parts: list[str] = user_input.strip().split('=')
+	if len(parts) == 1 or parts[-1].strip() == '?':
+		return LineEffects(frozenset(names_in(parts[0])), frozenset(), False)
+
+	function: re.Match[str] | None = FUNCTION_PATTERN.fullmatch(parts[0])
+	if len(parts) == 2 and function:
+		name: str = function.group(1).lower()
+		body: str = parts[1].strip()
+		if body.endswith('?'):
+			return LineEffects(frozenset(names_in(body[:-1]) | {name}), frozenset(), False)
+		return LineEffects(frozenset(names_in(body) - {function.group(2).lower()}), frozenset({name}), False)
+
+	targets: set[str] = {part.strip().lower() for part in parts[:-1]}
+	return LineEffects(frozenset(names_in(parts[-1])), frozenset(targets), False)
+
+
+def group_lines(lines: list[tuple[int, str]], effects: list[LineEffects]) -> list[list[tuple[int, str]]]:
+	"""
+		Splits lines into independent groups: two lines end up in the same group
+		when a chain of shared names links them, which covers every read-after-write,
+		write-after-read and write-after-write edge of the dependency DAG.
+
+		Args:
+			lines (list[tuple[int, str]]): The numbered lines, in script order.
+			effects (list[LineEffects]): The effects of each line.
+
+		Returns:
+			list[list[tuple[int, str]]]: The groups, each in script order.
+	"""
+	parents: dict[str, str] = {}
+
+	def find(name: str) -> str:
+		root: str = parents.setdefault(name, name)
+		while root != parents[root]:
+			root = parents[root]
+		while name != root:
+			parents[name], name = root, parents[name]
+		return root
+
+	for effect in effects:
+		names: list[str] = sorted(effect.reads | effect.writes)
+		for name in names[1:]:
+			parents[find(name)] = find(names[0])
+
+	groups: dict[str, list[tuple[int, str]]] = {}
+	for line, effect in zip(lines, effects):
+		names = sorted(effect.reads | effect.writes)
+		key: str = find(names[0]) if names else f'#{line[0]}'
+		groups.setdefault(key, []).append(line)
+	return list(groups.values())
+
+
+def export_state(interpreter: Interpreter, names: Iterable[str]) -> dict[str, Any]:
+	"""
+		Collects the values and function definitions bound to the given names,
+		along with everything the exported functions read or call.
+
+		Args:
+			interpreter (Interpreter): The session to export from.
+			names (Iterable[str]): The names to export.
+
+		Returns:
+			dict[str, Any]: The exported variables, function definitions, number mode, precision and budget.
+	"""
+	state: dict[str, Any] = {'variables': {}, 'functions': {}, 'mode': interpreter.number_mode, 'precision': interpreter.precision,
+		'budget': interpreter.budget}
+	pending: list[str] = list(names)
+	seen: set[str] = set()
+	while pending:
+		name: str = pending.pop()
+		if name in seen:
+			continue
+		seen.add(name)
+		if name in interpreter.variables:
+			state['variables'][name] = interpreter.variables[name]
+		if name in interpreter.functions:
+			definition = interpreter.functions.definitions[name]
+			state['functions'][name] = (definition.parameter, definition.body)
+			pending.extend(names_in(definition.body) - {definition.parameter})
+	return state
+
+
+def import_state(interpreter: Interpreter, state: dict[str, Any]) -> None:
+	"""
+		Installs exported variables, function definitions, number mode, precision and budget in a session.
+
+		Args:
+			interpreter (Interpreter): The session to import into.
+			state (dict[str, Any]): State produced by export_state.
+	"""
+	interpreter.precision = state['precision']
+	interpreter.budget = state['budget']
+	if state['mode'] != interpreter.number_mode:
+		interpreter.set_number_mode(state['mode'])
+	for name, value in state['variables'].items():
+		interpreter.assign_variable(name, value)
+	for name, (parameter, body) in state['functions'].items():
+		interpreter.functions.define(name, parameter, body)
+
+
+def run_lines(interpreter: Interpreter, lines: list[tuple[int, str]]) -> list[LineResult]:
+	"""
+		Runs lines in order, capturing the output and errors of each one.
+
+		Args:
+			interpreter (Interpreter): The session to run the lines in.
+			lines (list[tuple[int, str]]): The numbered lines to run.
+
+		Returns:
+			list[LineResult]: The captured output of every line.
+	"""
+	results: list[LineResult] = []
+	streams: tuple[TextIO | None, TextIO | None] = (interpreter.output, interpreter.errors)
+	try:
+		for line_number, user_input in lines:
+			interpreter.output, interpreter.errors = io.StringIO(), io.StringIO()
+			interpreter.current_line = line_number
+			interpreter.process_variable_assignment(user_input)
+			results.append(LineResult(line_number, interpreter.output.getvalue(), interpreter.errors.getvalue()))
+	finally:
+		interpreter.output, interpreter.errors = streams
+		interpreter.current_line = None
+	return results
+
+
+def run_group(lines: list[tuple[int, str]], state: dict[str, Any], writes: set[str]) -> tuple[list[LineResult], dict[str, Any]]:
+	"""
+		Worker entry point: runs a group of lines in a fresh namespace.
+
+		Args:
+			lines (list[tuple[int, str]]): The numbered lines of the group.
+			state (dict[str, Any]): The values the group reads from earlier segments.
+			writes (set[str]): The names the group assigns, sent back to the parent.
+
+		Returns:
+			tuple[list[LineResult], dict[str, Any]]: The captured output of every line and the state the group produced.
+	"""
+	interpreter: Interpreter = Interpreter()
+	import_state(interpreter, state)
+	results: list[LineResult] = run_lines(interpreter, lines)
+	return results, export_state(interpreter, writes)
+
+
+def run_parallel(lines: Iterable[str], jobs: int, output: io.TextIOBase = sys.stdout, interpreter: Interpreter | None = None) -> None:
+	"""
+		Runs a script with independent groups of lines evaluated on a process pool.
+		Output and errors are written in script order, and error indexes follow
+		script order as they would in a serial run.
+
+		The script is cut into segments at barrier lines. In each segment, lines are
+		grouped by the names they share, groups are spread over the workers, and the
+		names they assign are merged back before the barrier line runs. In reactive
+		mode a change can reach any variable of the session, so segments run in order
+		in the parent process.
+
+		Args:
+			lines (Iterable[str]): The lines of the script.
+			jobs (int): The number of worker processes.
+			output (io.TextIOBase): Where results are written.
+			interpreter (Interpreter | None): The session the script runs in, the default session when None.
+	"""
+	interpreter = interpreter or computorv2.default
+	numbered: list[tuple[int, str]] = []
+	for line_number, line in enumerate(lines, 1):
+		user_input: str = line.rstrip('\n')
+		if user_input.strip() in ['exit', 'quit']:
+			break
+		if user_input.strip():
+			numbered.append((line_number, user_input))
+
+	error_count: int = 0
+
+	def renumber(match: re.Match[str]) -> str:
+		nonlocal error_count
+		error_count += 1
+		return f'{match.group(1)}{error_count - 1}{match.group(2)}'
+
+	def write(results: list[LineResult]) -> None:
+		for result in sorted(results):
+			output.write(result.output)
+			if result.errors:
+				output.flush()
+				sys.stderr.write(ERROR_PATTERN.sub(renumber, result.errors))
+
+	with ProcessPoolExecutor(max_workers=jobs) as executor:
+		start: int = 0
+		while start < len(numbered):
+			effects: list[LineEffects] = []
+			end: int = start
+			while end < len(numbered):
+				effect: LineEffects = analyze_line(numbered[end][1])
+				if effect.barrier:
+					break
+				effects.append(effect)
+				end += 1
+
+			if interpreter.reactive:
+				write(run_lines(interpreter, numbered[start:end]))
+			else:
+				line_effects: dict[int, LineEffects] = {line[0]: effect for line, effect in zip(numbered[start:end], effects)}
+				buckets: list[list[tuple[int, str]]] = [[] for _ in range(jobs)]
+				for group in sorted(group_lines(numbered[start:end], effects), key=len, reverse=True):
+					min(buckets, key=len).extend(group)
+				futures = []
+				for bucket in buckets:
+					if bucket:
+						bucket.sort()
+						reads: set[str] = set().union(*(line_effects[line_number].reads for line_number, _ in bucket))
+						writes: set[str] = set().union(*(line_effects[line_number].writes for line_number, _ in bucket))
+						futures.append(executor.submit(run_group, bucket, export_state(interpreter, reads), writes))
+				results: list[LineResult] = []
+				existing: set[str] = set(interpreter.variables)
+				for future in futures:
+					group_results, state = future.result()
+					results.extend(group_results)
+					import_state(interpreter, state)
+				first_writes: dict[str, int] = {}
+				for line_number in sorted(line_effects, reverse=True):
+					first_writes.update(dict.fromkeys(line_effects[line_number].writes, line_number))
+				ordered: list[tuple[str, Any]] = sorted(interpreter.variables.items(), key=lambda item: 0 if item[0] in existing else first_writes.get(item[0], 0))
+				interpreter.variables.clear()
+				interpreter.variables.update(ordered)
+				write(results)
+
+			if end < len(numbered):
+				write(run_lines(interpreter, [numbered[end]]))
+			start = end + 1
+	output.flush()
@@ -0,0 +1,101 @@
+"""
+	Microbenchmark of numeric literal classification, the check every input line
+	goes through before it is dispatched.
+
+	'before' is the previous exception-driven check (try int(), then float(),
+	then parse the line again to get its value); 'after' is lexer.read_number,
+	which classifies and converts the literal in one regular expression match.
+
+	Usage: python benchmarks/numeric_literals.py [-n LINES] [-r REPEAT]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from expression import ExpressionError, evaluate, parse_expression
+from lexer import read_number
+
+SAMPLES: list[str] = ['42', '-7', '3.25', '  12 ', '1e3', '.5', 'x', 'a + 1', '2 * x ^ 2', '[[1,2];[3,4]]', 'f(3)', '4x', '1..2', '12abc', '?', '3 +']
+
+
+def is_integer(string: str) -> bool:
+	try:
+		int(string)
+		return True
+	except ValueError:
+		return False
+
+
+def is_float(string: str) -> bool:
+	try:
+		float(string)
+		return True
+	except ValueError:
+		return False
+
+
+def classify_before(line: str) -> Any:
+	if is_integer(line) or is_float(line):
+		try:
+			return evaluate(parse_expression(line), {})
+		except ExpressionError:
+			return None
+	return None
+
+
+def classify_after(line: str) -> Any:
+	return read_number(line)
+
+
+def workload(size: int, seed: int = 0) -> list[str]:
+	"""
+		Generates input lines, about two thirds of which are not numeric literals.
+
+		Args:
+			size (int): The number of lines.
+			seed (int): The random seed, fixed so runs are comparable.
+
+		Returns:
+			list[str]: The lines.
+	"""
+	generator = random.Random(seed)
+	return [generator.choice(SAMPLES) for _ in range(size)]
+
+
+def measure(classify: Callable[[str], Any], lines: list[str], repeat: int) -> float:
+	"""
+		Returns the best time per line over several runs.
+
+		Args:
+			classify (Callable[[str], Any]): The classification to time.
+			lines (list[str]): The input lines.
+			repeat (int): The number of runs.
+
+		Returns:
+			float: The time per line, in nanoseconds.
+	"""
+	best: float = min(timeit.repeat(lambda: [classify(line) for line in lines], number=1, repeat=repeat))
+	return best / len(lines) * 1e9
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('-n', '--lines', type=int, default=100000, help='number of generated lines')
+	parser.add_argument('-r', '--repeat', type=int, default=5, help='runs per implementation, the best one is reported')
+	arguments = parser.parse_args()
+
+	lines: list[str] = workload(arguments.lines)
+	before: float = measure(classify_before, lines, arguments.repeat)
+	after: float = measure(classify_after, lines, arguments.repeat)
+	print(f'before: {before:8.1f} ns/line')
+	print(f'after:  {after:8.1f} ns/line')
+	print(f'speedup: {before / after:.2f}x')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,161 @@
+"""
+	Startup-time benchmark: launches the interpreter on short scripts, the way
+	shell pipelines do, and reports the wall time of a whole launch.
+
+	Each script runs a number of times in a fresh process and the median and best
+	times are reported. Numpy and the polynomial solver load on first use, so the
+	'scalar' script should stay close to 'empty' while 'matrix' and 'solve' pay
+	for what they import. The modules loaded by each script are checked as well.
+
+	Usage:
+		python benchmarks/startup.py                           run every script
+		python benchmarks/startup.py -n 50 -k scalar           more launches, only the scripts whose name contains a pattern
+		python benchmarks/startup.py --save startup.json       save the results as a baseline
+		python benchmarks/startup.py --compare startup.json    compare with a baseline, exit 1 on a regression
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import NamedTuple
+
+ROOT: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+REGRESSION_THRESHOLD: float = 0.15
+
+# script name -> (lines, heavy modules the script should import)
+SCRIPTS: dict[str, tuple[list[str], set[str]]] = {
+	'empty': ([], set()),
+	'scalar': (['a = 2', 'b = a * 3 + 1', 'f(x) = x ^ 2 + b', 'f(4)', 'b / 2 = ?'], set()),
+	'matrix': (['m = [[1,2];[3,4]]', 'm ** m'], {'numpy'}),
+	'solve': (['f(x) = x ^ 2 - 2 * x + 1', 'f(x) = 0 ?'], {'computorv1'}),
+}
+HEAVY_MODULES: set[str] = {'numpy', 'computorv1', 'session', 'batch'}
+# prints the heavy modules a launch imported, once the script has run
+PROBE: str = (
+	'import sys, runpy\n'
+	'sys.argv = ["run.py", "-f", sys.argv[1]]\n'
+	'runpy.run_path("run.py", run_name="__main__")\n'
+	'print(" ".join(sorted(name for name in {modules!r} if name in sys.modules)), file=sys.stderr)\n'
+)
+
+
+class Result(NamedTuple):
+	median_ms: float
+	best_ms: float
+	modules: list[str]
+
+
+def launch(path: str, environment: dict[str, str]) -> float:
+	start: float = time.perf_counter()
+	subprocess.run([sys.executable, 'run.py', '-f', path], cwd=ROOT, env=environment, stdout=subprocess.DEVNULL, check=True)
+	return time.perf_counter() - start
+
+
+def loaded_modules(path: str, environment: dict[str, str]) -> list[str]:
+	"""
+		Runs a script once and lists the heavy modules it actually loaded.
+
+		Args:
+			path (str): The script to run.
+			environment (dict[str, str]): The environment of the launch.
+
+		Returns:
+			list[str]: The names of the loaded heavy modules, sorted.
+	"""
+	probe: subprocess.CompletedProcess[str] = subprocess.run(
+		[sys.executable, '-c', PROBE.format(modules=HEAVY_MODULES), path],
+		cwd=ROOT, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+	)
+	return probe.stderr.split()
+
+
+def measure(lines: list[str], launches: int, environment: dict[str, str]) -> Result:
+	"""
+		Times the launches of the interpreter on a script, after a first launch that
+		warms the bytecode and file system caches.
+
+		Args:
+			lines (list[str]): The lines of the script.
+			launches (int): The number of timed launches.
+			environment (dict[str, str]): The environment of the launches.
+
+		Returns:
+			Result: The median and best launch times, and the heavy modules loaded.
+	"""
+	with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as script:
+		script.write(''.join(f'{line}\n' for line in lines))
+	try:
+		launch(script.name, environment)
+		times: list[float] = [launch(script.name, environment) for _ in range(launches)]
+		return Result(statistics.median(times) * 1e3, min(times) * 1e3, loaded_modules(script.name, environment))
+	finally:
+		os.unlink(script.name)
+
+
+def compare(results: dict[str, Result], baseline: dict[str, dict[str, float]], threshold: float) -> bool:
+	"""
+		Prints each script next to its baseline and flags the ones that got slower.
+
+		Args:
+			results (dict[str, Result]): The current results.
+			baseline (dict[str, dict[str, float]]): The saved results.
+			threshold (float): The relative slowdown of the median counted as a regression.
+
+		Returns:
+			bool: True when no script regressed.
+	"""
+	passed: bool = True
+	for name, result in results.items():
+		if name not in baseline:
+			print(f'{name:<10}{result.median_ms:>10.1f} ms   (no baseline)')
+			continue
+		before: float = baseline[name]['median_ms']
+		change: float = result.median_ms / before - 1
+		regressed: bool = change > threshold
+		passed = passed and not regressed
+		print(f'{name:<10}{before:>10.1f} ms ->{result.median_ms:>8.1f} ms{change:>+9.1%}{"   REGRESSION" if regressed else ""}')
+	return passed
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description='Startup-time benchmark of the interpreter.')
+	parser.add_argument('-n', '--launches', type=int, default=20, help='timed launches per script, the median is reported')
+	parser.add_argument('-k', dest='patterns', metavar='PATTERN', action='append', help='only run the scripts whose name contains PATTERN')
+	parser.add_argument('--save', metavar='FILE', help='save the results as a JSON baseline')
+	parser.add_argument('--compare', metavar='FILE', help='compare with a JSON baseline and exit with status 1 on a regression')
+	parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='relative slowdown counted as a regression')
+	arguments = parser.parse_args()
+
+	# launches from a shell reuse the cached bytecode, so let the warm-up launch write it
+	environment: dict[str, str] = {name: value for name, value in os.environ.items() if name != 'PYTHONDONTWRITEBYTECODE'}
+	results: dict[str, Result] = {}
+	unexpected: list[str] = []
+	for name, (lines, expected) in SCRIPTS.items():
+		if arguments.patterns and not any(pattern in name for pattern in arguments.patterns):
+			continue
+		result: Result = measure(lines, arguments.launches, environment)
+		results[name] = result
+		if set(result.modules) - expected:
+			unexpected.append(f'{name}: {", ".join(sorted(set(result.modules) - expected))}')
+		if not arguments.compare:
+			print(f'{name:<10}{result.median_ms:>10.1f} ms median{result.best_ms:>10.1f} ms best   loaded: {", ".join(result.modules) or "-"}', flush=True)
+
+	if arguments.save:
+		with open(arguments.save, 'w') as output:
+			json.dump({'python': sys.version.split()[0], 'results': {name: result._asdict() for name, result in results.items()}}, output, indent='\t')
+	passed: bool = True
+	if arguments.compare:
+		with open(arguments.compare) as baseline:
+			passed = compare(results, json.load(baseline)['results'], arguments.threshold)
+	for line in unexpected:
+		print(f'unexpected imports in {line}', file=sys.stderr)
+	if not passed or unexpected:
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,360 @@
+"""
+	Benchmark suite covering every evaluation path of the interpreter.
+
+	Each benchmark generates its workload from a fixed seed, runs it several
+	times and reports the best throughput in lines per second, then runs it once
+	more under tracemalloc to report its peak memory. Results can be saved as a
+	baseline and compared with a later run.
+
+	Usage:
+		python benchmarks/suite.py                           run everything
+		python benchmarks/suite.py -k matrix -k function     run the benchmarks whose name contains a pattern
+		python benchmarks/suite.py --save baseline.json      save the results as a baseline
+		python benchmarks/suite.py --compare baseline.json   compare with a baseline, exit 1 on a regression
+"""
+import argparse
+import atexit
+import io
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, Callable, NamedTuple
+import numpy
+
+ROOT: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import computorv1
+import computorv2
+import run
+from expression import _parse_normalized
+from matrix import Matrix
+
+SEED: int = 42
+REGRESSION_THRESHOLD: float = 0.1
+LETTERS: str = 'abcdefghjklmnopqrstuvwxyz'
+
+# a workload factory takes a seeded generator and a size scale, and returns the
+# number of lines it processes and the function processing them
+Workload = Callable[[random.Random, float], tuple[int, Callable[[], None]]]
+
+
+class Result(NamedTuple):
+	"""
+		The measurements of one benchmark.
+
+		Attributes:
+			lines (int): The number of lines the workload processes.
+			lines_per_second (float): The best throughput over the timed runs.
+			peak_memory (int): The peak traced memory of one run, in bytes.
+	"""
+	lines: int
+	lines_per_second: float
+	peak_memory: int
+
+
+def reset_session() -> None:
+	"""
+		Gives the interpreter a fresh session and empties the parse cache, so every run starts cold.
+	"""
+	computorv2.default.reset()
+	_parse_normalized.cache_clear()
+
+
+def scaled(size: int, scale: float) -> int:
+	return max(1, int(size * scale))
+
+
+def names(count: int) -> list[str]:
+	"""
+		Generates distinct variable names. Names may only contain letters, and the
+		letter 'i' is left out since 'i' alone is the imaginary unit.
+
+		Args:
+			count (int): The number of names.
+
+		Returns:
+			list[str]: The names 'a', ..., 'z', 'ba', 'bb', ...
+	"""
+	result: list[str] = []
+	for index in range(count):
+		name: str = ''
+		while True:
+			name = LETTERS[index % len(LETTERS)] + name
+			index //= len(LETTERS)
+			if not index:
+				break
+		result.append(name)
+	return result
+
+
+def for_each(function: Callable[[Any], Any], items: list[Any]) -> Callable[[], None]:
+	def process() -> None:
+		for item in items:
+			function(item)
+	return process
+
+
+def run_lines(lines: list[str]) -> Callable[[], None]:
+	return for_each(computorv2.process_variable_assignment, lines)
+
+
+def operator_chain(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	lines: list[str] = []
+	for _ in range(scaled(2000, scale)):
+		terms: list[str] = [str(generator.randint(1, 99)) for _ in range(100)]
+		lines.append(''.join(term + f' {generator.choice("+-*")} ' for term in terms[:-1]) + terms[-1])
+	return len(lines), for_each(computorv2.handle_operator, lines)
+
+
+def nested_parentheses(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	lines: list[str] = []
+	for _ in range(scaled(2000, scale)):
+		expression: str = str(generator.randint(1, 99))
+		for _ in range(40):
+			expression = f'({expression} {generator.choice("+-*")} {generator.randint(1, 99)})'
+		lines.append(expression)
+	return len(lines), for_each(computorv2.handle_operator, lines)
+
+
+def complex_numbers(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	lines: list[str] = [f'{generator.randint(1, 99)} + {generator.randint(1, 99)}i * {generator.randint(1, 9)} - {generator.randint(1, 99)}i' for _ in range(scaled(5000, scale))]
+	return len(lines), for_each(computorv2.handle_operator, lines)
+
+
+def matrix_product(size: int, count: int) -> Workload:
+	def workload(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+		numpy_generator = numpy.random.default_rng(generator.randint(0, 1 << 30))
+		left = Matrix(numpy_generator.random((size, size)))
+		right = Matrix(numpy_generator.random((size, size)))
+
+		def process() -> None:
+			computorv2.assign_variable('a', left)
+			computorv2.assign_variable('b', right)
+			for _ in range(lines):
+				computorv2.process_variable_assignment('c = a ** b')
+
+		lines: int = scaled(count, scale)
+		return lines, process
+	return workload
+
+
+def function_define(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	lines: list[str] = [f'{name}(x) = {generator.randint(1, 9)} * x ^ 2 + (x + {generator.randint(1, 9)}) ^ 3 - {generator.randint(1, 9)} * x' for name in names(scaled(2000, scale))]
+	return len(lines), run_lines(lines)
+
+
+def function_call(hot: bool) -> Workload:
+	def workload(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+		arguments: list[int] = [generator.randint(0, 9) if hot else generator.randint(0, 1 << 20) for _ in range(scaled(5000, scale))]
+		lines: list[str] = ['f(x) = 3 * x ^ 3 - 2 * x ^ 2 + x / 4 + a', *(f'f({argument})' for argument in arguments)]
+		return len(lines), run_lines(['a = 2', *lines])
+	return workload
+
+
+def reduced_form(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	equations: list[str] = []
+	for _ in range(scaled(5000, scale)):
+		left: str = ' + '.join(f'{generator.randint(1, 9)} * X^{exponent}' for exponent in range(3))
+		equations.append(f'{left} = {generator.randint(1, 9)} * X^1 - {generator.randint(1, 9)} * X^0')
+	return len(equations), for_each(computorv1.reduced_form, equations)
+
+
+def solve_polynomial(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	equations: list[tuple[str, dict[int, float]]] = []
+	for index in range(scaled(2000, scale)):
+		degree: int = 1 + index % 5
+		coefficients: dict[int, float] = {exponent: float(generator.randint(-9, 9) or 1) for exponent in range(degree + 1)}
+		equations.append((computorv1.format_reduced_form(coefficients), coefficients))
+	return len(equations), for_each(lambda equation: computorv1.solve_polynomial(*equation), equations)
+
+
+def session_script(generator: random.Random, size: int) -> list[str]:
+	"""
+		Generates a mixed session: assignments, expressions, functions, equations,
+		matrices, complex numbers and a share of invalid lines.
+
+		Args:
+			generator (random.Random): The seeded generator.
+			size (int): The number of lines.
+
+		Returns:
+			list[str]: The script lines.
+	"""
+	variables: list[str] = names(50)
+	templates: list[Callable[[], str]] = [
+		lambda: f'{generator.choice(variables)} = {generator.randint(1, 99)} * {generator.choice(variables)} + {generator.randint(1, 99)}',
+		lambda: f'{generator.choice(variables)} + {generator.randint(1, 99)} / ({generator.choice(variables)} + 1)',
+		lambda: f'f(x) = {generator.randint(1, 9)} * x ^ 2 + {generator.randint(1, 9)} * x',
+		lambda: f'f({generator.randint(0, 20)})',
+		lambda: f'f(x) = {generator.randint(1, 9)} ?',
+		lambda: f'm = [[{generator.randint(1, 9)},{generator.randint(1, 9)}];[{generator.randint(1, 9)},{generator.randint(1, 9)}]] ** [[1,0];[0,1]]',
+		lambda: f'z = {generator.randint(1, 9)} + {generator.randint(1, 9)}i',
+		lambda: f'{generator.randint(1, 9)} $ {generator.choice(variables)}',
+	]
+	return [generator.choice(templates)() for _ in range(size)]
+
+
+def end_to_end(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	script: str = '\n'.join(session_script(generator, scaled(5000, scale))) + '\n'
+
+	def process() -> None:
+		handler = signal.getsignal(signal.SIGINT)
+		stdin = sys.stdin
+		sys.stdin = io.StringIO(script)
+		try:
+			run.main()
+		except SystemExit:
+			pass
+		finally:
+			sys.stdin = stdin
+			signal.signal(signal.SIGINT, handler)
+
+	return script.count('\n'), process
+
+
+def end_to_end_batch(generator: random.Random, scale: float) -> tuple[int, Callable[[], None]]:
+	lines: list[str] = session_script(generator, scaled(5000, scale))
+	descriptor, path = tempfile.mkstemp(suffix='.txt')
+	with os.fdopen(descriptor, 'w') as script:
+		script.write('\n'.join(lines) + '\n')
+	atexit.register(os.remove, path)
+	return len(lines), lambda: run.run_batch(path)
+
+
+BENCHMARKS: dict[str, Workload] = {
+	'operator_chain': operator_chain,
+	'nested_parentheses': nested_parentheses,
+	'complex_numbers': complex_numbers,
+	'matrix_product_8': matrix_product(8, 5000),
+	'matrix_product_64': matrix_product(64, 1000),
+	'matrix_product_256': matrix_product(256, 50),
+	'function_define': function_define,
+	'function_call': function_call(hot=False),
+	'function_call_hot': function_call(hot=True),
+	'reduced_form': reduced_form,
+	'solve_polynomial': solve_polynomial,
+	'end_to_end': end_to_end,
+	'end_to_end_batch': end_to_end_batch,
+}
+
+
+def measure(workload: Workload, scale: float, repeat: int) -> Result:
+	"""
+		Times a workload and measures its peak memory, each run on a fresh session
+		with output discarded.
+
+		Args:
+			workload (Workload): The workload factory.
+			scale (float): The size scale.
+			repeat (int): The number of timed runs.
+
+		Returns:
+			Result: The measurements.
+	"""
+	best: float = float('inf')
+	with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+		for _ in range(repeat):
+			reset_session()
+			lines, process = workload(random.Random(SEED), scale)
+			start: float = time.perf_counter()
+			process()
+			best = min(best, time.perf_counter() - start)
+
+		reset_session()
+		lines, process = workload(random.Random(SEED), scale)
+		tracemalloc.start()
+		try:
+			process()
+			peak_memory: int = tracemalloc.get_traced_memory()[1]
+		finally:
+			tracemalloc.stop()
+	return Result(lines, lines / best, peak_memory)
+
+
+def environment() -> dict[str, Any]:
+	try:
+		commit: str = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+	except OSError:
+		commit = ''
+	return {'commit': commit, 'python': platform.python_version(), 'machine': platform.machine()}
+
+
+def compare(results: dict[str, Result], baseline: dict[str, Any], threshold: float) -> bool:
+	"""
+		Prints the change of every benchmark against a baseline.
+
+		Args:
+			results (dict[str, Result]): The current results.
+			baseline (dict[str, Any]): A baseline saved with --save.
+			threshold (float): The relative throughput loss reported as a regression.
+
+		Returns:
+			bool: True if no benchmark regressed beyond the threshold.
+	"""
+	print(f'baseline: commit {baseline["environment"]["commit"] or "?"}, Python {baseline["environment"]["python"]}')
+	print(f'{"benchmark":<22}{"lines/s":>14}{"baseline":>14}{"change":>9}{"peak memory":>14}{"baseline":>12}')
+	passed: bool = True
+	for name, result in results.items():
+		saved: dict[str, Any] | None = baseline['results'].get(name)
+		if saved is None:
+			print(f'{name:<22}{result.lines_per_second:>14,.0f}{"-":>14}{"":>9}{format_bytes(result.peak_memory):>14}{"-":>12}')
+			continue
+		change: float = result.lines_per_second / saved['lines_per_second'] - 1
+		regressed: bool = change < -threshold
+		passed = passed and not regressed
+		print(f'{name:<22}{result.lines_per_second:>14,.0f}{saved["lines_per_second"]:>14,.0f}{change:>+8.1%}{"!" if regressed else " "}'
+			f'{format_bytes(result.peak_memory):>13}{format_bytes(saved["peak_memory"]):>12}')
+	return passed
+
+
+def format_bytes(size: int) -> str:
+	for unit in ['B', 'KiB', 'MiB']:
+		if size < 1024:
+			return f'{size:.0f} {unit}'
+		size /= 1024
+	return f'{size:.1f} GiB'
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description='Benchmark suite covering every evaluation path of the interpreter.')
+	parser.add_argument('-k', dest='patterns', metavar='PATTERN', action='append', help='only run the benchmarks whose name contains PATTERN')
+	parser.add_argument('-r', '--repeat', type=int, default=3, help='timed runs per benchmark, the best one is reported')
+	parser.add_argument('-s', '--scale', type=float, default=1.0, help='multiply the size of every workload')
+	parser.add_argument('--save', metavar='FILE', help='save the results as a JSON baseline')
+	parser.add_argument('--compare', metavar='FILE', help='compare with a JSON baseline and exit with status 1 on a regression')
+	parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='relative throughput loss counted as a regression')
+	parser.add_argument('-l', '--list', action='store_true', help='list the benchmarks and exit')
+	arguments = parser.parse_args()
+
+	selected: list[str] = [name for name in BENCHMARKS if not arguments.patterns or any(pattern in name for pattern in arguments.patterns)]
+	if arguments.list:
+		print('\n'.join(selected))
+		return
+
+	results: dict[str, Result] = {}
+	for name in selected:
+		results[name] = measure(BENCHMARKS[name], arguments.scale, arguments.repeat)
+		if not arguments.compare:
+			result: Result = results[name]
+			print(f'{name:<22}{result.lines:>8} lines{result.lines_per_second:>14,.0f} lines/s{format_bytes(result.peak_memory):>12} peak', flush=True)
+
+	if arguments.save:
+		with open(arguments.save, 'w') as output:
+			json.dump({'environment': environment(), 'scale': arguments.scale, 'results': {name: result._asdict() for name, result in results.items()}}, output, indent='\t')
+	if arguments.compare:
+		with open(arguments.compare) as baseline:
+			if not compare(results, json.load(baseline), arguments.threshold):
+				sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,278 @@
+from __future__ import annotations
+import math
+import operator
+import os
+import sys
+import time
+from contextvars import ContextVar
+from fractions import Fraction
+from typing import Any, Callable, NamedTuple
+from matrix import Matrix, matrix_product
+from utils import lazy_import
+
+multiprocessing = lazy_import('multiprocessing')
+resource = lazy_import('resource')
+
+DEFAULT_SECONDS: float = 10.0
+DEFAULT_MEMORY: int = 1 << 30
+# past these estimates an operation runs in a worker that can be stopped
+INLINE_BITS: int = 1 << 18
+INLINE_OPERATIONS: int = 1 << 30
+# the same for operations looping in Python, like the products of exact polynomials
+INLINE_STEPS: int = 1 << 22
+# cost of a matrix product step on entries that are Python objects, like fractions, against floats
+OBJECT_COST: int = 100
+EXACT_TYPES: frozenset[type] = frozenset({int, Fraction})
+# address space a worker may map besides its result and the copy sent back, for thread stacks and library buffers
+WORKER_SLACK: int = 1 << 28
+
+
+class BudgetExceeded(Exception):
+	"""
+		Raised when a line would go over its time or memory budget.
+	"""
+
+
+class Budget(NamedTuple):
+	"""
+		The limits a line is evaluated under.
+
+		Attributes:
+			seconds (float | None): The time a line may take, None for no limit.
+			memory (int | None): The size in bytes of a value a line may build, None for no limit.
+	"""
+	seconds: float | None = DEFAULT_SECONDS
+	memory: int | None = DEFAULT_MEMORY
+
+
+# the budget of the line being evaluated in this thread, with its deadline
+current: ContextVar[tuple[Budget, float | None] | None] = ContextVar('budget', default=None)
+
+
+def active() -> bool:
+	return current.get() is not None
+
+
+class enforce:
+	"""
+		Evaluates the enclosed line under a budget, the time budget counting from the
+		start of the line.
+
+		Args:
+			budget (Budget): The limits of the line.
+	"""
+	__slots__ = ('state', 'token')
+
+	def __init__(self, budget: Budget) -> None:
+		self.state: tuple[Budget, float | None] = (budget, None if budget.seconds is None else time.monotonic() + budget.seconds)
+
+	def __enter__(self) -> None:
+		self.token = current.set(self.state)
+
+	def __exit__(self, *exception: Any) -> None:
+		current.reset(self.token)
+
+
+def format_size(size: int) -> str:
+	for unit in ('bytes', 'KiB', 'MiB', 'GiB'):
+		if size < 1024 or unit == 'GiB':
+			return f'{size} {unit}' if unit == 'bytes' else f'{size:.4g} {unit}'
+		size /= 1024
+	return ''
+
+
+def exact_bits(value: int | Fraction) -> int:
+	if isinstance(value, Fraction):
+		return value.numerator.bit_length() + value.denominator.bit_length()
+	return value.bit_length()
+
+
+def check(size: int) -> None:
+	"""
+		Rejects a value before it is built when it would be larger than the memory budget.
+
+		Args:
+			size (int): The estimated size of the value in bytes.
+
+		Raises:
+			BudgetExceeded: If the size is over the budget.
+	"""
+	state: tuple[Budget, float | None] | None = current.get()
+	if state is not None and state[0].memory is not None and size > state[0].memory:
+		raise BudgetExceeded(f'the result would take about {format_size(size)}, more than the memory budget of {format_size(state[0].memory)}')
+
+
+def check_digits(value: Any) -> Any:
+	"""
+		Rejects an integer or a fraction with more digits than Python turns into text,
+		so a result that could never be printed is not kept.
+
+		Args:
+			value (Any): The result of a line.
+
+		Returns:
+			Any: The value itself.
+
+		Raises:
+			BudgetExceeded: If the value has too many digits.
+	"""
+	limit: int = getattr(sys, 'get_int_max_str_digits', lambda: 0)()
+	if not limit or type(value) not in EXACT_TYPES:
+		return value
+	for part in (value.numerator, value.denominator) if type(value) is Fraction else (value,):
+		# an upper bound of the digits first, the exact comparison only near the limit
+		if int(part.bit_length() * math.log10(2)) + 1 > limit and abs(part) >= 10 ** limit:
+			raise BudgetExceeded(f'the result has about {int(part.bit_length() * math.log10(2)) + 1} digits, more than the {limit} that can be printed')
+	return value
+
+
+def guarded(function: Callable[..., Any], args: tuple[Any, ...], size: int, heavy: bool) -> Any:
+	"""
+		Runs an operation whose result size was estimated. The size is checked against
+		the memory budget first; a heavy operation then runs in a forked worker that
+		is killed when the time left to the line runs out.
+
+		Args:
+			function (Callable[..., Any]): The operation.
+			args (tuple[Any, ...]): Its operands.
+			size (int): The estimated size of the result in bytes.
+			heavy (bool): Whether the operation may take long enough to need a worker.
+
+		Returns:
+			Any: The result of the operation.
+
+		Raises:
+			BudgetExceeded: If the line goes over its budget.
+	"""
+	state: tuple[Budget, float | None] | None = current.get()
+	if state is None:
+		return function(*args)
+	budget, deadline = state
+	check(size)
+	if deadline is None:
+		return function(*args)
+	remaining: float = deadline - time.monotonic()
+	if remaining <= 0:
+		raise BudgetExceeded(f'the line took more than its time budget of {budget.seconds:g} s')
+	if heavy and hasattr(os, 'fork'):
+		return run_in_worker(function, args, remaining, budget)
+	return function(*args)
+
+
+def work(connection: Any, function: Callable[..., Any], args: tuple[Any, ...], memory: int | None) -> None:
+	# the worker is the guard of the operation, the operations nested in it run inline
+	current.set(None)
+	if memory is not None:
+		try:
+			# the address space already mapped, plus the result, its serialized copy and some slack
+			with open('/proc/self/statm') as statm:
+				mapped: int = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+			limit: int = mapped + 2 * memory + WORKER_SLACK
+			resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+		except (OSError, ValueError, ImportError):
+			pass
+	try:
+		connection.send((True, function(*args)))
+	except BaseException as error:
+		connection.send((False, error))
+
+
+def run_in_worker(function: Callable[..., Any], args: tuple[Any, ...], seconds: float, budget: Budget) -> Any:
+	"""
+		Runs an operation in a forked copy of the process, which shares the operands
+		without copying them and sends the result back, and kills it once the time is up.
+
+		Args:
+			function (Callable[..., Any]): The operation.
+			args (tuple[Any, ...]): Its operands.
+			seconds (float): The time the operation may take.
+			budget (Budget): The budget of the line, whose memory limit also binds the worker.
+
+		Returns:
+			Any: The result of the operation.
+
+		Raises:
+			BudgetExceeded: If the worker runs out of time or memory.
+	"""
+	context = multiprocessing.get_context('fork')
+	reader, writer = context.Pipe(duplex=False)
+	process = context.Process(target=work, args=(writer, function, args, budget.memory), daemon=True)
+	process.start()
+	writer.close()
+	try:
+		if not reader.poll(seconds):
+			raise BudgetExceeded(f'the line took more than its time budget of {budget.seconds:g} s')
+		try:
+			succeeded, result = reader.recv()
+		except EOFError:
+			raise BudgetExceeded('the evaluation was stopped before it finished') from None
+	finally:
+		reader.close()
+		process.kill()
+		process.join()
+	if not succeeded:
+		if isinstance(result, MemoryError):
+			raise BudgetExceeded(f'the evaluation ran out of its memory budget of {format_size(budget.memory)}')
+		raise result
+	return result
+
+
+def power(base: Any, exponent: Any) -> Any:
+	"""
+		'^' with the size of exact results estimated first: an integer or a fraction
+		raised to an integer grows by the number of bits of the base at every step.
+		Floats, decimals and complex numbers keep a bounded size.
+
+		Args:
+			base (Any): The base.
+			exponent (Any): The exponent.
+
+		Returns:
+			Any: base raised to exponent.
+	"""
+	# exact mode reads the exponent as a fraction; a negative power of an integer is a float
+	count: Any = exponent.numerator if type(exponent) is Fraction and exponent.denominator == 1 else exponent
+	if type(count) is int and type(base) in EXACT_TYPES and (count > 0 or type(base) is Fraction) and exact_bits(base) * abs(count) > INLINE_BITS:
+		parts: tuple[int, ...] = (base.numerator, base.denominator) if type(base) is Fraction else (base,)
+		bits: float = sum(math.log2(abs(part)) for part in parts if part) * abs(count)
+		if bits > INLINE_BITS:
+			return guarded(operator.pow, (base, exponent), int(bits // 8), True)
+	return base ** exponent
+
+
+def multiply(left: Any, right: Any) -> Any:
+	"""
+		'*' with the size of products of large integers or fractions estimated first.
+
+		Args:
+			left (Any): The left operand.
+			right (Any): The right operand.
+
+		Returns:
+			Any: The product.
+	"""
+	if type(left) in EXACT_TYPES and type(right) in EXACT_TYPES:
+		bits: int = exact_bits(left) + exact_bits(right)
+		if bits > INLINE_BITS:
+			return guarded(operator.mul, (left, right), bits // 8, True)
+	return left * right
+
+
+def product(left: Any, right: Any) -> Any:
+	"""
+		'**' with the size of matrix products estimated from the dimensions first.
+
+		Args:
+			left (Any): The left matrix.
+			right (Any): The right matrix.
+
+		Returns:
+			Any: The matrix product.
+	"""
+	if isinstance(left, Matrix) and isinstance(right, Matrix) and left.shape[1] == right.shape[0]:
+		rows, inner = left.shape
+		columns: int = right.shape[1]
+		itemsize: int = max(left.array.itemsize, right.array.itemsize)
+		operations: int = rows * inner * columns * (OBJECT_COST if left.array.dtype.hasobject or right.array.dtype.hasobject else 1)
+		return guarded(matrix_product, (left, right), rows * columns * itemsize, operations > INLINE_OPERATIONS)
+	return matrix_product(left, right)
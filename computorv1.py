@@ -1,39 +1,50 @@
+from __future__ import annotations
+import decimal
+import profiling
 import re
-import sys
+from decimal import Decimal
+from fractions import Fraction
+from typing import Iterable, Iterator, NamedTuple, TextIO
+from lexer import NUMBER
 from utils import *
 
-terms: dict[int, float]
+numpy = lazy_import('numpy')
+print = profiling.timed('output', print)
 
-def extract_terms(expression: str) -> dict[int, float]:
+NEWTON_STEPS: int = 3
+GUARD_DIGITS: int = 10
+CHUNK_SIZE: int = 1 << 16
+TERM_PATTERN: re.Pattern[str] = re.compile(rf'(-?)(?:(?:({NUMBER})\*)?X(?:\^(\d+))?|({NUMBER}))')
+
+def extract_terms(expression: str, exact: bool = False) -> dict[int, float]:
 	"""
 		Parses a polynomial expression and returns a dictionary of terms.
 
 		Args:
 			expression (str): Polynomial expression with terms.
+			exact (bool): Read coefficients as exact rationals instead of floats.
 		
 		Returns:
 			dict: Dictionary where keys are exponents and values are aggregated coefficients.
+
+		Raises:
+			ValueError: If a term is not a valid polynomial term.
 	"""
 	expression = expression.replace(' ', '')
 	terms: dict[int, float] = {}
 
 	for term in expression.replace('-', '+-').split('+'):
 		if term:
-			if 'X' in term:
-				if '*' not in term:
-					term = '-1*' + term.replace('-', '') if term[0] == '-' else '1*' + term
-				if '^' not in term:
-					term += '^1'
-			elif is_integer(term) or is_float(term):
-				term += '*X^0'
-			else:
-				sys.exit("Error: enter a valid Polynomial equation!")
-
-			coef_str: str
-			exp_str: str
-			coef_str, exp_str = term.split('*X^')
-			coef: float = float(coef_str)
-			exp: int = int(exp_str)
+			match: re.Match[str] | None = TERM_PATTERN.fullmatch(term)
+			if not match:
+				raise ValueError('enter a valid Polynomial equation!')
+			sign, coef_str, exp_str, constant = match.groups()
+			if constant is not None:
+				coef_str, exp_str = constant, '0'
+			coef: float = Fraction(coef_str or '1') if exact else float(coef_str or '1')
+			if sign:
+				coef = -coef
+			exp: int = int(exp_str or '1')
 
 			if exp in terms:
 				terms[exp] += coef
@@ -41,15 +52,31 @@ def extract_terms(expression: str) -> dict[int, float]:
 				terms[exp] = coef
 	return terms
 
-def reduced_form(equation: str) -> str:
+class Solution(NamedTuple):
 	"""
-		Reduces a polynomial equation to its reduced form.
+		The roots of one equation solved by solve_equations.
+
+		Attributes:
+			index (int): The position of the equation in the input.
+			degree (int): The degree of the reduced polynomial.
+			roots (numpy.ndarray): The complex roots, with multiplicity; empty for degree 0.
+			every_number (bool): True when the equation reduces to 0 = 0.
+	"""
+	index: int
+	degree: int
+	roots: numpy.ndarray
+	every_number: bool
+
+def parse_equation(equation: str, exact: bool = False) -> dict[int, float]:
+	"""
+		Moves every term of a polynomial equation to the left side.
 
 		Args:
 			equation (str): Polynomial equation
+			exact (bool): Keep coefficients as exact rationals instead of floats.
 
 		Returns:
-			str: The reduced polynomial equation with terms combined.
+			dict[int, float]: The coefficients of the reduced polynomial, by exponent.
 	"""
 	left_side: str
 	right_side: str
@@ -58,19 +85,31 @@ def reduced_form(equation: str) -> str:
 	left_side = left_side.strip()
 	right_side = right_side.strip()
 
-	left_terms: dict[int, float] = extract_terms(left_side)
-	right_terms: dict[int, float] = extract_terms(right_side)
+	left_terms: dict[int, float] = extract_terms(left_side, exact)
+	right_terms: dict[int, float] = extract_terms(right_side, exact)
 
 	for exp in right_terms:
 		if exp in left_terms:
 			left_terms[exp] -= right_terms[exp]
 		else:
 			left_terms[exp] = -right_terms[exp]
+	return left_terms
+
+@profiling.stage('format')
+def format_reduced_form(left_terms: dict[int, float]) -> str:
+	"""
+		Formats reduced polynomial coefficients as an equation.
 
+		Args:
+			left_terms (dict[int, float]): The coefficients, by exponent.
+
+		Returns:
+			str: The reduced polynomial equation.
+	"""
 	reduced: list[str] = []
 	for exp in sorted(left_terms, reverse=True):
 		coef: float = left_terms[exp]
-		coef_str: int | float = int(absolute(coef)) if coef.is_integer() else absolute(coef)
+		coef_str: int | float = simplify_number(absolute(coef))
 		term: str
 		if coef not in {1, -1}:
 			if exp not in {1, 0}:
@@ -94,59 +133,271 @@ def reduced_form(equation: str) -> str:
 		reduced.append(term)
 
 	reduced_result = ' '.join(reduced)
-	global terms
-	terms = dict(left_terms)
 	return f"{reduced_result} = 0"
 
-def solve_polynomial(equation: str):
+def reduced_form(equation: str, exact: bool = False) -> str:
+	"""
+		Reduces a polynomial equation to its reduced form.
+
+		Args:
+			equation (str): Polynomial equation
+			exact (bool): Keep coefficients as exact rationals instead of floats.
+
+		Returns:
+			str: The reduced polynomial equation with terms combined.
+	"""
+	return format_reduced_form(parse_equation(equation, exact))
+
+def evaluate_polynomials(polynomials: numpy.ndarray, points: numpy.ndarray) -> numpy.ndarray:
+	"""
+		Evaluates many polynomials at once with Horner's rule.
+
+		Args:
+			polynomials (numpy.ndarray): One polynomial per row, highest degree first.
+			points (numpy.ndarray): The points at which to evaluate each polynomial, one row per polynomial.
+
+		Returns:
+			numpy.ndarray: The values, shaped like points.
+	"""
+	value: numpy.ndarray = numpy.zeros_like(points)
+	for column in polynomials.T:
+		value = value * points + column[:, None]
+	return value
+
+def batch_roots(polynomials: numpy.ndarray) -> numpy.ndarray:
+	"""
+		Computes every complex root of many polynomials of the same degree as the
+		eigenvalues of their stacked companion matrices, then polishes them with a
+		few Newton steps.
+
+		Args:
+			polynomials (numpy.ndarray): One polynomial per row, highest degree first, with non-zero leading coefficients.
+
+		Returns:
+			numpy.ndarray: The roots, one row of degree-many roots per polynomial, repeated roots included.
+	"""
+	polynomials = polynomials.astype(complex)
+	count, degree = polynomials.shape[0], polynomials.shape[1] - 1
+	companion: numpy.ndarray = numpy.zeros((count, degree, degree), dtype=complex)
+	companion[:, 1:, :-1] = numpy.eye(degree - 1)
+	companion[:, :, -1] = -polynomials[:, :0:-1] / polynomials[:, :1]
+	roots: numpy.ndarray = numpy.linalg.eigvals(companion)
+
+	derivatives: numpy.ndarray = polynomials[:, :-1] * numpy.arange(degree, 0, -1)
+	for _ in range(NEWTON_STEPS):
+		value: numpy.ndarray = evaluate_polynomials(polynomials, roots)
+		slope: numpy.ndarray = evaluate_polynomials(derivatives, roots)
+		candidates: numpy.ndarray = roots - numpy.divide(value, slope, out=numpy.zeros_like(value), where=slope != 0)
+		roots = numpy.where(numpy.abs(evaluate_polynomials(polynomials, candidates)) < numpy.abs(value), candidates, roots)
+	return roots
+
+def quadratic_roots(polynomials: numpy.ndarray) -> numpy.ndarray:
+	"""
+		Solves many quadratics in one vectorized pass, using the cancellation-free
+		form q = -(b + sign(b)√Δ) / 2, x₁ = q / a, x₂ = c / q.
+
+		Args:
+			polynomials (numpy.ndarray): One (a, b, c) row per equation, a non-zero.
+
+		Returns:
+			numpy.ndarray: Two complex roots per row.
+	"""
+	a, b, c = polynomials.T.astype(complex)
+	root: numpy.ndarray = numpy.sqrt(b * b - 4 * a * c)
+	q: numpy.ndarray = -0.5 * (b + numpy.where((b.conjugate() * root).real < 0, -root, root))
+	safe_q: numpy.ndarray = numpy.where(q == 0, 1, q)
+	return numpy.stack([numpy.where(q == 0, 0, q / a), numpy.where(q == 0, 0, c / safe_q)], axis=1)
+
+def polynomial_roots(coefficients: dict[int, float]) -> numpy.ndarray:
+	"""
+		Computes every complex root of a polynomial of any degree.
+
+		Args:
+			coefficients (dict[int, float]): The polynomial, exponent to coefficient, with a non-zero leading coefficient.
+
+		Returns:
+			numpy.ndarray: The degree-many roots, repeated roots included.
+	"""
+	degree: int = max_key(coefficients.keys())
+	return batch_roots(numpy.array([[complex(coefficients.get(exp, 0)) for exp in range(degree, -1, -1)]]))[0]
+
+def solve_group(indices: list[int], rows: numpy.ndarray) -> list[Solution]:
+	"""
+		Solves equations that share a degree.
+
+		Args:
+			indices (list[int]): The input positions of the equations.
+			rows (numpy.ndarray): One polynomial per row, highest degree first, with non-zero leading coefficients.
+
+		Returns:
+			list[Solution]: The solution of every equation.
+	"""
+	degree: int = rows.shape[1] - 1
+	if degree == 0:
+		empty: numpy.ndarray = numpy.empty(0, dtype=complex)
+		return [Solution(index, 0, empty, bool(row[0] == 0)) for index, row in zip(indices, rows)]
+	elif degree == 1:
+		roots: numpy.ndarray = (-rows[:, 1] / rows[:, 0]).astype(complex)[:, None]
+	elif degree == 2:
+		roots = quadratic_roots(rows)
+	else:
+		roots = batch_roots(rows)
+	return [Solution(index, degree, row_roots, False) for index, row_roots in zip(indices, roots)]
+
+def solve_equations(equations: Iterable[str] | numpy.ndarray, chunk_size: int = CHUNK_SIZE) -> Iterator[Solution]:
+	"""
+		Solves many polynomial equations, streaming the solutions in input order.
+
+		The input is read a chunk at a time. Inside a chunk, equations are grouped by
+		degree and each group is solved in one vectorized pass: closed forms for
+		degrees 1 and 2, stacked companion matrices above. Nothing is printed and no
+		module state is touched, so calls can run concurrently.
+
+		Args:
+			equations (Iterable[str] | numpy.ndarray): Equation strings such as '5 * X^0 + 4 * X^1 = 0',
+				or a coefficient matrix with one equation per row, column k holding the coefficient of X^k.
+			chunk_size (int): The number of equations solved together.
+
+		Returns:
+			Iterator[Solution]: The solutions, in input order.
+
+		Raises:
+			ValueError: If an equation string is not a valid polynomial equation.
+	"""
+	if isinstance(equations, numpy.ndarray):
+		matrix: numpy.ndarray = numpy.atleast_2d(equations).astype(float)
+		for start in range(0, len(matrix), chunk_size):
+			yield from solve_chunk(start, matrix[start:start + chunk_size])
+		return
+
+	chunk: list[dict[int, float]] = []
+	start = 0
+	for equation in equations:
+		chunk.append(parse_equation(equation))
+		if len(chunk) == chunk_size:
+			yield from solve_chunk(start, coefficient_matrix(chunk))
+			start += len(chunk)
+			chunk = []
+	if chunk:
+		yield from solve_chunk(start, coefficient_matrix(chunk))
+
+def coefficient_matrix(polynomials: list[dict[int, float]]) -> numpy.ndarray:
+	"""
+		Packs coefficient dictionaries into a matrix, column k holding the coefficient of X^k.
+
+		Args:
+			polynomials (list[dict[int, float]]): The coefficients of each polynomial, by exponent.
+
+		Returns:
+			numpy.ndarray: One row per polynomial, padded with zeros.
+	"""
+	matrix: numpy.ndarray = numpy.zeros((len(polynomials), max(max_key(coefficients.keys()) for coefficients in polynomials) + 1))
+	for row, coefficients in zip(matrix, polynomials):
+		for exp, coef in coefficients.items():
+			row[exp] = coef
+	return matrix
+
+def solve_chunk(start: int, matrix: numpy.ndarray) -> list[Solution]:
+	"""
+		Solves a chunk of reduced polynomials, grouped by degree.
+
+		Args:
+			start (int): The input position of the first polynomial.
+			matrix (numpy.ndarray): One polynomial per row, column k holding the coefficient of X^k.
+
+		Returns:
+			list[Solution]: The solutions, in input order.
+	"""
+	nonzero: numpy.ndarray = matrix != 0
+	degrees: numpy.ndarray = numpy.where(nonzero.any(axis=1), matrix.shape[1] - 1 - numpy.argmax(nonzero[:, ::-1], axis=1), 0)
+	solutions: list[Solution] = [None] * len(matrix)
+	for degree in numpy.unique(degrees):
+		positions: numpy.ndarray = numpy.flatnonzero(degrees == degree)
+		for solution in solve_group((start + positions).tolist(), matrix[positions, degree::-1]):
+			solutions[solution.index - start] = solution
+	return solutions
+
+def format_root(root: complex) -> str:
+	"""
+		Formats a root rounded to 6 digits, as a real number when its imaginary part vanishes.
+
+		Args:
+			root (complex): The root to format.
+
+		Returns:
+			str: 'a', 'a + bi' or 'a - bi'.
+	"""
+	real: int | float = simplify_number(round(root.real, 6) + 0.0)
+	imaginary: int | float = simplify_number(round(root.imag, 6) + 0.0)
+	if imaginary == 0:
+		return f'{real}'
+	return f'{real} {"-" if imaginary < 0 else "+"} {absolute(imaginary)}i'
+
+@profiling.stage('solve')
+def solve_polynomial(equation: str, coefficients: dict[int, float] | None = None, file: TextIO | None = None):
 	"""
-		Solve a polynomial equation od degree 2 or below
+		Solve a polynomial equation of any degree. Degrees 2 and below are solved
+		with the usual formulas, higher degrees numerically.
 
 		Args:
 			equation (str): the polynomial equation to solve
+			coefficients (dict[int, float] | None): its reduced coefficients, by exponent;
+				parsed from the equation when omitted
+			file (TextIO | None): where the solutions are printed, standard output when None
 	"""
-	polynomial_degree: int = max_key(terms.keys()) if terms.keys() else 0
-	print(f'   Polynomial degree: {polynomial_degree}')
+	if coefficients is None:
+		coefficients = parse_equation(equation)
+	nonzero_terms: dict[int, float] = {exp: coef for exp, coef in coefficients.items() if coef != 0}
+	polynomial_degree: int = max_key(nonzero_terms.keys()) if nonzero_terms else 0
+	print(f'   Polynomial degree: {polynomial_degree}', file=file)
 	
 	if polynomial_degree > 2:
-		sys.exit('   The polynomial degree is strictly greater than 2, I can\'t solve.')
+		roots: list[str] = [format_root(root) for root in sorted(polynomial_roots(nonzero_terms), key=lambda root: (round(root.real, 6), root.imag))]
+		print(f'   The {polynomial_degree} solutions, with multiplicity, are:', file=file)
+		for root in roots:
+			print(f'   {root}', file=file)
+		return
 
 	if polynomial_degree == 0:
-		result: int | float = terms.get(0, 0)
+		result: int | float = nonzero_terms.get(0, 0)
 		if result == 0:
-			print('   Any real number is a solution.')
+			print('   Any real number is a solution.', file=file)
 		else:
-			print('   There is no solution.')
+			print('   There is no solution.', file=file)
 	elif polynomial_degree == 1:
-		const_term: float = terms.get(0, 0)
-		coef: float = terms.get(1, 0)
+		const_term: float = nonzero_terms.get(0, 0)
+		coef: float = nonzero_terms.get(1, 0)
 
 		if coef == 0:
 			if const_term == 0:
-				print('   Any real number is a solution.')
+				print('   Any real number is a solution.', file=file)
 			else:
-				print('   There is no solution.')
+				print('   There is no solution.', file=file)
 		else:
 			result = -const_term / coef
-			result = int(result) if result.is_integer() else result
-			print(f'   The solution is:\n   {result}')
+			result = simplify_number(result)
+			print(f'   The solution is:\n   {result}', file=file)
 	elif polynomial_degree == 2:
-		if 1 not in terms:
-			terms[1] = 0
-		elif 0 not in terms:
-			terms[0] = 0
-		delta: int | float = (terms[1] ** 2) - (4 * terms[2] * terms[0])
+		quadratic: dict[int, float] = {0: 0, 1: 0, **nonzero_terms}
+		delta: int | float = (quadratic[1] ** 2) - (4 * quadratic[2] * quadratic[0])
 		if delta < 0:
-			print('   Discriminant is strictly negative, there is two complex solutions:')
-			print(f'   α + β * i = (-2b + i√|Δ|) / 2a = ({-terms[1]} + i√|{delta}|) / {2 * terms[2]}')
-			print(f'   α - β * i = (-2b - i√|Δ|) / 2a = ({-terms[1]} - i√|{delta}|) / {2 * terms[2]}')
+			print('   Discriminant is strictly negative, there is two complex solutions:', file=file)
+			print(f'   α + β * i = (-2b + i√|Δ|) / 2a = ({-quadratic[1]} + i√|{delta}|) / {2 * quadratic[2]}', file=file)
+			print(f'   α - β * i = (-2b - i√|Δ|) / 2a = ({-quadratic[1]} - i√|{delta}|) / {2 * quadratic[2]}', file=file)
 		elif delta == 0:
-			result = -terms[1] / (2 * terms[2])
-			result = int(result) if result.is_integer() else result
-			print(f'   Discriminant is equal to zero, there is exactly one real solution:\n   {result}')
+			result = -quadratic[1] / (2 * quadratic[2])
+			result = simplify_number(result)
+			print(f'   Discriminant is equal to zero, there is exactly one real solution:\n   {result}', file=file)
 		else:
-			result_1 = (-terms[1] - square_root(delta)) / (2 * terms[2])
-			result_1 = int(result_1) if result_1.is_integer() else result_1
-			result_2 = (-terms[1] + square_root(delta)) / (2 * terms[2])
-			result_2 = int(result_2) if result_2.is_integer() else result_2
-			print(f'   Discriminant is strictly positive, the two solutions are:\n   {round(result_1, 6)}\n   {round(result_2, 6)}')
+			with decimal.localcontext() as context:
+				# decimal roots are carried with guard digits and rounded once, like c ^ 0.5
+				context.prec += GUARD_DIGITS
+				root: float | Fraction | Decimal = exact_square_root(delta) if isinstance(delta, Fraction) else square_root(delta)
+				result_1 = (-quadratic[1] - root) / (2 * quadratic[2])
+				result_2 = (-quadratic[1] + root) / (2 * quadratic[2])
+			if isinstance(root, Decimal):
+				result_1, result_2 = +result_1, +result_2
+			result_1, result_2 = simplify_number(result_1), simplify_number(result_2)
+			if isinstance(root, float):
+				result_1, result_2 = round(result_1, 6), round(result_2, 6)
+			print(f'   Discriminant is strictly positive, the two solutions are:\n   {result_1}\n   {result_2}', file=file)
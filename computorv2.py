@@ -1,520 +1,862 @@
 import sys
 import re
-from typing import Any, Match
+import atexit
+import decimal
+import profiling
+import budget
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Callable, Iterable, TextIO
 from utils import *
-import numpy
-import json
-from computorv1 import reduced_form, solve_polynomial
-
-variables: dict[str, Any] = {}
-error_index: int = 0
-
-
-def print_error_message(error_message: str) -> None:
+from expression import DEFAULT_PRECISION, NUMBER_MODES, ExpressionError, Node, array_errors, evaluate, parse_expression
+from functions import FunctionDefinition, FunctionTable
+from lexer import read_number
+from matrix import PRINT_THRESHOLD, Matrix, format_row, load_matrix, save_matrix
+from polynomial import Polynomial, expand
+from reactive import DependencyGraph, Formula
+
+# the polynomial solver, the snapshot format, function sampling and numpy are only needed by some commands
+computorv1 = lazy_import('computorv1')
+session = lazy_import('session')
+sampling = lazy_import('sampling')
+numpy = lazy_import('numpy')
+
+# the stages of a profiled line, see profiling.timed
+evaluate = profiling.timed('evaluate', evaluate)
+expand = profiling.timed('solve', expand)
+print = profiling.timed('output', print)
+
+WORD_PATTERN: re.Pattern[str] = re.compile(r'\b[a-z]+\b')
+FUNCTION_CALL_PATTERN: re.Pattern[str] = re.compile(r'([a-zA-Z]+)\(([a-zA-Z0-9]+)\)')
+IMPLICIT_PRODUCT_PATTERN: re.Pattern[str] = re.compile(r'([0-9]+)([a-zA-Z][a-zA-Z0-9]*)')
+MAX_PRECISION: int = 1_000_000
+IMAGINARY_PATTERN: re.Pattern[str] = re.compile(r'(?<![a-zA-Z])[iI](?![a-zA-Z])')
+DECIMAL_COMPLEX_ERROR: str = 'complex numbers are not supported in decimal mode'
+
+
+@profiling.stage('format')
+def format_value(value: Any) -> str:
 	"""
-		Prints an error message to standard error and increments the global error index.
+		Formats an evaluation result for printing. Complex numbers are only turned
+		into text here, with 'i' as the imaginary unit.
 
 		Args:
-			error_message (str): The error message to be displayed.
+			value (Any): A number, a matrix, or an array produced by vectorized evaluation.
 
 		Returns:
-			None
+			str: The printable form of the value, continuation lines indented for the REPL output.
 	"""
-	global error_index
-	print(error_message, file=sys.stderr)
-	error_index += 1
+	if isinstance(value, complex):
+		return format_complex(value)
+	elif getattr(value, 'ndim', None) == 1:
+		# the points of a range, printed like a matrix row
+		return format_row(value, elide=value.size > PRINT_THRESHOLD)
+	return str(value).replace('\n', '\n   ')
 
 
-def extract_complex_numbers(expression: str) -> str | bool :
+def convert_scalar(value: Any, mode: str) -> Any:
 	"""
-		Extracts and formats complex numbers from a given string expression.
+		Converts a stored real number to the number type of a mode, so numbers kept
+		from before a mode switch mix with the new literals: Decimal arithmetic does
+		not accept floats or fractions.
 
 		Args:
-			expression (str): A string containing a mathematical expression with complex numbers.
+			value (Any): The stored value.
+			mode (str): The new number mode.
 
 		Returns:
-			str: A formatted string representing the complex numbers with 'i' as the imaginary unit.
-    """
-	expression = expression.replace('i', 'j') if is_integer(expression[expression.find('i') - 1]) else expression.replace('i', '1j')
-	pattern = r'\b[a-z]+\b'
-	matches = re.findall(pattern, expression.lower())
-	for var in matches:
-		if var.isalpha() and var != 'j':
-			expression = expression.lower().replace(var, str(variables.get(var.lower(), 0)))
-	try:
-		result: str = eval(expression)
-		result = str(result).replace('(', '').replace(')', '').replace('j', 'i').replace('1i', 'i')
-
-		if '+' in result:
-			result = result.replace('+', ' + ')
-		elif '-' in result[1:]:
-			result = result[:1] + result[1:].replace('-', ' - ')
-		return result
-	except Exception:
-		print_error_message(f'   Error {error_index}: syntax error')
-		return False
-
+			Any: The converted value, or the value itself when it is not a float, a fraction or a decimal.
+	"""
+	if mode == 'decimal' and isinstance(value, float):
+		# the shortest repr, which is what the float was typed as
+		return Decimal(repr(value))
+	elif mode == 'decimal' and isinstance(value, Fraction):
+		return Decimal(value.numerator) / value.denominator
+	elif mode == 'exact' and isinstance(value, Decimal):
+		return Fraction(value)
+	elif mode == 'float' and isinstance(value, Decimal | Fraction):
+		return float(value)
+	return value
+
+
+class Interpreter:
+	"""
+		A session of the calculator: its variables, functions, number mode, reactive
+		formulas and error count. Sessions share nothing, so several of them can run
+		side by side, on different threads too, as long as each one is used by one
+		thread at a time.
 
-def evaluate_operation(left_value: int | float, operator: str, right_value: int | float) -> int | float:
+		Results are printed to 'output' and errors to 'errors'; when they are None,
+		the current sys.stdout and sys.stderr are used.
 	"""
-		Evaluates a basic mathematical operation between two numerical values.
 
-		Args:
-			left_value (int | float): The first operand in the operation.
-			operator (str): The mathematical operator as a string ('^', '*', '/', '%', '+', or '-').
-			right_value (int | float): The second operand in the operation.
+	def __init__(self, output: TextIO | None = None, errors: TextIO | None = None) -> None:
+		self.output: TextIO | None = output
+		self.errors: TextIO | None = errors
+		self.current_line: int | None = None
+		self.profiler: profiling.Profiler = profiling.Profiler()
+		self.profiling: bool = False
+		self.profile_report: bool = False
+		self.reset()
 
-		Returns:
-			int | float: The result of applying the specified operation between the two operands.
-    """
-	result: int | float
-	if operator == '^':
-		result = left_value ** right_value
-	elif operator == '*':
-		result = left_value * right_value
-	elif operator == '/':
-		result = left_value / right_value
-	elif operator == '%':
-		result = left_value % right_value
-	elif operator == '+':
-		result = left_value + right_value
-	elif operator == '-':
-		result = left_value - right_value
-	return result
-
-
-def extract_and_solve(expression: str, operator: str) -> str:
-	"""
-		Extracts operands surrounding a given operator in an expression and computes the result.
+	def reset(self) -> None:
+		"""
+			Forgets every variable, function and formula, and goes back to float mode.
+		"""
+		self.variables: dict[str, Any] = {}
+		self.functions: FunctionTable = FunctionTable(self.variables)
+		self.number_mode: str = 'float'
+		self.precision: int = DEFAULT_PRECISION
+		self.budget: budget.Budget = budget.Budget()
+		self.reactive: bool = False
+		self.graph: DependencyGraph = DependencyGraph()
+		self.error_index: int = 0
+
+	def print_error_message(self, error_message: str) -> None:
+		"""
+			Prints an error message to the error stream and increments the error index.
+			When a script is being run, the message ends with the script line it comes from.
 
-    	Args:
-    	    expression (str): The mathematical expression.
-    	    operator (str): The operator to search for and apply in the expression.
+			Args:
+				error_message (str): The error message to be displayed.
 
-    	Returns:
-    	    str: The expression with the operation replaced by the computed result or an error message.
-    """
-	split_index: int = expression.find(operator)
+			Returns:
+				None
+		"""
+		if self.current_line is not None:
+			error_message = f'{error_message} (line {self.current_line})'
+		print(error_message, file=self.errors or sys.stderr)
+		self.error_index += 1
+
+	def assign_variable(self, name: str, value: Any) -> None:
+		"""
+			Stores a variable value and invalidates the compiled functions that read it.
+
+			Args:
+				name (str): The lowercased variable name.
+				value (Any): The value to store.
+
+			Returns:
+				None
+		"""
+		self.variables[name] = value
+		self.functions.forget(name)
 
-	left_part: str = expression[:split_index]
-	right_part: str = expression[split_index + len(operator):]
+	def record_formula(self, name: str, source: str) -> bool:
+		"""
+			In reactive mode, records the expression a variable is assigned so the variable
+			follows the names it reads. A value that is not an expression, like a matrix
+			file import, is stored as a plain value.
 
-	left_match: Match[str] | None = re.search(r'[\d\w\.]+$', left_part)
-	right_match: Match[str] | None = re.search(r'^[\d\w\.]+', right_part)
-		
-	left_operand: str = left_match.group() if left_match else ''
-	right_operand: str = right_match.group() if right_match else ''
+			Args:
+				name (str): The lowercased variable name.
+				source (str): The assigned expression.
 
-	if not left_operand or not right_operand:
-		print_error_message(f'   Error {error_index}: syntax error')
-		return 'Error'
+			Returns:
+				bool: False if the formula would make the variable depend on itself, True otherwise.
+		"""
+		if not self.reactive:
+			return True
+		try:
+			self.graph.record(name, source)
+		except ExpressionError:
+			self.graph.discard(name)
+		except ValueError:
+			self.print_error_message(f'   Error {self.error_index}: circular dependency on \'{name}\'')
+			return False
+		return True
 
-	operation: str = left_operand + operator + right_operand
+	def update_dependents(self, names: Iterable[str]) -> None:
+		"""
+			Recomputes the reactive variables downstream of changed names, each once and
+			after everything it reads. Nothing is recorded outside of reactive mode.
 
-	left_value: float | int = 0
-	right_value: float | int = 0
+			Args:
+				names (Iterable[str]): The reassigned variables or redefined functions.
 
-	if is_integer(left_operand) or is_float(left_operand):
-		left_value = int(left_operand) if is_integer(left_operand) else float(left_operand)
-	elif left_operand.isalpha():
-		left_value = variables.get(left_operand.lower(), 0)
-	else:
-		print_error_message(f'   Error {error_index}: syntax error')
-		return 'Error'
+			Returns:
+				None
+		"""
+		for name in self.graph.downstream(names):
+			formula: Formula = self.graph.formulas[name]
+			try:
+				with array_errors(formula.source):
+					value: Any = budget.check_digits(evaluate(formula.node, self.variables, self.functions.call))
+			except budget.BudgetExceeded as error:
+				self.print_error_message(f'   Error {self.error_index}: cannot recompute \'{name}\': {error}')
+				continue
+			except ExpressionError:
+				self.print_error_message(f'   Error {self.error_index}: cannot recompute \'{name}\': syntax error')
+				continue
+			except (ValueError, ArithmeticError):
+				self.print_error_message(f'   Error {self.error_index}: cannot recompute \'{name}\': value error')
+				continue
+			self.assign_variable(name, value)
 
-	if is_integer(right_operand) or is_float(right_operand):
-		right_value = int(right_operand) if is_integer(right_operand) else float(right_operand)
-	elif right_operand.isalpha():
-		right_value = variables.get(right_operand.lower(), 0)
-	else:
-		print_error_message(f'   Error {error_index}: syntax error')
-		return 'Error'
+	def set_reactive(self, enabled: bool) -> None:
+		"""
+			Turns reactive mode on or off. Turning it off forgets every formula;
+			variables keep their current values.
 
-	result: int | float = evaluate_operation(left_value, operator, right_value)
-	return expression.replace(operation, str(result))
+			Args:
+				enabled (bool): True to turn reactive mode on.
 
+			Returns:
+				None
+		"""
+		self.reactive = enabled
+		if not enabled:
+			self.graph.clear()
 
-def handle_operator(expression: str) -> bool | str:
-	"""
-		Validates and evaluates a mathematical expression involving basic operators.
+	def evaluate_expression(self, expression: str) -> Any:
+		"""
+			Parses and evaluates an expression against the variables and functions of the session.
 
-		Args:
-			expression (str): The mathematical expression to validate and solve.
+			Args:
+				expression (str): The expression to evaluate.
 
-		Returns:
-    		bool | str: The evaluated result as a string if valid; otherwise, returns False in case of errors.
-    """
-	try:
-		if is_valid_matrice(expression):
-			matrices = expression.replace(';', ',').split('**')
-			np_matrice = numpy.array(json.loads(matrices[0]))
-			for matrice in matrices[1:]:
-				np_matrice = numpy.array(json.loads(matrice.strip())) * np_matrice
-			result: str = ''
-			for row in np_matrice:
-				formatted_row = '[ ' + ' , '.join(map(str, row)) + ' ]'
-				if result:
-					result += '\n   '
-				result += formatted_row
-			return result
-	except ValueError:
-		print_error_message(f'   Error {error_index}: value error')
-		return False
+			Returns:
+				Any: The value of the expression.
 
-	expression = expression.replace(' ', '')
-	input_pattern: str = r'^[a-zA-Z0-9\.\*\+\-\/\%\^\)\() ]+$'
-	if not bool(re.fullmatch(input_pattern, expression)):
-		print_error_message(f'   Error {error_index}: syntax error')
-		return False
-	elif expression[0] in {'*', '/', '%', '^'} or \
-		expression[-1] in {'+', '-', '*', '/', '%', '^'}:
-		print_error_message(f'   Error {error_index}: syntax error')
-		return False
-	
-	if 'i' in expression:
-		return extract_complex_numbers(expression)
+			Raises:
+				ExpressionError: If the expression is not valid.
+				BudgetExceeded: If the value has more digits than can be printed.
+		"""
+		node: Node = parse_expression(expression, self.number_mode)
+		with array_errors(expression):
+			return budget.check_digits(evaluate(node, self.variables, self.functions.call))
 
-	pattern = r'\([^)]*\)'
-	parentheses_content = re.findall(pattern, expression)
-	for content in parentheses_content:
-		expression = expression.replace(content, str(handle_operator(content[1:-1])))
-	def solve_operation(expression) -> str:
+	def handle_operator(self, expression: str) -> bool | str:
 		"""
-			Recursively evaluates mathematical operations in the expression.
+			Validates and evaluates a mathematical expression involving basic operators.
 
 			Args:
-			    expression (str): The mathematical expression to evaluate.
-		
+				expression (str): The mathematical expression to validate and solve.
+
 			Returns:
-			    str: The expression with evaluated results or the original expression if no operators are found.
-		"""
-		if expression[0] == '+':
-			expression = expression[1:]
-
-		if is_integer(expression) or is_float(expression):
-			return expression
-
-		exponentiation: str = '^'
-		multiplicative: list[str] = ['*', '/', '%']
-		additive: list[str] = ['+', '-']
-
-		if exponentiation in expression:
-			expression = extract_and_solve(expression, exponentiation)
-		elif any(operator in expression for operator in multiplicative):
-			for operator in multiplicative:
-				if operator in expression:
-					expression = extract_and_solve(expression, operator)
-					break
-		elif any(operator in expression for operator in additive):
-			pattern = r'\b[a-z]+\b'
-			matches = re.findall(pattern, expression.lower())
-			for var in matches:
-				expression = expression.lower().replace(var, str(variables.get(var.lower(), 0)))
-			expression = str(eval(expression))
-		else:
-			return expression
-		return solve_operation(expression)
+				bool | str: The evaluated result as a string if valid; otherwise, returns False in case of errors.
+		"""
+		try:
+			return format_value(self.evaluate_expression(expression))
+		except ExpressionError:
+			self.print_error_message(f'   Error {self.error_index}: syntax error')
+			return False
+		except (ValueError, TypeError, decimal.InvalidOperation):
+			self.print_error_message(f'   Error {self.error_index}: value error')
+			return False
+
+	def evaluate_string_or_number_or_matrice(self, user_input: str) -> bool:
+		"""
+			Evaluates and prints the result of a number, variable, or expression.
 
-	result = solve_operation(expression)
-	if result == "Error":
+			Args:
+				user_input (str): The input to evaluate, which can be a number, variable, or expression.
+
+			Returns:
+				bool: True if the input was valid and processed; False otherwise.
+		"""
+		number: Any = read_number(user_input, NUMBER_MODES[self.number_mode])
+		if number is not None:
+			print(f'   {format_value(number)}', file=self.output)
+			return True
+		elif user_input.isalpha() and user_input.lower() != 'i':
+			print(f'   {format_value(self.variables.get(user_input.lower(), 0))}', file=self.output)
+			return True
+		elif any(operator in user_input for operator in {'+', '-', '*', '/', '%', '^', '..'}) or user_input.strip().startswith('[') or IMAGINARY_PATTERN.search(user_input):
+			operation_result: str | bool = self.handle_operator(user_input)
+			if False is operation_result:
+				return True
+			print(f'   {operation_result}', file=self.output)
+			return True
 		return False
-	return result
 
+	def handle_function(self, func_list: list[str], func_var_name: str) -> None:
+		"""
+			Processes a mathematical function, evaluates it with the given variable,
+			and prints the result or handles errors.
 
-def evaluate_string_or_number_or_matrice(user_input: str) -> bool:
-	"""
-		Evaluates and prints the result of a number, variable, or expression.
+			Args:
+				func_list (list[str]): A list containing the function name and its expression.
+				func_var_name (str): The variable name used within the function expression.
 
-		Args:
-			user_input (str): The input to evaluate, which can be a number, variable, or expression.
+			Returns:
+				None: The function prints the evaluated result or an error message.
+		"""
+		func_name: str = func_list[0].lower().split('(')[0].strip()
+		if len(func_list) != 2:
+			if func_name in self.functions:
+				print(f'   {format_value(budget.check_digits(self.functions.call(func_name, self.evaluate_expression(func_var_name))))}', file=self.output)
+			else:
+				self.print_error_message(f'   Error {self.error_index}: syntax error')
+			return
 
-		Returns:
-			bool: True if the input was valid and processed; False otherwise.
-	"""
-	global error_index
-	if is_integer(user_input) or is_float(user_input):
-		print(f'   {int(user_input) if is_integer(user_input) else float(user_input)}')
-		return True
-	elif user_input.isalpha():
-		if user_input == 'i':
-			print_error_message(f'   Error {error_index}: \'i\' cannot be assigned or used as a variable name.')
-		else:
-			print(f'   {variables.get(user_input.lower(), 0)}')
-		return True
-	elif any(operator in user_input for operator in {'+', '-', '*', '/', '%', '^'}):
-		operation_result: str | bool = handle_operator(user_input)
-		if False is operation_result:
-			return True
-		print(f'   {operation_result}')
-		return True
-	elif is_valid_matrice(user_input):
-		for el in user_input.replace(' ', '')[1:-1].split(';'):
-			pattern = r'(\d+)'
-			replacement = r' \1 '
-			el = re.sub(pattern, replacement, el)
-			print(f'   {el}')
-		return True
-	return False
+		func = func_list[1].strip()
+		func = IMPLICIT_PRODUCT_PATTERN.sub(lambda match: f'{match[1]} * {match[2]}' if match[2].startswith(func_var_name) else match[0], func)
+		if func[-1] == '?':
+			self.solve_function_equation(func_name, func_var_name, func[:-1])
+			return
+		self.define_function(func_name, func_var_name, func)
 
+	def solve_function_equation(self, func_name: str, func_var_name: str, right_side: str) -> None:
+		"""
+			Solves '<function>(<variable>) = <expression> ?' when both sides are polynomials in the variable.
 
-def is_valid_matrice(expression: str) -> bool:
-	"""
-		Checks if a given string is a valid matrix or a valid matrix multiplication expression.
+			Args:
+				func_name (str): The function name.
+				func_var_name (str): The unknown.
+				right_side (str): The right side of the equation.
 
-		Args:
-		    expression (str): The string expression to validate.
+			Returns:
+				None
+		"""
+		try:
+			polynomial: Polynomial | None = self.functions.polynomial(func_name)
+			right: Polynomial | None = expand(parse_expression(right_side, self.number_mode), func_var_name.lower(), self.variables)
+		except ExpressionError:
+			polynomial = right = None
+		if polynomial is None or right is None:
+			self.print_error_message(f'   Error {self.error_index}: Enter a valid Polynomial equation!')
+			return
+		convert: Callable[[Any], Any] = {'exact': Fraction, 'decimal': Decimal}.get(self.number_mode, float)
+		coefficients: dict[int, Any] = {exponent: convert(convert_scalar(coefficient, self.number_mode)) for exponent, coefficient in (polynomial - right).terms.items()} or {0: convert(0)}
+		equation_reduced_form: str = computorv1.format_reduced_form(coefficients)
+		print(f'   Reduced form: {equation_reduced_form}', file=self.output)
+		computorv1.solve_polynomial(equation_reduced_form, coefficients, self.output)
 
-		Returns:
-		    bool: True if the expression is a valid matrix or matrix multiplication expression, False otherwise.
-    """
-	expression = expression.replace(' ', '')
-	matrice_pattern = r'\[\[\d+(,\d+)*\](;\[\d+(,\d+)*\])*\]'
-	matrice_multip_pattern = matrice_pattern + r'\s*\*\*\s*' + matrice_pattern
-	return bool(re.fullmatch(matrice_pattern, expression)) or bool(re.fullmatch(matrice_multip_pattern, expression))
+	def define_function(self, func_name: str, func_var_name: str, body: str) -> None:
+		"""
+			Compiles a function definition and stores it under its name.
+			A polynomial body is stored and printed in its expanded form.
 
+			Args:
+				func_name (str): The function name.
+				func_var_name (str): The parameter name.
+				body (str): The function body to compile.
 
-def handle_function(func_list: list[str] | str, func_var_name: str) -> None | str:
-	"""
-		Processes a mathematical function, evaluates it with the given variable, 
-		and prints the result or handles errors.
+			Returns:
+				None
+		"""
+		try:
+			self.functions.define(func_name, func_var_name, body)
+			display: str = self.function_display(func_name)
+		except ExpressionError:
+			self.print_error_message(f'   Error {self.error_index}: syntax error')
+			return
+		if self.reactive:
+			definition: FunctionDefinition = self.functions.definitions[func_name]
+			try:
+				self.graph.link(func_name, definition.dependencies | definition.calls)
+			except ValueError:
+				self.functions.forget(func_name)
+				self.print_error_message(f'   Error {self.error_index}: circular dependency on \'{func_name}\'')
+				return
+		self.variables[func_name] = display
+		print(f'   {display}', file=self.output)
+		self.update_dependents([func_name])
 
-		Args:
-			func_list (list[str]): A list containing the function name and its expression.
-			func_var_name (str): The variable name used within the function expression.
+	def function_display(self, name: str) -> str:
+		"""
+			Returns the text of a function: the expanded form of a polynomial body, with the
+			variables it reads at their current values, or the body as written.
 
-		Returns:
-			None: The function prints the evaluated result or an error message.
-    """
-	is_computation = False
-	if isinstance(func_list, str):
-		func_list = func_list.split()
-		is_computation = True
-	func_name: str = func_list[0].lower().split('(')[0]
-	if len(func_list) != 2:
-		if func_name in variables:
-			pattern: str = r'\b[a-zA-Z]+\b'
-			func_content: str = str(variables[func_name])
-			match: Match[str] | None = re.search(pattern, func_content)
-			if match:
-				if is_integer(func_var_name):
-					replaced_content = func_content.replace(match.group(0), func_var_name)
-				else:
-					replaced_content = func_content.replace(match.group(0), str(variables.get(func_var_name.lower(), 0)))
-				replaced_content = replaced_content.replace('^', '**')
-				if (is_computation):
-					return str(eval(replaced_content))
-				print(f'   {eval(replaced_content)}')
-		else:
-			print_error_message(f'   Error {error_index}: syntax error')
-		return
-
-	func = func_list[1].strip()
-	pattern = r'\b[a-zA-Z]+\b'
-	matches = re.findall(pattern, func)
-	for var in matches:
-		if var != func_var_name and var != 'i':
-			func = func.replace(var, str(variables.get(var.lower(), 0)))
-	pattern = rf'([0-9]+)({func_var_name})'
-	replacement = r'\1 * \2'
-	func = re.sub(pattern, replacement, func)
-	if any(bracket in func for bracket in ['(', ')']):
-		variables[func_name] = func
-		print(f'   {func}')
-		return
-
-	if func_name in variables and func[-1] == '?':
-		polynomial__equation: str = f'{variables[func_name]} = {func[:-1]}'
-		equation_reduced_form: str = reduced_form(polynomial__equation.upper())
-		print(f'   Reduced form: {equation_reduced_form}')
-		solve_polynomial(equation_reduced_form)
-		return
-	elif func_name not in variables and func[-1] == '?':
-		print_error_message(f'   Error {error_index}: Enter a valid Polynomial equation!')
-		return
-
-	tokens: list[str] = re.findall(r'\d+|\w+|[-+*/^%]', func)
-	variable_tokens: list[str] = []
-	variable_tokens_is_not_empty = False
-	while len(tokens) > 1:
-		if tokens[0] in {'+', '-'}:
-			if tokens[0] == '+':
-				tokens.pop(0)
-				continue
-			elif tokens[0] == '-' and not tokens[1].isalpha():
-				tokens.pop(0) 
-				tokens[0] = '-' + tokens[0]
-				continue
+			Args:
+				name (str): The function name.
 
-		if any(op in tokens for op in ['^', '*', '/', '%']):
-			if '^' in tokens:
-				for i in range(len(tokens)):
-					if '^' == tokens[i]:
-						index = i
-						break
-			elif any(op in tokens for op in ['*', '/', '%']):
-				for i in range(len(tokens)):
-					if tokens[i] in '*/':
-						index = i
-						break
-			if tokens[index - 1].isalpha() or tokens[index + 1].isalpha():
-				if '^' == tokens[i]:
-					break
-				variable_tokens_is_not_empty = True
-				subtractor = 1
-				if index - 2 >= 0:
-					subtractor = 2
-					variable_tokens.append(tokens.pop(index - subtractor))
-				elif '-' not in tokens[index - 1]:
-					variable_tokens.append('+')
-				variable_tokens.append(tokens.pop(index - subtractor))
-				variable_tokens.append(tokens.pop(index - subtractor))
-				variable_tokens.append(tokens.pop(index - subtractor))
-				continue
+			Returns:
+				str: The text of the function.
+
+			Raises:
+				ExpressionError: If the body cannot be compiled.
+		"""
+		definition: FunctionDefinition = self.functions.definitions[name]
+		polynomial: Polynomial | None = self.functions.polynomial(name)
+		return definition.body if polynomial is None else polynomial.format(definition.parameter)
+
+	def complex_variable(self) -> str | None:
+		"""
+			Finds a variable holding a complex number or a complex matrix, or a function
+			whose body has an imaginary literal, which decimal arithmetic cannot mix with.
+
+			Returns:
+				str | None: The name of the first such variable or function, or None if there is none.
+		"""
+		for name, value in self.variables.items():
+			if name in self.functions:
+				if IMAGINARY_PATTERN.search(self.functions.definitions[name].body):
+					return name
+			elif isinstance(value, complex) or (isinstance(value, Matrix) and value.array.dtype.kind == 'c'):
+				return name
+		return None
+
+	def set_number_mode(self, mode: str) -> None:
+		"""
+			Switches between float arithmetic, exact rational arithmetic and decimal arithmetic
+			to the session precision. Numeric literals, function bodies and the polynomial solver
+			follow the new mode, and stored numbers are converted to it.
+
+			Args:
+				mode (str): 'float', 'exact' or 'decimal'.
+
+			Returns:
+				None
+		"""
+		self.number_mode = mode
+		for name, value in self.variables.items():
+			self.variables[name] = convert_scalar(value, mode)
+		self.functions.set_mode(mode)
+		self.graph.set_mode(mode)
+
+	def set_precision(self, digits: int) -> None:
+		"""
+			Sets the significant digits of decimal arithmetic and switches to decimal mode.
+			Functions are recompiled, so none returns a result of the previous precision.
+
+			Args:
+				digits (int): The number of significant digits.
+
+			Returns:
+				None
+		"""
+		self.precision = digits
+		if self.number_mode != 'decimal':
+			self.set_number_mode('decimal')
 		else:
-			if variable_tokens_is_not_empty:
-				break
-			index = 1 if tokens[1] in {'+', '-', '*', '/', '%', '^'} else 0
-
-			if tokens[index - 1].isalpha() and index != 0:
-				if index - 2 >= 0:
-					variable_tokens.append(tokens.pop(index - 2))
-				else:
-					variable_tokens.append('+')
-				variable_tokens.append(tokens.pop(index - 1))
-				continue
-			elif tokens[index + 1].isalpha():
-				variable_tokens.append(tokens.pop(index))
-				variable_tokens.append(tokens.pop(index))
-				continue
+			# cached results and expanded coefficients were rounded to the previous precision
+			self.functions.set_mode('decimal')
 
-		left_value: int | float = int(tokens[index - 1]) if is_integer(tokens[index - 1]) else float(tokens[index - 1])
-		operator: str = tokens[index]
-		right_value: int | float = int(tokens[index + 1]) if is_integer(tokens[index + 1]) else float(tokens[index + 1])
+	def save_current_session(self, path: str) -> None:
+		"""
+			Writes the variables, functions, number mode, precision and reactive formulas to a snapshot file.
 
-		result: int | float = evaluate_operation(left_value, operator, right_value)
+			Args:
+				path (str): The snapshot file.
 
-		tokens = tokens[:index - 1] + [str(result)] + tokens[index + 2:]
-	if not tokens and variable_tokens[0] == '+':
-		variable_tokens.pop(0)
-	func = f'{" ".join(tokens)} {" ".join(variable_tokens)}'
-	variables[func_name] = func
-	print(f'   {func}')
+			Raises:
+				ValueError: If a variable holds a value that cannot be saved.
+				OSError: If the file cannot be written.
+		"""
+		session.save_session(path, self.variables, self.functions, self.graph, self.number_mode, self.reactive, self.precision)
 
+	def load_saved_session(self, path: str) -> 'session.Snapshot':
+		"""
+			Replaces the session with a snapshot. Matrices stay on disk until used, and
+			functions are compiled on their first call.
 
-def process_variable_assignment(user_input: str) -> None:
-	"""
-		Parses and processes a variable assignment from the user input.
-    	Validates the input for syntax and variable name rules, evaluates expressions, and updates global variables.
+			Args:
+				path (str): The snapshot file.
 
-		Args:
-			user_input (str): The input string.
+			Returns:
+				Snapshot: The loaded snapshot.
 
-		Returns:
-			None
-    """
-	try:
-		global error_index
-
-		var_list: list[str] = user_input.strip().split('=')
-		pattern: str = r'([a-zA-Z]+)\(([a-zA-Z0-9]+)\)'
-		matches: Match[str] | None = re.findall(pattern, var_list[0].strip())
-
-		if user_input == 'variables':
-			for key, value in variables.items():
-				print(f'   {key}-> {value}')
+			Raises:
+				ValueError: If the file is not a session snapshot.
+				OSError: If the file cannot be read.
+		"""
+		snapshot: session.Snapshot = session.load_session(path)
+		self.variables.clear()
+		self.variables.update(snapshot.variables)
+		self.number_mode, self.reactive, self.precision = snapshot.mode, snapshot.reactive, snapshot.precision
+		self.functions = FunctionTable(self.variables, self.number_mode, self.functions.capacity)
+		for name, definition, polynomial in snapshot.functions:
+			self.functions.restore(name, definition, polynomial)
+		self.graph = DependencyGraph(self.number_mode)
+		for name, reads, formula in snapshot.links:
+			self.graph.restore(name, reads, formula)
+		return snapshot
+
+	def handle_session(self, words: list[str]) -> None:
+		"""
+			'save <file>' writes the session to a snapshot file, 'load <file>' replaces the session with one.
+
+			Args:
+				words (list[str]): The command split on whitespace.
+
+			Returns:
+				None
+		"""
+		command, path = words
+		try:
+			if command == 'save':
+				self.save_current_session(path)
+				print(f'   {len(self.variables)} variables and {len(self.functions.definitions)} functions saved to {path}', file=self.output)
+			else:
+				snapshot: session.Snapshot = self.load_saved_session(path)
+				print(f'   {len(snapshot.variables)} variables and {len(snapshot.functions)} functions loaded from {path}', file=self.output)
+		except ValueError as error:
+			self.print_error_message(f'   Error {self.error_index}: {error}')
+		except OSError:
+			self.print_error_message(f'   Error {self.error_index}: cannot {"write" if command == "save" else "read"} \'{path}\'')
+
+	def handle_profile(self, words: list[str]) -> None:
+		"""
+			'profile on' and 'profile off' turn per-stage profiling on and off, 'profile reset'
+			clears the counters and 'profile' alone prints them. Every session has counters of its own.
+
+			Args:
+				words (list[str]): The command split on whitespace.
+
+			Returns:
+				None
+		"""
+		if words[1:] == ['on']:
+			self.enable_profiling()
+		elif words[1:] == ['off']:
+			self.profiling = False
+		elif words[1:] == ['reset']:
+			self.profiler = profiling.Profiler()
+		elif words[1:]:
+			self.print_error_message(f'   Error {self.error_index}: use \'profile on\', \'profile off\' or \'profile reset\'')
 			return
-		elif '=' not in user_input and not matches and evaluate_string_or_number_or_matrice(user_input):
+		else:
+			print(self.profiler.summary(), file=self.output)
 			return
+		print(f'   profile {"on" if self.profiling else "off"}', file=self.output)
 
-		if len(var_list) == 2 and var_list[1].strip() == '?':
-			process_variable_assignment(var_list[0].strip())
+	def enable_profiling(self) -> None:
+		"""
+			Turns profiling on; the counters keep accumulating until reset, and a summary is printed at exit.
+		"""
+		self.profiling = True
+		if not self.profile_report:
+			atexit.register(lambda: profiling.report(self.profiler))
+			self.profile_report = True
+
+	def handle_cache(self, words: list[str]) -> None:
+		"""
+			Shows the function call cache statistics. 'cache <capacity>' resizes the cache,
+			'cache clear' empties it and resets the statistics.
+
+			Args:
+				words (list[str]): The command split on whitespace.
+
+			Returns:
+				None
+		"""
+		functions: FunctionTable = self.functions
+		if len(words) == 2 and words[1] == 'clear':
+			functions.clear_cache()
+		elif len(words) == 2 and words[1].isdigit():
+			functions.resize(int(words[1]))
+		elif len(words) != 1:
+			self.print_error_message(f'   Error {self.error_index}: use \'cache\', \'cache <capacity>\' or \'cache clear\'')
 			return
+		calls: int = functions.hits + functions.misses
+		hit_rate: float = 100 * functions.hits / calls if calls else 0.0
+		print(f'   {len(functions.results)} / {functions.capacity} results, {functions.hits} hits, {functions.misses} misses, hit rate {hit_rate:.1f}%', file=self.output)
 
-		if len(matches) == 1:
-			return handle_function(var_list, matches[0][1])
-		elif len(matches) > 1:
-			result: str = var_list[0]
-			for match in matches:
-				func_name, arg = match
-				func_result: str = handle_function(f'{func_name}({arg})', arg)
-				if not func_result:
-					return
-				result = result.strip().replace(f'{func_name}({arg})', func_result)
-			evaluate_string_or_number_or_matrice(result)
+	def handle_budget(self, words: list[str]) -> None:
+		"""
+			Shows the time and memory budget of a line. 'budget time <seconds>' and
+			'budget memory <MiB>' set one of them, 'off' in place of the amount lifts it,
+			and 'budget off' lifts both.
+
+			Args:
+				words (list[str]): The command split on whitespace.
+
+			Returns:
+				None
+		"""
+		amount: float | None = None
+		if len(words) == 3 and words[1] in {'time', 'memory'} and words[2] != 'off':
+			try:
+				amount = float(words[2])
+			except ValueError:
+				pass
+		if words[1:] == ['off']:
+			self.budget = budget.Budget(None, None)
+		elif len(words) == 3 and words[1:] == ['time', 'off']:
+			self.budget = self.budget._replace(seconds=None)
+		elif len(words) == 3 and words[1:] == ['memory', 'off']:
+			self.budget = self.budget._replace(memory=None)
+		elif amount is not None and 0 < amount < float('inf') and words[1] == 'time':
+			self.budget = self.budget._replace(seconds=amount)
+		elif amount is not None and 0 < amount < float('inf') and words[1] == 'memory':
+			self.budget = self.budget._replace(memory=int(amount * (1 << 20)))
+		elif len(words) != 1:
+			self.print_error_message(f'   Error {self.error_index}: use \'budget off\', \'budget time <seconds>|off\' or \'budget memory <MiB>|off\'')
 			return
-			
+		seconds: str = 'off' if self.budget.seconds is None else f'{self.budget.seconds:g} s'
+		memory: str = 'off' if self.budget.memory is None else budget.format_size(self.budget.memory)
+		print(f'   time {seconds}, memory {memory}', file=self.output)
 
-		var_list.reverse()
-		first_item: Any = var_list[0].strip()
+	def handle_matrix_file(self, words: list[str]) -> None:
+		"""
+			Binds a matrix variable to a file, or writes a matrix to one.
 
-		is_matrice = False
-		if any(operator in first_item for operator in {'+', '-', '*', '/', '%', '^'}):
-			if '**' in first_item:
-				is_matrice = True
-			first_item = handle_operator(first_item)
-			if False is first_item:
-				return
+			'import <name> <file.npy>' maps a .npy file, 'import <name> <file> <dtype> <rows> <columns>'
+			maps a raw binary file; neither copies the entries into memory.
+			'export <expression> <file>' writes the matrix value of the expression to a .npy file,
+			or to a raw binary file for any other extension.
 
-		if first_item == 'i':
-			print_error_message(f'   Error {error_index}: \'i\' cannot be assigned or used as a variable name.')
+			Args:
+				words (list[str]): The command split on whitespace.
+
+			Returns:
+				None
+		"""
+		importing: bool = words[0] == 'import'
+		if (importing and (len(words) not in {3, 6} or not words[1].isalpha() or words[1].lower() == 'i')) or len(words) < 3:
+			self.print_error_message(f'   Error {self.error_index}: syntax error')
 			return
-		elif '(' and ')' in first_item:
-			pattern = r'^([a-zA-Z]+)\(([a-zA-Z0-9]+)\)$'
-			match = re.match(pattern, first_item)
-			if match and match.group(1).lower() in variables:
-				pattern = r'\b[a-zA-Z]+\b'
-				var_match = re.search(pattern, variables[match.group(1).lower()])
-				if var_match and is_integer(match.group(2)):
-					first_item = str(eval(variables[match.group(1).lower()].replace(var_match.group(0), match.group(2))))
-				elif var_match:
-					first_item = str(eval(variables[match.group(1).lower()].replace(var_match.group(0), str(variables.get(match.group(2).lower(), 0)))))
-			else:
-				print_error_message(f'   Error {error_index}: value error')
+		path: str = words[2] if importing else words[-1]
+		if not importing:
+			try:
+				value: Any = self.evaluate_expression(' '.join(words[1:-1]))
+			except ExpressionError:
+				self.print_error_message(f'   Error {self.error_index}: syntax error')
+				return
+			except (ValueError, TypeError, decimal.InvalidOperation):
+				self.print_error_message(f'   Error {self.error_index}: value error')
+				return
+			if not isinstance(value, Matrix):
+				self.print_error_message(f'   Error {self.error_index}: only matrices can be exported')
 				return
-		elif not first_item.isalpha() and not (is_integer(first_item) or \
-		is_float(first_item)) and not 'i' in first_item and not is_valid_matrice(first_item) and not is_matrice:
-			print_error_message(f'   Error {error_index}: syntax error')
+		try:
+			if importing:
+				matrix: Matrix = load_matrix(path, *((words[3], (int(words[4]), int(words[5]))) if len(words) == 6 else ()))
+				self.assign_variable(words[1].lower(), matrix)
+			else:
+				matrix = value
+				save_matrix(matrix, path)
+		except (OSError, ValueError, TypeError):
+			self.print_error_message(f'   Error {self.error_index}: cannot map file \'{path}\'')
 			return
+		rows, columns = matrix.shape
+		print(f'   {rows} x {columns} {matrix.array.dtype} matrix {"mapped from" if importing else "written to"} {path}', file=self.output)
+		if importing:
+			self.graph.discard(words[1].lower())
+			self.update_dependents([words[1].lower()])
+
+	def handle_sampling(self, words: list[str]) -> None:
+		"""
+			Explores a function numerically over an interval, streaming the results a chunk of points at a time.
+
+			'table <function> <start> <stop> <count> [file]' samples the function at count evenly spaced
+			points and prints them, or writes them to a .csv file, a .npy file, or a raw binary file
+			for any other extension. 'roots <function> <start> <stop> [count]' and
+			'extrema <function> <start> <stop> [count]' search a grid of count points and refine
+			every root or turning point found on it.
 
-		last_var: str | None = None
+			Args:
+				words (list[str]): The command split on whitespace.
 
-		for var in var_list[1:]:
-			var = var.strip().lower()
-			if var == 'i':
-				print_error_message(f'   Error {error_index}: \'i\' cannot be assigned or used as a variable name.')
+			Returns:
+				None
+		"""
+		command: str = words[0]
+		if len(words) not in ({5, 6} if command == 'table' else {4, 5}):
+			arguments: str = '<count> [file]' if command == 'table' else '[count]'
+			self.print_error_message(f'   Error {self.error_index}: use \'{command} <function> <start> <stop> {arguments}\'')
+			return
+		name: str = words[1].lower()
+		try:
+			start, stop = (float(self.evaluate_expression(word)) for word in words[2:4])
+			count: int = int(float(words[4])) if len(words) > 4 else sampling.GRID_SIZE
+		except ExpressionError:
+			self.print_error_message(f'   Error {self.error_index}: syntax error')
+			return
+		except (ValueError, TypeError, OverflowError):
+			self.print_error_message(f'   Error {self.error_index}: value error')
+			return
+		if count < 2 or not (numpy.isfinite(start) and numpy.isfinite(stop)):
+			self.print_error_message(f'   Error {self.error_index}: the interval needs finite bounds and at least 2 points')
+			return
+		path: str | None = words[5] if len(words) == 6 else None
+		try:
+			function: Callable[[Any], Any] = self.functions.resolve(name)
+			if self.number_mode == 'decimal':
+				function = sampling.decimal_points(function)
+			parameter: str = self.functions.definitions[name].parameter
+			if command == 'table' and path is None:
+				sampling.write_text(sampling.sample(function, start, stop, count), self.output or sys.stdout, name)
+			elif command == 'table' and path.endswith('.csv'):
+				with open(path, 'w', encoding='utf-8', buffering=1 << 16) as stream:
+					sampling.write_text(sampling.sample(function, start, stop, count), stream, name, csv=True)
+				print(f'   {count} points of {name} written to {path}', file=self.output)
+			elif command == 'table':
+				dtype: numpy.dtype = sampling.write_binary(sampling.sample(function, start, stop, count), path, count)
+				print(f'   {count} x 2 {dtype} table of {name} written to {path}', file=self.output)
+			elif command == 'roots':
+				found: bool = False
+				for root in sampling.find_roots(function, start, stop, count):
+					print(f'   {parameter} = {format_real(root)}', file=self.output)
+					found = True
+				if not found:
+					print(f'   no roots between {format_real(start)} and {format_real(stop)}', file=self.output)
+			else:
+				found = False
+				for extremum in sampling.find_extrema(function, start, stop, count):
+					print(f'   {extremum.kind}: {name}({format_real(extremum.x)}) = {sampling.format_number(extremum.value)}', file=self.output)
+					found = True
+				if not found:
+					print(f'   no extrema between {format_real(start)} and {format_real(stop)}', file=self.output)
+		except ExpressionError as error:
+			self.print_error_message(f'   Error {self.error_index}: {error}')
+		except (ValueError, TypeError, ZeroDivisionError) as error:
+			self.print_error_message(f'   Error {self.error_index}: {error or "value error"}')
+		except OSError:
+			self.print_error_message(f'   Error {self.error_index}: cannot write \'{path}\'')
+
+	def process_variable_assignment(self, user_input: str) -> None:
+		"""
+			Parses and processes a variable assignment from the user input.
+			Validates the input for syntax and variable name rules, evaluates expressions, and updates the session variables.
+			In decimal mode, the line runs in a decimal context holding the session precision.
+			The line runs under the session budget, and is rejected once it would go over it.
+			When profiling is on, the time of its stages is added to the session counters.
+
+			Args:
+				user_input (str): The input string.
+
+			Returns:
+				None
+		"""
+		if self.profiling and profiling.current.get() is None:
+			return profiling.run(self.profiler, self.process_variable_assignment, user_input)
+		if self.number_mode == 'decimal' and decimal.getcontext().prec != self.precision:
+			with decimal.localcontext(prec=self.precision):
+				return self.process_variable_assignment(user_input)
+		if not budget.active():
+			with budget.enforce(self.budget):
+				return self.process_variable_assignment(user_input)
+		try:
+			var_list: list[str] = user_input.strip().split('=')
+			matches: list[tuple[str, str]] = FUNCTION_CALL_PATTERN.findall(var_list[0].strip())
+
+			if user_input == 'variables':
+				for key, value in self.variables.items():
+					if key in self.functions:
+						# the variables read by the body may have changed since it was defined
+						value = self.variables[key] = self.function_display(key)
+					print(f'   {key}-> {format_value(value)}', file=self.output)
+				return
+			elif user_input.split()[:1] == ['mode'] and user_input.split()[1:2] != ['=']:
+				words: list[str] = user_input.split()
+				if words[1:] == ['decimal'] and self.complex_variable() is not None:
+					self.print_error_message(f'   Error {self.error_index}: {DECIMAL_COMPLEX_ERROR}, \'{self.complex_variable()}\' is complex')
+					return
+				elif len(words) == 2 and words[1] in NUMBER_MODES:
+					self.set_number_mode(words[1])
+				elif len(words) != 1:
+					self.print_error_message(f'   Error {self.error_index}: unknown mode, use one of: {", ".join(NUMBER_MODES)}')
+					return
+				print(f'   {self.number_mode}', file=self.output)
+				return
+			elif user_input.split()[:1] == ['precision'] and user_input.split()[1:2] != ['=']:
+				words = user_input.split()
+				if len(words) == 2 and self.number_mode != 'decimal' and self.complex_variable() is not None:
+					self.print_error_message(f'   Error {self.error_index}: {DECIMAL_COMPLEX_ERROR}, \'{self.complex_variable()}\' is complex')
+					return
+				elif len(words) == 2 and words[1].isdigit() and 0 < int(words[1]) <= MAX_PRECISION:
+					self.set_precision(int(words[1]))
+				elif len(words) != 1:
+					self.print_error_message(f'   Error {self.error_index}: use \'precision <digits>\', from 1 to {MAX_PRECISION} digits')
+					return
+				print(f'   {self.precision} digits{"" if self.number_mode == "decimal" else " (not in decimal mode)"}', file=self.output)
+				return
+			elif user_input.split()[:1] == ['time'] and user_input.split()[1:2] not in ([], ['=']):
+				line: profiling.Profiler = profiling.measure(self.process_variable_assignment, user_input.strip()[len('time'):].strip())
+				print(f'   time: {line.brief()}', file=self.output)
+				return
+			elif user_input.split()[:1] == ['profile'] and user_input.split()[1:2] != ['=']:
+				self.handle_profile(user_input.split())
 				return
-			elif not var.isalpha():
-				print_error_message(f'   Error {error_index}: syntax error')
+			elif user_input.split()[:1] in (['save'], ['load']) and len(user_input.split()) == 2:
+				self.handle_session(user_input.split())
+				return
+			elif user_input.split()[:1] == ['cache'] and user_input.split()[1:2] != ['=']:
+				self.handle_cache(user_input.split())
+				return
+			elif user_input.split()[:1] == ['budget'] and user_input.split()[1:2] != ['=']:
+				self.handle_budget(user_input.split())
+				return
+			elif user_input.split()[:1] == ['reactive'] and user_input.split()[1:2] != ['=']:
+				words = user_input.split()
+				if len(words) == 2 and words[1] in {'on', 'off'}:
+					self.set_reactive(words[1] == 'on')
+				elif len(words) != 1:
+					self.print_error_message(f'   Error {self.error_index}: use \'reactive on\' or \'reactive off\'')
+					return
+				print(f'   reactive {"on" if self.reactive else "off"}', file=self.output)
+				return
+			elif '=' not in user_input and user_input.split()[:1] in (['table'], ['roots'], ['extrema']):
+				self.handle_sampling(user_input.split())
+				return
+			elif '=' not in user_input and user_input.split()[:1] in (['import'], ['export']):
+				self.handle_matrix_file(user_input.split())
+				return
+			elif self.number_mode == 'decimal' and IMAGINARY_PATTERN.search(user_input):
+				self.print_error_message(f'   Error {self.error_index}: {DECIMAL_COMPLEX_ERROR}')
+				return
+			elif '=' not in user_input and not matches and self.evaluate_string_or_number_or_matrice(user_input):
 				return
 
-			last_var = var
-
-			if first_item.isalpha():
-				variables[var.lower()] = variables.get(first_item.lower(), 0)
-			elif is_integer(first_item) or is_float(first_item):
-				variables[var.lower()] = int(first_item) if is_integer(first_item) else float(first_item)
-			elif 'i' in first_item:
-				variables[var.lower()] = first_item.replace(' ', '') if not any(op in first_item for op in {'+', '-', '*', '/', '%', '^'}) else first_item
-			elif is_valid_matrice(first_item) or is_matrice:
-				matrice = ''
-				if is_matrice:
-					variables[var.lower()] = first_item
-					print(f'   {first_item}')
-					break
-				is_matrice = True
-				for el in first_item.replace(' ', '')[1:-1].split(';'):
-					pattern = r'(\d+)'
-					replacement = r' \1 '
-					el = re.sub(pattern, replacement, el)
-					matrice += el
-					print(f'   {el}')
-				variables[var.lower()] = matrice
-			else:
-				print_error_message(f'   Error {error_index}: syntax error')
+			if len(var_list) == 2 and var_list[1].strip() == '?':
+				self.process_variable_assignment(var_list[0].strip())
+				return
+
+			if len(var_list) == 1 and matches and not FUNCTION_CALL_PATTERN.fullmatch(var_list[0].strip()):
+				self.evaluate_string_or_number_or_matrice(var_list[0].strip())
+				return
+			elif matches:
+				return self.handle_function(var_list, matches[0][1])
+
+			var_list.reverse()
+			first_item: str = var_list[0].strip()
+			value: Any
+
+			if len(var_list) < 2:
+				self.print_error_message(f'   Error {self.error_index}: syntax error')
 				return
-		if last_var and not is_matrice:
-			print(f'   {variables[var.lower()]}')
-		elif not is_matrice:
-			print_error_message(f'   Error {error_index}: syntax error')
-	except Exception as e:
-	 	print_error_message(f'   Error {error_index}: An error occurred')
+			elif first_item.isalpha() and first_item.lower() != 'i':
+				value = self.variables.get(first_item.lower(), 0)
+			else:
+				try:
+					value = self.evaluate_expression(first_item)
+				except ExpressionError:
+					self.print_error_message(f'   Error {self.error_index}: syntax error')
+					return
+				except (ValueError, TypeError, decimal.InvalidOperation):
+					self.print_error_message(f'   Error {self.error_index}: value error')
+					return
+
+			assigned: list[str] = []
+			for var in var_list[1:]:
+				var = var.strip().lower()
+				if var == 'i':
+					self.print_error_message(f'   Error {self.error_index}: \'i\' cannot be assigned or used as a variable name.')
+					return
+				elif not var.isalpha():
+					self.print_error_message(f'   Error {self.error_index}: syntax error')
+					return
+				elif not self.record_formula(var, first_item):
+					return
+				self.assign_variable(var, value)
+				assigned.append(var)
+			print(f'   {format_value(value)}', file=self.output)
+			self.update_dependents(assigned)
+		except budget.BudgetExceeded as error:
+			self.print_error_message(f'   Error {self.error_index}: {error}')
+		except Exception as e:
+			self.print_error_message(f'   Error {self.error_index}: An error occurred')
+
+
+# the session used by the command line and by code written against the module functions
+default: Interpreter = Interpreter()
+
+
+def __getattr__(name: str) -> Any:
+	"""
+		Keeps the module-level names working: 'computorv2.variables', 'computorv2.process_variable_assignment(...)'
+		and the like resolve to the default session. Assigning them on the module does not
+		change the session; assign the attributes of 'computorv2.default' instead.
+
+		Args:
+			name (str): The attribute looked up on the module.
+
+		Returns:
+			Any: The attribute of the default session.
+	"""
+	if name.startswith('__'):
+		raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+	return getattr(default, name)
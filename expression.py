@@ -0,0 +1,359 @@
+from __future__ import annotations
+import contextlib
+import math
+import operator
+import profiling
+import sys
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple
+from budget import check, multiply, power, product
+from lexer import ExpressionError, Token, tokenize
+from matrix import make_matrix
+from utils import lazy_import
+
+numpy = lazy_import('numpy')
+
+
+class Number(NamedTuple):
+	value: int | float | Fraction | Decimal | complex
+
+
+class Name(NamedTuple):
+	name: str
+
+
+class UnaryOp(NamedTuple):
+	operator: str
+	operand: Any
+
+
+class BinaryOp(NamedTuple):
+	operator: str
+	left: Any
+	right: Any
+
+
+class Call(NamedTuple):
+	name: str
+	argument: Any
+
+
+class Range(NamedTuple):
+	start: Any
+	stop: Any
+	step: Any
+
+
+class MatrixLiteral(NamedTuple):
+	rows: tuple[tuple[Any, ...], ...]
+
+
+Node = Number | Name | UnaryOp | BinaryOp | Call | Range | MatrixLiteral
+
+OPERATIONS: dict[str, Callable[[Any, Any], Any]] = {
+	'^': power,
+	'**': product,
+	'*': multiply,
+	'/': operator.truediv,
+	'%': operator.mod,
+	'+': operator.add,
+	'-': operator.sub,
+}
+
+# operator -> (precedence, right associative)
+BINARY_OPERATORS: dict[str, tuple[int, bool]] = {
+	'+': (1, False),
+	'-': (1, False),
+	'*': (2, False),
+	'**': (2, False),
+	'/': (2, False),
+	'%': (2, False),
+	'^': (4, True),
+}
+UNARY_PRECEDENCE: int = 3
+MAX_NESTING: int = 200
+
+# number mode -> converter applied to the text of numeric literals, None keeping int and float
+NUMBER_MODES: dict[str, Callable[[str], Any] | None] = {
+	'float': None,
+	'exact': Fraction,
+	'decimal': Decimal,
+}
+# significant digits of the 'decimal' mode until set otherwise
+DEFAULT_PRECISION: int = 28
+
+
+def evaluate_operation(left_value: int | float, operator: str, right_value: int | float) -> int | float:
+	"""
+		Evaluates a basic mathematical operation between two numerical values.
+
+		Args:
+			left_value (int | float): The first operand in the operation.
+			operator (str): The mathematical operator as a string ('^', '**', '*', '/', '%', '+', or '-').
+			right_value (int | float): The second operand in the operation.
+
+		Returns:
+			int | float: The result of applying the specified operation between the two operands.
+	"""
+	return OPERATIONS[operator](left_value, right_value)
+
+
+class Parser:
+	"""
+		Precedence-climbing parser turning a token list into an expression tree.
+
+		Chains of left-associative operators are parsed in a loop, but parentheses,
+		signs and powers nest, and every nesting level recurses here and later in the
+		evaluator, so nesting deeper than MAX_NESTING is a syntax error.
+	"""
+
+	def __init__(self, tokens: list[Token]) -> None:
+		self.tokens: list[Token] = tokens
+		self.position: int = 0
+		self.depth: int = 0
+
+	def peek(self) -> Token | None:
+		return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+	def advance(self) -> Token:
+		token: Token | None = self.peek()
+		if token is None:
+			raise ExpressionError('unexpected end of expression')
+		self.position += 1
+		return token
+
+	def parse(self) -> Node:
+		if not self.tokens:
+			raise ExpressionError('empty expression')
+		node: Node = self.parse_expression(0)
+		token: Token | None = self.peek()
+		if token is not None:
+			raise ExpressionError(f'unexpected \'{token.text}\'')
+		return node
+
+	def parse_expression(self, min_precedence: int) -> Node:
+		if self.depth >= MAX_NESTING:
+			raise ExpressionError('expression nested too deeply')
+		self.depth += 1
+		left: Node = self.parse_unary()
+		while True:
+			token: Token | None = self.peek()
+			if token is None or token.kind != 'operator' or token.value not in BINARY_OPERATORS:
+				break
+			precedence, right_associative = BINARY_OPERATORS[token.value]
+			if precedence < min_precedence:
+				break
+			self.position += 1
+			right: Node = self.parse_expression(precedence if right_associative else precedence + 1)
+			left = BinaryOp(token.value, left, right)
+		self.depth -= 1
+		return left
+
+	def parse_unary(self) -> Node:
+		token: Token | None = self.peek()
+		if token is not None and token.kind == 'operator' and token.value in {'+', '-'}:
+			self.position += 1
+			operand: Node = self.parse_expression(UNARY_PRECEDENCE)
+			return operand if token.value == '+' else UnaryOp('-', operand)
+		return self.parse_primary()
+
+	def parse_primary(self) -> Node:
+		token: Token = self.advance()
+		if token.kind == 'number':
+			return Number(token.value)
+		elif token.kind == 'name':
+			following: Token | None = self.peek()
+			if following is not None and following.kind == '(':
+				self.position += 1
+				return Call(token.value, self.parse_parenthesized())
+			return Name(token.value)
+		elif token.kind == '(':
+			return self.parse_parenthesized()
+		elif token.kind == '[':
+			following = self.peek()
+			if following is not None and following.kind == '[':
+				return self.parse_matrix()
+			return self.parse_range()
+		raise ExpressionError(f'unexpected \'{token.text}\'')
+
+	def parse_parenthesized(self) -> Node:
+		node: Node = self.parse_expression(0)
+		if self.advance().kind != ')':
+			raise ExpressionError('unbalanced parentheses')
+		return node
+
+	def parse_range(self) -> Range:
+		start: Node = self.parse_expression(0)
+		if self.advance().kind != '..':
+			raise ExpressionError('expected \'..\' in range')
+		stop: Node = self.parse_expression(0)
+		step: Node = Number(1)
+		token: Token = self.advance()
+		if token.kind == 'name' and token.value == 'step':
+			step = self.parse_expression(0)
+			token = self.advance()
+		if token.kind != ']':
+			raise ExpressionError('unbalanced brackets')
+		return Range(start, stop, step)
+
+	def parse_matrix(self) -> MatrixLiteral:
+		rows: list[tuple[Node, ...]] = []
+		while True:
+			if self.advance().kind != '[':
+				raise ExpressionError('expected \'[\' to open a matrix row')
+			row: list[Node] = [self.parse_expression(0)]
+			token: Token = self.advance()
+			while token.kind == ',':
+				row.append(self.parse_expression(0))
+				token = self.advance()
+			if token.kind != ']':
+				raise ExpressionError('unbalanced brackets')
+			rows.append(tuple(row))
+			token = self.advance()
+			if token.kind == ']':
+				return MatrixLiteral(tuple(rows))
+			elif token.kind != ';':
+				raise ExpressionError('expected \';\' between matrix rows')
+
+
+def normalize(source: str) -> str:
+	"""
+		Normalizes an expression so equivalent spellings share a single cache entry.
+
+		Args:
+			source (str): The expression as typed.
+
+		Returns:
+			str: The expression with runs of whitespace collapsed to one space, in lowercase.
+	"""
+	return ' '.join(source.split()).lower()
+
+
+@lru_cache(maxsize=4096)
+def _parse_normalized(source: str, mode: str) -> Node:
+	return Parser(tokenize(source, NUMBER_MODES[mode])).parse()
+
+
+@profiling.stage('parse')
+def parse_expression(source: str, mode: str = 'float') -> Node:
+	"""
+		Parses an expression into a tree, reusing the tree of a previously seen expression.
+
+		Args:
+			source (str): The expression to parse.
+			mode (str): The number mode deciding the type of numeric literals, a key of NUMBER_MODES.
+
+		Returns:
+			Node: The root node of the expression tree.
+
+		Raises:
+			ExpressionError: If the expression is not syntactically valid.
+	"""
+	return _parse_normalized(normalize(source), mode)
+
+
+def make_range(start: Any, stop: Any, step: Any) -> numpy.ndarray:
+	"""
+		Builds the points of an inclusive range as a float array.
+
+		Args:
+			start (Any): The first point.
+			stop (Any): The last point, included when the step lands on it.
+			step (Any): The distance between two points.
+
+		Returns:
+			numpy.ndarray: The points of the range, empty when the step goes away from the stop.
+
+		Raises:
+			ExpressionError: If the step is zero.
+			BudgetExceeded: If the points would not fit in the memory budget.
+	"""
+	if step == 0:
+		raise ExpressionError('range step cannot be zero')
+	start, stop, step = float(start), float(stop), float(step)
+	# a step going away from the stop gives an empty range
+	count: int = max(math.floor((stop - start) / step + 1e-9) + 1, 0)
+	check(8 * count)
+	return start + step * numpy.arange(count, dtype=float)
+
+
+def array_errors(source: str) -> contextlib.AbstractContextManager[Any]:
+	"""
+		Returns the context an expression is evaluated in. Arithmetic on ranges follows
+		IEEE 754 without warnings, 1 / 0 giving inf at that point. Only an expression
+		that can read an array needs it: one holding a range, or any once numpy is loaded.
+
+		Args:
+			source (str): The source of the expression.
+
+		Returns:
+			contextlib.AbstractContextManager[Any]: The context to evaluate the expression in.
+	"""
+	if '[' in source or 'numpy' in sys.modules:
+		return numpy.errstate(divide='ignore', invalid='ignore', over='ignore')
+	return contextlib.nullcontext()
+
+
+def lookup(name: str, variables: dict[str, Any]) -> Any:
+	"""
+		Returns the numeric value of a variable, unset variables being 0.
+
+		Args:
+			name (str): The lowercased variable name.
+			variables (dict[str, Any]): The variables to look the name up in.
+
+		Returns:
+			Any: The value of the variable.
+
+		Raises:
+			ExpressionError: If the variable holds something that is not a number or a matrix.
+	"""
+	value: Any = variables.get(name, 0)
+	if isinstance(value, str):
+		raise ExpressionError(f'\'{name}\' is not a number')
+	return value
+
+
+def evaluate(node: Node, variables: dict[str, Any], call_function: Callable[[str, Any], Any] | None = None) -> Any:
+	"""
+		Evaluates an expression tree against the given variables.
+
+		Chains of left-associative operators are walked iteratively along their
+		left spine, so long flat expressions do not grow the Python stack.
+
+		Args:
+			node (Node): The root node of the expression tree.
+			variables (dict[str, Any]): The variables referenced by name in the tree.
+			call_function (Callable[[str, Any], Any] | None): Calls a user function by name, if calls are allowed.
+
+		Returns:
+			Any: The value of the expression.
+	"""
+	if isinstance(node, Number):
+		return node.value
+	elif isinstance(node, Name):
+		return lookup(node.name, variables)
+	elif isinstance(node, UnaryOp):
+		return -evaluate(node.operand, variables, call_function)
+	elif isinstance(node, Call):
+		if call_function is None:
+			raise ExpressionError(f'\'{node.name}\' is not a function')
+		return call_function(node.name, evaluate(node.argument, variables, call_function))
+	elif isinstance(node, Range):
+		return make_range(*(evaluate(bound, variables, call_function) for bound in node))
+	elif isinstance(node, MatrixLiteral):
+		return make_matrix([[evaluate(entry, variables, call_function) for entry in row] for row in node.rows])
+
+	spine: list[BinaryOp] = []
+	while isinstance(node, BinaryOp) and node.operator != '^':
+		spine.append(node)
+		node = node.left
+	if isinstance(node, BinaryOp):
+		result: Any = OPERATIONS['^'](evaluate(node.left, variables, call_function), evaluate(node.right, variables, call_function))
+	else:
+		result = evaluate(node, variables, call_function)
+	for parent in reversed(spine):
+		result = OPERATIONS[parent.operator](result, evaluate(parent.right, variables, call_function))
+	return result
@@ -0,0 +1,419 @@
+import functools
+import numbers
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Any, Callable, NamedTuple
+import profiling
+from budget import power, product
+from expression import BinaryOp, Call, MatrixLiteral, Name, Node, Number, Range, UnaryOp, lookup, make_range, parse_expression
+from lexer import ExpressionError
+from matrix import make_matrix
+from polynomial import Polynomial, expand
+from utils import lazy_import
+
+numpy = lazy_import('numpy')
+
+PYTHON_OPERATORS: dict[str, str] = {'*': '*', '/': '/', '%': '%', '+': '+', '-': '-'}
+GUARDED_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {'^': power, '**': product}
+PRECEDENCE: dict[str, int] = {'+': 1, '-': 1, '*': 2, '/': 2, '%': 2}
+UNARY_PRECEDENCE: int = 3
+ATOM_PRECEDENCE: int = 5
+ARGUMENT: str = '_argument'
+CHAIN_LENGTH: int = 256
+CACHE_CAPACITY: int = 1024
+MISSING: object = object()
+
+
+class FunctionDefinition(NamedTuple):
+	"""
+		A user function as it was defined.
+
+		Attributes:
+			parameter (str): The name of the function parameter.
+			body (str): The source of the function body.
+			node (Node): The parsed function body.
+			dependencies (frozenset[str]): The variables the body reads, besides its parameter.
+			calls (frozenset[str]): The functions the body calls.
+	"""
+	parameter: str
+	body: str
+	node: Node
+	dependencies: frozenset[str]
+	calls: frozenset[str]
+
+
+class ExpandedFunction:
+	"""
+		A function whose body is a polynomial in its parameter. An exact argument of
+		a polynomial with exact coefficients is evaluated on the expanded form with
+		Horner's rule; any other argument goes through the compiled body, since the
+		expanded coefficients of a float polynomial cancel catastrophically near
+		clustered roots, like those of (x + 1) ^ 40 * (x - 2) ^ 30.
+
+		Attributes:
+			polynomial (Polynomial): The expanded body, for display and solving.
+			build (Callable[[], Callable[[Any], Any]]): Compiles the body as written, on the first inexact argument.
+			body (Callable[[Any], Any] | None): The compiled body, once built.
+			exact (bool): Whether every coefficient is an integer or a fraction.
+	"""
+	__slots__ = ('polynomial', 'build', 'body', 'exact')
+
+	def __init__(self, polynomial: Polynomial, build: Callable[[], Callable[[Any], Any]]) -> None:
+		self.polynomial: Polynomial = polynomial
+		self.build: Callable[[], Callable[[Any], Any]] = build
+		self.body: Callable[[Any], Any] | None = None
+		self.exact: bool = all(type(coefficient) in (int, Fraction) for coefficient in polynomial.terms.values())
+
+	def __call__(self, argument: Any) -> Any:
+		if self.exact and type(argument) in (int, Fraction):
+			return self.polynomial(argument)
+		if self.body is None:
+			self.body = self.build()
+		return self.body(argument)
+
+
+def collect_names(node: Node, calls: bool = False) -> set[str]:
+	"""
+		Collects the variable names read by an expression tree.
+
+		Args:
+			node (Node): The root node of the expression tree.
+			calls (bool): Also collect the names of the functions the tree calls.
+
+		Returns:
+			set[str]: The names of every variable referenced in the tree, function names excluded unless calls is set.
+	"""
+	names: set[str] = set()
+	pending: list[Node] = [node]
+	while pending:
+		current: Node = pending.pop()
+		if isinstance(current, Name):
+			names.add(current.name)
+		elif isinstance(current, UnaryOp):
+			pending.append(current.operand)
+		elif isinstance(current, BinaryOp):
+			pending.append(current.left)
+			pending.append(current.right)
+		elif isinstance(current, Call):
+			if calls:
+				names.add(current.name)
+			pending.append(current.argument)
+		elif isinstance(current, Range):
+			pending.extend(current)
+		elif isinstance(current, MatrixLiteral):
+			for row in current.rows:
+				pending.extend(row)
+	return names
+
+
+class FunctionTable:
+	"""
+		Holds user function definitions together with their compiled callables.
+
+		A definition is compiled once into a Python function in which the variables
+		it reads are bound as constants. A body that is a polynomial in its parameter
+		is also expanded, and exact arguments are evaluated with Horner's rule. The
+		compiled form is dropped only when the function itself or one of those
+		variables is reassigned, and is rebuilt on the next call.
+
+		Results of calls with hashable arguments are kept in a bounded LRU cache keyed
+		by the version of the function and the argument. Reassigning a name bumps the
+		version of every function reading it, directly or through the functions it
+		calls, so stale results are never returned and age out of the cache.
+	"""
+
+	def __init__(self, variables: dict[str, Any], mode: str = 'float', capacity: int = CACHE_CAPACITY) -> None:
+		self.variables: dict[str, Any] = variables
+		self.mode: str = mode
+		self.definitions: dict[str, FunctionDefinition] = {}
+		self.compiled: dict[str, Callable[[Any], Any]] = {}
+		self.dependents: dict[str, set[str]] = {}
+		self.callers: dict[str, set[str]] = {}
+		self.versions: dict[str, int] = {}
+		self.results: OrderedDict[tuple[Any, ...], Any] = OrderedDict()
+		self.capacity: int = capacity
+		self.hits: int = 0
+		self.misses: int = 0
+
+	def __contains__(self, name: str) -> bool:
+		return name in self.definitions
+
+	def define(self, name: str, parameter: str, body: str) -> FunctionDefinition:
+		"""
+			Parses, registers and compiles a function definition.
+
+			Args:
+				name (str): The function name.
+				parameter (str): The parameter name.
+				body (str): The function body.
+
+			Returns:
+				FunctionDefinition: The registered definition.
+
+			Raises:
+				ExpressionError: If the body cannot be parsed or compiled.
+		"""
+		node: Node = parse_expression(body, self.mode)
+		variables: set[str] = collect_names(node)
+		definition = FunctionDefinition(parameter.lower(), body, node, frozenset(variables - {parameter.lower()}), frozenset(collect_names(node, calls=True) - variables))
+		self.restore(name, definition, self.compile(name, definition))
+		return definition
+
+	def restore(self, name: str, definition: FunctionDefinition, compiled: Callable[[Any], Any] | None = None) -> None:
+		"""
+			Registers an already parsed definition, replacing any function with that name.
+
+			Args:
+				name (str): The function name.
+				definition (FunctionDefinition): The definition.
+				compiled (Callable[[Any], Any] | None): Its compiled form, its expanded polynomial, or None to compile it on the first call.
+		"""
+		self.forget(name)
+		self.definitions[name] = definition
+		if isinstance(compiled, Polynomial):
+			compiled = ExpandedFunction(compiled, functools.partial(self.compile_body, name, definition))
+		if compiled is not None:
+			self.compiled[name] = compiled
+		for dependency in definition.dependencies:
+			self.dependents.setdefault(dependency, set()).add(name)
+		for callee in definition.calls:
+			self.callers.setdefault(callee, set()).add(name)
+
+	def set_mode(self, mode: str) -> None:
+		"""
+			Switches the number mode, re-parsing every definition so its literals follow the new mode.
+
+			Args:
+				mode (str): The new number mode.
+		"""
+		self.mode = mode
+		for name, definition in list(self.definitions.items()):
+			self.define(name, definition.parameter, definition.body)
+
+	def forget(self, name: str) -> None:
+		"""
+			Records that a name was reassigned: its own definition, if any, is removed,
+			every function reading it loses its compiled form, and the cached results of
+			those functions and of the functions calling them become stale.
+
+			Args:
+				name (str): The reassigned name.
+		"""
+		stale: set[str] = {name, *self.dependents.get(name, ())}
+		pending: list[str] = list(stale)
+		while pending:
+			for caller in self.callers.get(pending.pop(), ()):
+				if caller not in stale:
+					stale.add(caller)
+					pending.append(caller)
+		for function in stale:
+			if function in self.definitions:
+				self.versions[function] = self.versions.get(function, 0) + 1
+
+		definition: FunctionDefinition | None = self.definitions.pop(name, None)
+		self.compiled.pop(name, None)
+		if definition is not None:
+			for dependency in definition.dependencies:
+				self.dependents.get(dependency, set()).discard(name)
+			for callee in definition.calls:
+				self.callers.get(callee, set()).discard(name)
+		for dependent in self.dependents.get(name, ()):
+			self.compiled.pop(dependent, None)
+
+
+	def resize(self, capacity: int) -> None:
+		"""
+			Changes the number of results the call cache keeps, evicting the least recently used ones.
+
+			Args:
+				capacity (int): The new capacity, 0 disabling the cache.
+		"""
+		self.capacity = capacity
+		while len(self.results) > capacity:
+			self.results.popitem(last=False)
+
+	def clear_cache(self) -> None:
+		self.results.clear()
+		self.hits = self.misses = 0
+
+	@profiling.stage('evaluate')
+	def call(self, name: str, argument: Any) -> Any:
+		"""
+			Calls a user function, compiling it first if its compiled form was invalidated.
+			A number argument already passed to the current version of the function
+			returns the cached result.
+
+			Args:
+				name (str): The function name.
+				argument (Any): The value of the parameter.
+
+			Returns:
+				Any: The value of the function body.
+
+			Raises:
+				ExpressionError: If no function with that name is defined.
+		"""
+		if not isinstance(argument, numbers.Number):
+			if not isinstance(argument, numpy.ndarray):
+				return self.resolve(name)(argument)
+			# a range maps to inf or nan where the body divides by zero, like numpy does
+			with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+				result = self.resolve(name)(argument)
+			if numpy.shape(result) != argument.shape:
+				# a body that does not depend on the parameter still maps every point of a range
+				return numpy.broadcast_to(result, argument.shape).copy()
+			return result
+		key: tuple[Any, ...] = (name, self.versions.get(name, 0), type(argument), argument)
+		result: Any = self.results.get(key, MISSING)
+		if result is not MISSING:
+			self.hits += 1
+			self.results.move_to_end(key)
+			return result
+		self.misses += 1
+		result = self.resolve(name)(argument)
+		if self.capacity:
+			self.results[key] = result
+			if len(self.results) > self.capacity:
+				self.results.popitem(last=False)
+		return result
+
+	def polynomial(self, name: str) -> Polynomial | None:
+		"""
+			Returns the expanded form of a function whose body is a polynomial in its parameter.
+
+			Args:
+				name (str): The function name.
+
+			Returns:
+				Polynomial | None: The expanded body, or None if the body is not a polynomial.
+
+			Raises:
+				ExpressionError: If no function with that name is defined.
+		"""
+		compiled: Callable[[Any], Any] = self.resolve(name)
+		return compiled.polynomial if isinstance(compiled, ExpandedFunction) else None
+
+	def resolve(self, name: str) -> Callable[[Any], Any]:
+		"""
+			Returns the compiled form of a function, compiling it first if it was invalidated.
+
+			Args:
+				name (str): The function name.
+
+			Returns:
+				Callable[[Any], Any]: The compiled function.
+
+			Raises:
+				ExpressionError: If no function with that name is defined.
+		"""
+		compiled: Callable[[Any], Any] | None = self.compiled.get(name)
+		if compiled is None:
+			if name not in self.definitions:
+				raise ExpressionError(f'\'{name}\' is not a function')
+			compiled = self.compile(name, self.definitions[name])
+			self.compiled[name] = compiled
+		return compiled
+
+	def compile(self, name: str, definition: FunctionDefinition) -> Callable[[Any], Any]:
+		"""
+			Compiles a definition into a Python function of one argument, also expanding
+			it into a polynomial when its body is one.
+
+			Args:
+				name (str): The function name.
+				definition (FunctionDefinition): The definition to compile.
+
+			Returns:
+				Callable[[Any], Any]: The compiled function.
+
+			Raises:
+				ExpressionError: If the body reads a variable that is not a number or a matrix.
+		"""
+		polynomial: Polynomial | None = expand(definition.node, definition.parameter, self.variables)
+		if polynomial is not None:
+			return ExpandedFunction(polynomial, functools.partial(self.compile_body, name, definition))
+		return self.compile_body(name, definition)
+
+	def compile_body(self, name: str, definition: FunctionDefinition) -> Callable[[Any], Any]:
+		"""
+			Compiles the body of a definition as written into a Python function of one argument.
+
+			Args:
+				name (str): The function name, used in tracebacks.
+				definition (FunctionDefinition): The definition.
+
+			Returns:
+				Callable[[Any], Any]: The compiled function.
+		"""
+		namespace: dict[str, Any] = {'__builtins__': {}}
+		source: str = self.generate(definition.node, definition.parameter, namespace)[0]
+		code = compile(f'lambda {ARGUMENT}: {source}', f'<function {name}>', 'eval')
+		return eval(code, namespace)
+
+	def generate(self, node: Node, parameter: str, namespace: dict[str, Any]) -> tuple[str, int]:
+		"""
+			Translates an expression tree into Python source, adding only the parentheses
+			the Python grammar needs so long chains stay flat.
+
+			Chains of left-associative operators are walked iteratively along their left
+			spine. The Python compiler recurses on nested operators, so every CHAIN_LENGTH
+			operators the chain so far is compiled into a function of its own that the
+			rest of the chain calls, which keeps the order of evaluation.
+
+			Args:
+				node (Node): The node to translate.
+				parameter (str): The name standing for the function argument.
+				namespace (dict[str, Any]): The globals of the compiled function, receiving bound constants.
+
+			Returns:
+				tuple[str, int]: The Python source and the precedence of its outermost operator.
+		"""
+		if isinstance(node, Name) and node.name == parameter:
+			return ARGUMENT, ATOM_PRECEDENCE
+		elif isinstance(node, Number | Name):
+			value: Any = node.value if isinstance(node, Number) else lookup(node.name, self.variables)
+			constant: str = f'_constant{len(namespace)}'
+			namespace[constant] = value
+			return constant, ATOM_PRECEDENCE
+		elif isinstance(node, Call):
+			function: str = f'_function{len(namespace)}'
+			namespace[function] = lambda argument, name=node.name: self.call(name, argument)
+			return f'{function}({self.generate(node.argument, parameter, namespace)[0]})', ATOM_PRECEDENCE
+		elif isinstance(node, Range):
+			namespace['_range'] = make_range
+			bounds: list[str] = [self.generate(bound, parameter, namespace)[0] for bound in node]
+			return f'_range({", ".join(bounds)})', ATOM_PRECEDENCE
+		elif isinstance(node, MatrixLiteral):
+			namespace['_matrix'] = make_matrix
+			rows: list[str] = ['[' + ', '.join(self.generate(entry, parameter, namespace)[0] for entry in row) + ']' for row in node.rows]
+			return f'_matrix([{", ".join(rows)}])', ATOM_PRECEDENCE
+		elif isinstance(node, UnaryOp):
+			operand, precedence = self.generate(node.operand, parameter, namespace)
+			if precedence < UNARY_PRECEDENCE:
+				operand = f'({operand})'
+			return f'-{operand}', UNARY_PRECEDENCE
+
+		spine: list[BinaryOp] = []
+		while isinstance(node, BinaryOp):
+			spine.append(node)
+			node = node.left
+		left, left_precedence = self.generate(node, parameter, namespace)
+		for count, parent in enumerate(reversed(spine), 1):
+			if count % CHAIN_LENGTH == 0:
+				part: str = f'_part{len(namespace)}'
+				namespace[part] = eval(compile(f'lambda {ARGUMENT}: {left}', '<chain>', 'eval'), namespace)
+				left, left_precedence = f'{part}({ARGUMENT})', ATOM_PRECEDENCE
+			right, right_precedence = self.generate(parent.right, parameter, namespace)
+			if parent.operator in GUARDED_OPERATORS:
+				# powers and matrix products go through the cost estimates of the budget
+				guard: str = f'_{GUARDED_OPERATORS[parent.operator].__name__}'
+				namespace[guard] = GUARDED_OPERATORS[parent.operator]
+				left, left_precedence = f'{guard}({left}, {right})', ATOM_PRECEDENCE
+				continue
+			precedence = PRECEDENCE[parent.operator]
+			if left_precedence < precedence:
+				left = f'({left})'
+			if right_precedence <= precedence:
+				right = f'({right})'
+			left, left_precedence = f'{left} {PYTHON_OPERATORS[parent.operator]} {right}', precedence
+		return left, left_precedence
@@ -0,0 +1,228 @@
+import os
+import tempfile
+from bisect import bisect_left, insort
+from collections import deque
+
+HISTORY_SIZE: int = 10000
+FLUSH_BATCH: int = 32
+BLOCK_SIZE: int = 1 << 16
+GRAM: int = 3
+
+
+def grams(text: str) -> set[str]:
+	return {text[index:index + GRAM] for index in range(len(text) - GRAM + 1)}
+
+
+def read_tail(path: str, end: int, count: int) -> tuple[list[str], int]:
+	"""
+		Reads the last lines of the first bytes of a file, block by block from the end,
+		so a long log costs no more than its tail.
+
+		Args:
+			path (str): The file to read.
+			end (int): The number of bytes of the file to consider.
+			count (int): The number of lines to read.
+
+		Returns:
+			tuple[list[str], int]: The lines, oldest first, and the offset where the first of them starts.
+	"""
+	with open(path, 'rb') as stream:
+		data: bytes = b''
+		start: int = end
+		while start > 0 and data.count(b'\n') <= count:
+			size: int = min(BLOCK_SIZE, start)
+			start -= size
+			stream.seek(start)
+			data = stream.read(size) + data
+	lines: list[bytes] = data.split(b'\n')
+	if lines[-1] == b'':
+		lines.pop()
+	if start > 0 or len(lines) > count:
+		# the first line may be cut, and is past the count anyway
+		skipped: int = max(len(lines) - count, 1 if start > 0 else 0)
+		start += sum(len(line) + 1 for line in lines[:skipped])
+		lines = lines[skipped:]
+	return [line.decode(errors='replace') for line in lines], start
+
+
+class History:
+	"""
+		Command history holding the last entries in a ring buffer, appended to a log
+		file in batches.
+
+		Entries are numbered from the oldest one still held when the history was
+		loaded, and keep their number while they are in the buffer. The log is only
+		read the first time the entries are needed, and only its tail. An index of
+		the sorted entries answers prefix lookups and an index of the three-letter
+		substrings of every entry narrows substring searches to the entries holding
+		all of the pattern's.
+	"""
+
+	def __init__(self, path: str | None = None, capacity: int = HISTORY_SIZE, batch: int = FLUSH_BATCH) -> None:
+		self.path: str | None = path
+		self.capacity: int = capacity
+		self.batch: int = batch
+		self.entries: deque[str] = deque(maxlen=capacity)
+		self.first: int = 0
+		self.sorted: list[tuple[str, int]] = []
+		self.grams: dict[str, set[int]] = {}
+		self.unsaved: list[str] = []
+		self.loaded: bool = False
+		try:
+			# what the log held before this session, the rest is already in the buffer
+			self.start: int = os.path.getsize(path) if path else 0
+		except OSError:
+			self.start = 0
+
+	def __len__(self) -> int:
+		return len(self.entries)
+
+	def push(self, line: str) -> None:
+		if len(self.entries) == self.capacity:
+			evicted: str = self.entries[0]
+			if self.loaded:
+				self.unindex(evicted, self.first)
+			self.first += 1
+		self.entries.append(line)
+		if self.loaded:
+			self.index(line, self.first + len(self.entries) - 1)
+
+	def index(self, line: str, number: int) -> None:
+		insort(self.sorted, (line, number))
+		for gram in grams(line.lower()):
+			self.grams.setdefault(gram, set()).add(number)
+
+	def unindex(self, line: str, number: int) -> None:
+		del self.sorted[bisect_left(self.sorted, (line, number))]
+		for gram in grams(line.lower()):
+			numbers: set[int] = self.grams[gram]
+			numbers.discard(number)
+			if not numbers:
+				del self.grams[gram]
+
+	def append(self, line: str) -> None:
+		"""
+			Adds an entry, writing the pending entries to the log once a batch is full.
+
+			Args:
+				line (str): The entry.
+		"""
+		self.push(line)
+		self.unsaved.append(line)
+		if len(self.unsaved) >= self.batch:
+			self.flush()
+
+	def flush(self, sync: bool = False) -> None:
+		"""
+			Writes the pending entries to the log, syncing it to disk only when asked,
+			such as when the history is closed.
+
+			Args:
+				sync (bool): Whether to wait for the log to reach the disk.
+		"""
+		if self.path and self.unsaved:
+			with open(self.path, 'a', encoding='utf-8') as stream:
+				stream.write(''.join(f'{line}\n' for line in self.unsaved))
+				if sync:
+					stream.flush()
+					os.fsync(stream.fileno())
+		self.unsaved.clear()
+
+	def close(self) -> None:
+		self.flush(sync=True)
+
+	def load(self) -> None:
+		"""
+			Reads the tail of the log in front of the entries of this session and builds
+			the indexes. The log is rewritten without its older lines once they make up
+			more than half of it.
+		"""
+		if self.loaded:
+			return
+		session: list[str] = list(self.entries)
+		previous: list[str] = []
+		if self.path and self.start:
+			try:
+				previous, offset = read_tail(self.path, self.start, self.capacity)
+				if offset > self.start - offset:
+					self.compact(offset)
+			except OSError:
+				previous = []
+		self.loaded = True
+		self.entries.clear()
+		self.first = 0
+		for line in previous + session:
+			self.push(line)
+
+	def compact(self, offset: int) -> None:
+		directory: str = os.path.dirname(os.path.abspath(self.path))
+		with open(self.path, 'rb') as stream:
+			stream.seek(offset)
+			data: bytes = stream.read()
+		descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.history-')
+		try:
+			with os.fdopen(descriptor, 'wb') as stream:
+				stream.write(data)
+			os.replace(temporary, self.path)
+		except OSError:
+			os.unlink(temporary)
+			raise
+		self.start -= offset
+
+	def items(self) -> list[tuple[int, str]]:
+		self.load()
+		return list(enumerate(self.entries, self.first))
+
+	def get(self, number: int) -> str | None:
+		"""
+			Returns an entry by number.
+
+			Args:
+				number (int): The number of the entry.
+
+			Returns:
+				str | None: The entry, or None if it is not in the buffer.
+		"""
+		self.load()
+		if not self.first <= number < self.first + len(self.entries):
+			return None
+		return self.entries[number - self.first]
+
+	def latest(self, prefix: str) -> str | None:
+		"""
+			Returns the most recent entry starting with a prefix.
+
+			Args:
+				prefix (str): The start of the entry.
+
+			Returns:
+				str | None: The entry, or None if no entry starts with the prefix.
+		"""
+		self.load()
+		best: tuple[str, int] | None = None
+		for position in range(bisect_left(self.sorted, (prefix,)), len(self.sorted)):
+			line, number = self.sorted[position]
+			if not line.startswith(prefix):
+				break
+			if best is None or number > best[1]:
+				best = (line, number)
+		return best[0] if best else None
+
+	def search(self, pattern: str) -> list[tuple[int, str]]:
+		"""
+			Finds the entries containing a pattern, ignoring case.
+
+			Args:
+				pattern (str): The text to look for.
+
+			Returns:
+				list[tuple[int, str]]: The numbers and entries that match, oldest first.
+		"""
+		self.load()
+		needle: str = pattern.lower()
+		if len(needle) < GRAM:
+			return [(number, line) for number, line in self.items() if needle in line.lower()]
+		candidates: list[set[int]] = sorted((self.grams.get(gram, set()) for gram in grams(needle)), key=len)
+		numbers: set[int] = set.intersection(*candidates)
+		return [(number, self.entries[number - self.first]) for number in sorted(numbers)
+			if needle in self.entries[number - self.first].lower()]
@@ -0,0 +1,109 @@
+import re
+from typing import Any, Callable, NamedTuple
+
+
+class ExpressionError(Exception):
+	"""
+		Raised when an expression cannot be tokenized, parsed or evaluated.
+	"""
+
+
+class Token(NamedTuple):
+	"""
+		A single lexical unit of an expression.
+
+		Attributes:
+			kind (str): One of 'number', 'name', 'operator', or the punctuation itself ('(', ')', '[', ']', ',', ';', '..').
+			text (str): The source text of the token.
+			value (Any): The converted literal for numbers, a complex for imaginary literals such as '2i' or 'i',
+				the lowercased name for names, the text otherwise.
+	"""
+	kind: str
+	text: str
+	value: Any
+
+
+NUMBER: str = r'(?:\d+(?:\.(?!\.)\d*)?|\.\d+)(?:[eE][-+]?\d+)?'
+TOKEN_PATTERN: re.Pattern[str] = re.compile(
+	rf'\s*(?:(?P<imaginary>(?:{NUMBER})?[iI](?![a-zA-Z]))'
+	rf'|(?P<number>{NUMBER})'
+	r'|(?P<name>[a-zA-Z]+)'
+	r'|(?P<operator>\*\*|[-+*/%^])'
+	r'|(?P<punctuation>\.\.|[()\[\],;]))'
+)
+LITERAL_PATTERN: re.Pattern[str] = re.compile(rf'\s*(-?)\s*({NUMBER})\s*')
+
+
+def convert_number(text: str, converter: Callable[[str], Any] | None = None) -> Any:
+	"""
+		Converts the text of a numeric literal matched by NUMBER.
+
+		Args:
+			text (str): The literal.
+			converter (Callable[[str], Any] | None): Converts the literal, as in NUMBER_MODES; None reads
+				digits-only literals as int and the others as float.
+
+		Returns:
+			Any: The value of the literal.
+	"""
+	if converter is not None:
+		return converter(text)
+	return int(text) if text.isdigit() else float(text)
+
+
+def read_number(text: str, converter: Callable[[str], Any] | None = None) -> Any:
+	"""
+		Classifies and converts a string holding a single, optionally negated, numeric literal.
+		Anything else is rejected by the pattern, without attempting a conversion.
+
+		Args:
+			text (str): The string to read.
+			converter (Callable[[str], Any] | None): Converts the literal, as in convert_number.
+
+		Returns:
+			Any: The value of the literal, or None if the string is not a numeric literal.
+	"""
+	match: re.Match[str] | None = LITERAL_PATTERN.fullmatch(text)
+	if not match:
+		return None
+	value: Any = convert_number(match.group(2), converter)
+	return -value if match.group(1) else value
+
+
+def tokenize(source: str, converter: Callable[[str], Any] | None = None) -> list[Token]:
+	"""
+		Splits an expression into tokens in a single left-to-right pass,
+		converting each numeric literal as it is matched.
+
+		Args:
+			source (str): The expression to tokenize.
+			converter (Callable[[str], Any] | None): Converts numeric literals, as in convert_number.
+
+		Returns:
+			list[Token]: The tokens of the expression, in order.
+
+		Raises:
+			ExpressionError: If the expression contains a character that does not start a token.
+	"""
+	source = source.strip()
+	tokens: list[Token] = []
+	position: int = 0
+	length: int = len(source)
+	while position < length:
+		match: re.Match[str] | None = TOKEN_PATTERN.match(source, position)
+		if not match:
+			raise ExpressionError(f'unexpected character \'{source[position:].lstrip()[:1]}\'')
+		kind: str = match.lastgroup or ''
+		text: str = match.group(kind)
+		if kind == 'number':
+			tokens.append(Token(kind, text, convert_number(text, converter)))
+		elif kind == 'imaginary':
+			tokens.append(Token('number', text, complex(0, float(text[:-1] or 1))))
+		elif kind == 'name':
+			tokens.append(Token(kind, text, text.lower()))
+		elif kind == 'punctuation':
+			tokens.append(Token(text, text, text))
+		else:
+			tokens.append(Token(kind, text, text))
+		position = match.end()
+	return tokens
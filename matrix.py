@@ -0,0 +1,227 @@
+from __future__ import annotations
+import operator
+import profiling
+from typing import Any, Callable
+from utils import format_complex, lazy_import
+
+numpy = lazy_import('numpy')
+
+PRINT_THRESHOLD: int = 1000
+EDGE_ITEMS: int = 3
+CHUNK_BYTES: int = 1 << 26
+
+
+def format_entry(entry: Any) -> str:
+	return format_complex(entry) if isinstance(entry, complex) else str(entry)
+
+
+def format_row(row: numpy.ndarray, elide: bool = False) -> str:
+	"""
+		Formats a matrix row or the points of a range as '[ a , b , c ]'.
+
+		Args:
+			row (numpy.ndarray): The entries.
+			elide (bool): Whether to print only the first and last entries of a long row.
+
+		Returns:
+			str: The formatted row, '[]' when it is empty.
+	"""
+	if not len(row):
+		return '[]'
+	if not elide or len(row) <= 2 * EDGE_ITEMS:
+		return '[ ' + ' , '.join(map(format_entry, row)) + ' ]'
+	return '[ ' + ' , '.join(map(format_entry, row[:EDGE_ITEMS])) + ' , ... , ' + ' , '.join(map(format_entry, row[-EDGE_ITEMS:])) + ' ]'
+
+
+class Matrix:
+	"""
+		A matrix value backed by a two-dimensional NumPy array.
+
+		'+', '-', '*', '/', '%' and '^' apply term by term, with a scalar operand
+		broadcast over every entry; '**' (the '@' operator in Python) is the matrix
+		product and runs through BLAS.
+	"""
+	__slots__ = ('array',)
+	__array_ufunc__ = None
+
+	def __init__(self, array: numpy.ndarray) -> None:
+		if array.ndim != 2:
+			raise ValueError('a matrix must have two dimensions')
+		self.array: numpy.ndarray = array
+
+	@property
+	def shape(self) -> tuple[int, int]:
+		return self.array.shape
+
+	@profiling.stage('matrix')
+	def __str__(self) -> str:
+		if self.array.size <= PRINT_THRESHOLD:
+			return '\n'.join(map(format_row, self.array))
+		rows: list[str] = [format_row(row, elide=True) for row in (self.array if self.shape[0] <= 2 * EDGE_ITEMS else self.array[:EDGE_ITEMS])]
+		if self.shape[0] <= 2 * EDGE_ITEMS:
+			return '\n'.join(rows)
+		return '\n'.join([*rows, '...', *(format_row(row, elide=True) for row in self.array[-EDGE_ITEMS:])])
+
+	def __repr__(self) -> str:
+		return f'Matrix({self.array!r})'
+
+	def operand(self, other: Any) -> Any:
+		if isinstance(other, Matrix):
+			if other.shape != self.shape:
+				raise ValueError(f'matrix dimensions do not match: {self.shape} and {other.shape}')
+			return other.array
+		return other
+
+	@profiling.stage('matrix')
+	def __add__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.add, self.array, self.operand(other))
+
+	@profiling.stage('matrix')
+	def __radd__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.add, other, self.array)
+
+	@profiling.stage('matrix')
+	def __sub__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.sub, self.array, self.operand(other))
+
+	@profiling.stage('matrix')
+	def __rsub__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.sub, other, self.array)
+
+	@profiling.stage('matrix')
+	def __mul__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.mul, self.array, self.operand(other))
+
+	@profiling.stage('matrix')
+	def __rmul__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.mul, other, self.array)
+
+	@profiling.stage('matrix')
+	def __truediv__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.truediv, self.array, self.operand(other))
+
+	@profiling.stage('matrix')
+	def __rtruediv__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.truediv, other, self.array)
+
+	@profiling.stage('matrix')
+	def __mod__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.mod, self.array, self.operand(other))
+
+	@profiling.stage('matrix')
+	def __rmod__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.mod, other, self.array)
+
+	@profiling.stage('matrix')
+	def __pow__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.pow, self.array, self.operand(other))
+
+	@profiling.stage('matrix')
+	def __rpow__(self, other: Any) -> 'Matrix':
+		return elementwise(operator.pow, other, self.array)
+
+	@profiling.stage('matrix')
+	def __neg__(self) -> 'Matrix':
+		return Matrix(-self.array)
+
+	@profiling.stage('matrix')
+	def __matmul__(self, other: Any) -> 'Matrix':
+		if not isinstance(other, Matrix):
+			return NotImplemented
+		if self.shape[1] != other.shape[0]:
+			raise ValueError(f'matrix dimensions do not match: {self.shape} and {other.shape}')
+		return Matrix(self.array @ other.array)
+
+
+def elementwise(operation: Callable[[Any, Any], Any], left: Any, right: Any) -> Matrix:
+	"""
+		Applies an arithmetic operator term by term. Like on a range, a division by zero
+		gives inf or nan at that entry rather than a numpy warning.
+
+		Args:
+			operation (Callable[[Any, Any], Any]): The operator.
+			left (Any): The left operand, an array or a scalar.
+			right (Any): The right operand, an array or a scalar.
+
+		Returns:
+			Matrix: The resulting matrix.
+	"""
+	with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+		return Matrix(operation(left, right))
+
+@profiling.stage('matrix')
+def make_matrix(rows: list[list[Any]]) -> Matrix:
+	"""
+		Builds a matrix from evaluated entries, choosing an integer, float or complex dtype from the entries.
+
+		Args:
+			rows (list[list[Any]]): The entries, row by row.
+
+		Returns:
+			Matrix: The new matrix.
+
+		Raises:
+			ValueError: If the rows do not all have the same length.
+	"""
+	if any(len(row) != len(rows[0]) for row in rows):
+		raise ValueError('matrix rows must have the same length')
+	return Matrix(numpy.array(rows))
+
+
+def matrix_product(left: Any, right: Any) -> Matrix:
+	"""
+		Computes the matrix product of two matrices, the '**' operator.
+
+		Args:
+			left (Any): The left matrix.
+			right (Any): The right matrix.
+
+		Returns:
+			Matrix: The product.
+
+		Raises:
+			ValueError: If an operand is not a matrix or the dimensions do not match.
+	"""
+	if not isinstance(left, Matrix) or not isinstance(right, Matrix):
+		raise ValueError('\'**\' multiplies two matrices')
+	return left @ right
+
+
+@profiling.stage('matrix')
+def load_matrix(path: str, dtype: str | None = None, shape: tuple[int, int] | None = None) -> Matrix:
+	"""
+		Binds a matrix to a file without reading it: the entries stay on disk and
+		are paged in by the operating system when an operation touches them.
+
+		Args:
+			path (str): A .npy file, or a raw binary file when dtype and shape are given.
+			dtype (str | None): The entry type of a raw file, such as 'float64'.
+			shape (tuple[int, int] | None): The rows and columns of a raw file.
+
+		Returns:
+			Matrix: A read-only matrix mapped on the file.
+	"""
+	if dtype is None or shape is None:
+		return Matrix(numpy.load(path, mmap_mode='r'))
+	return Matrix(numpy.memmap(path, dtype=numpy.dtype(dtype), mode='r', shape=shape))
+
+
+@profiling.stage('matrix')
+def save_matrix(matrix: Matrix, path: str) -> None:
+	"""
+		Writes a matrix to a .npy file, or to a raw binary file for any other
+		extension, through a memory map filled a block of rows at a time.
+
+		Args:
+			matrix (Matrix): The matrix to write.
+			path (str): The destination file.
+	"""
+	array: numpy.ndarray = matrix.array
+	if path.endswith('.npy'):
+		output: numpy.ndarray = numpy.lib.format.open_memmap(path, mode='w+', dtype=array.dtype, shape=array.shape)
+	else:
+		output = numpy.memmap(path, dtype=array.dtype, mode='w+', shape=array.shape)
+	step: int = max(1, CHUNK_BYTES // max(1, array.itemsize * array.shape[1]))
+	for start in range(0, len(array), step):
+		output[start:start + step] = array[start:start + step]
+	output.flush()
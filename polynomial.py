@@ -0,0 +1,362 @@
+from __future__ import annotations
+import decimal
+import math
+from decimal import Decimal
+from fractions import Fraction
+from numbers import Real
+from typing import Any
+from budget import INLINE_BITS, INLINE_STEPS, exact_bits, guarded, power
+from expression import BinaryOp, Name, Node, Number, UnaryOp, lookup
+from lexer import ExpressionError
+from utils import lazy_import
+
+numpy = lazy_import('numpy')
+
+KARATSUBA_THRESHOLD: int = 32
+# exact expansions of this degree take about a second
+MAX_DEGREE: int = 1 << 11
+# cost of a product as a power of the number of coefficient words, as in Karatsuba
+PRODUCT_EXPONENT: float = math.log2(3)
+
+
+def add_coefficients(left: list[Any], right: list[Any]) -> list[Any]:
+	if len(left) < len(right):
+		left, right = right, left
+	return [coefficient + right[index] if index < len(right) else coefficient for index, coefficient in enumerate(left)]
+
+
+def schoolbook(left: list[Any], right: list[Any]) -> list[Any]:
+	result: list[Any] = [0] * (len(left) + len(right) - 1)
+	for i, coefficient in enumerate(left):
+		if coefficient:
+			for j, other in enumerate(right):
+				result[i + j] += coefficient * other
+	return result
+
+
+def karatsuba(left: list[Any], right: list[Any]) -> list[Any]:
+	"""
+		Multiplies two dense coefficient lists, lowest degree first, with Karatsuba's
+		three half-size products. The coefficients are combined with their own
+		arithmetic, so integers and rationals stay exact.
+
+		Args:
+			left (list[Any]): The coefficients of the left factor.
+			right (list[Any]): The coefficients of the right factor.
+
+		Returns:
+			list[Any]: The coefficients of the product.
+	"""
+	if min(len(left), len(right)) < KARATSUBA_THRESHOLD:
+		return schoolbook(left, right)
+	half: int = min(len(left), len(right)) // 2
+	low: list[Any] = karatsuba(left[:half], right[:half])
+	high: list[Any] = karatsuba(left[half:], right[half:])
+	middle: list[Any] = karatsuba(add_coefficients(left[:half], left[half:]), add_coefficients(right[:half], right[half:]))
+	result: list[Any] = [0] * (len(left) + len(right) - 1)
+	for index, coefficient in enumerate(low):
+		result[index] += coefficient
+		middle[index] -= coefficient
+	for index, coefficient in enumerate(high):
+		result[index + 2 * half] += coefficient
+		middle[index] -= coefficient
+	for index, coefficient in enumerate(middle):
+		if index + half < len(result):
+			result[index + half] += coefficient
+	return result
+
+
+def coefficient_bits(polynomial: Polynomial) -> tuple[float, bool]:
+	"""
+		Estimates the size of the coefficients of a polynomial.
+
+		Args:
+			polynomial (Polynomial): The polynomial.
+
+		Returns:
+			tuple[float, bool]: The bits of a coefficient, and whether they are exact and so
+			add up in products, the bits of floats and decimals staying the same.
+	"""
+	coefficients: Any = polynomial.terms.values()
+	if all(type(coefficient) in (int, Fraction) for coefficient in coefficients):
+		# the largest coefficient, and the carries of summing the terms of a product
+		return max(map(exact_bits, coefficients), default=0) + math.log2(max(len(polynomial.terms), 1)), True
+	if any(isinstance(coefficient, Decimal) for coefficient in coefficients):
+		return decimal.getcontext().prec * math.log2(10), False
+	return 64.0, False
+
+
+def guard(operation: Any, args: tuple[Any, ...], degree: int, bits: float) -> Polynomial:
+	"""
+		Runs a polynomial product under the budget of the line, from the degree and
+		coefficient size of its result: a large one is checked against the memory
+		budget and a long one runs in a worker that is stopped when the time is up.
+
+		Args:
+			operation (Any): The product.
+			args (tuple[Any, ...]): Its operands.
+			degree (int): The degree of the result.
+			bits (float): The bits of a coefficient of the result.
+
+		Returns:
+			Polynomial: The result.
+
+		Raises:
+			BudgetExceeded: If the product goes over the budget.
+	"""
+	size: float = (degree + 1) * max(bits, 64) / 8
+	steps: float = (degree * max(bits / 64, 1)) ** PRODUCT_EXPONENT
+	if size <= INLINE_BITS and steps <= INLINE_STEPS:
+		return operation(*args)
+	return guarded(operation, args, int(size), steps > INLINE_STEPS)
+
+
+class Polynomial:
+	"""
+		A polynomial in one variable, stored as a sparse mapping from exponent to
+		nonzero coefficient.
+
+		Calling a polynomial evaluates it with Horner's rule, skipping runs of
+		missing terms with a single power, so the point can be a number, a NumPy
+		array or a matrix (whose operations are term by term).
+	"""
+	__slots__ = ('terms',)
+
+	def __init__(self, terms: dict[int, Any] | None = None) -> None:
+		self.terms: dict[int, Any] = {exponent: coefficient for exponent, coefficient in (terms or {}).items() if coefficient != 0}
+
+	@property
+	def degree(self) -> int:
+		return max(self.terms, default=0)
+
+	def __eq__(self, other: Any) -> bool:
+		return isinstance(other, Polynomial) and self.terms == other.terms
+
+	def __repr__(self) -> str:
+		return f'Polynomial({self.terms!r})'
+
+	def __str__(self) -> str:
+		return self.format('x')
+
+	def format(self, variable: str) -> str:
+		"""
+			Writes the polynomial in canonical form, highest degree first.
+
+			Args:
+				variable (str): The name of the variable.
+
+			Returns:
+				str: The polynomial, such as '2 * x ^ 5 - x + 4'.
+		"""
+		if not self.terms:
+			return '0'
+		parts: list[str] = []
+		for exponent in sorted(self.terms, reverse=True):
+			coefficient: Any = self.terms[exponent]
+			sign: str = '-' if coefficient < 0 else '+'
+			magnitude: Any = -coefficient if coefficient < 0 else coefficient
+			if exponent == 0:
+				term: str = str(magnitude)
+			else:
+				power: str = variable if exponent == 1 else f'{variable} ^ {exponent}'
+				term = power if magnitude == 1 else f'{magnitude} * {power}'
+			if parts:
+				parts.append(f'{sign} {term}')
+			else:
+				parts.append(term if sign == '+' else f'-{term}')
+		return ' '.join(parts)
+
+	def __add__(self, other: Any) -> 'Polynomial':
+		terms: dict[int, Any] = dict(self.terms)
+		for exponent, coefficient in (other.terms if isinstance(other, Polynomial) else {0: other}).items():
+			terms[exponent] = terms.get(exponent, 0) + coefficient
+		return Polynomial(terms)
+
+	def __neg__(self) -> 'Polynomial':
+		return Polynomial({exponent: -coefficient for exponent, coefficient in self.terms.items()})
+
+	def __sub__(self, other: Any) -> 'Polynomial':
+		return self + (-other)
+
+	def __truediv__(self, other: Any) -> 'Polynomial':
+		return Polynomial({exponent: coefficient / other for exponent, coefficient in self.terms.items()})
+
+	def __mul__(self, other: Any) -> 'Polynomial':
+		"""
+			Multiplies by a scalar or another polynomial. Sparse or short factors are
+			multiplied term by term; long dense factors go through NumPy's convolution
+			when a coefficient is a float, and through Karatsuba otherwise.
+
+			Args:
+				other (Any): A scalar or a polynomial.
+
+			Returns:
+				Polynomial: The product.
+
+			Raises:
+				ValueError: If the product would exceed MAX_DEGREE.
+				BudgetExceeded: If the product would go over the budget of the line.
+		"""
+		if not isinstance(other, Polynomial):
+			return Polynomial({exponent: coefficient * other for exponent, coefficient in self.terms.items()})
+		if not self.terms or not other.terms:
+			return Polynomial()
+		if len(self.terms) > 1 and len(other.terms) > 1 and self.degree + other.degree > MAX_DEGREE:
+			raise ValueError('polynomial degree too large')
+		if len(self.terms) * len(other.terms) < KARATSUBA_THRESHOLD:
+			# a few products of coefficients that were built under the budget already
+			return self.multiply(other)
+		(bits, exact), (other_bits, other_exact) = coefficient_bits(self), coefficient_bits(other)
+		return guard(Polynomial.multiply, (self, other), self.degree + other.degree, bits + other_bits if exact and other_exact else max(bits, other_bits))
+
+	def multiply(self, other: 'Polynomial') -> 'Polynomial':
+		if min(len(self.terms), len(other.terms)) < KARATSUBA_THRESHOLD or not (self.dense() and other.dense()):
+			terms: dict[int, Any] = {}
+			for exponent, coefficient in self.terms.items():
+				for other_exponent, other_coefficient in other.terms.items():
+					terms[exponent + other_exponent] = terms.get(exponent + other_exponent, 0) + coefficient * other_coefficient
+			return Polynomial(terms)
+
+		shift: int = min(self.terms) + min(other.terms)
+		left: list[Any] = self.coefficients()
+		right: list[Any] = other.coefficients()
+		if any(isinstance(coefficient, float) for coefficient in (*self.terms.values(), *other.terms.values())):
+			product: list[Any] = numpy.convolve(numpy.array(left, dtype=float), numpy.array(right, dtype=float)).tolist()
+		else:
+			product = karatsuba(left, right)
+		return Polynomial({shift + index: coefficient for index, coefficient in enumerate(product)})
+
+	def __pow__(self, exponent: int) -> 'Polynomial':
+		"""
+			Raises the polynomial to a non-negative integer power by repeated squaring.
+
+			Args:
+				exponent (int): The power.
+
+			Returns:
+				Polynomial: The power of the polynomial.
+
+			Raises:
+				ValueError: If the result would exceed MAX_DEGREE.
+				BudgetExceeded: If the power would go over the budget of the line.
+		"""
+		if len(self.terms) == 1:
+			(degree, coefficient), = self.terms.items()
+			return Polynomial({degree * exponent: power(coefficient, exponent)})
+		if self.degree * exponent > MAX_DEGREE:
+			raise ValueError('polynomial degree too large')
+		bits, exact = coefficient_bits(self)
+		return guard(Polynomial.square_and_multiply, (self, exponent), self.degree * exponent, bits * exponent if exact else bits)
+
+	def square_and_multiply(self, exponent: int) -> 'Polynomial':
+		result: Polynomial = Polynomial({0: 1})
+		square: Polynomial = self
+		while exponent:
+			if exponent & 1:
+				result = result * square
+			exponent >>= 1
+			if exponent:
+				square = square * square
+		return result
+
+	def derivative(self) -> 'Polynomial':
+		return Polynomial({exponent - 1: coefficient * exponent for exponent, coefficient in self.terms.items() if exponent})
+
+	def dense(self) -> bool:
+		return 2 * len(self.terms) > self.degree - min(self.terms)
+
+	def coefficients(self) -> list[Any]:
+		low: int = min(self.terms)
+		result: list[Any] = [0] * (self.degree - low + 1)
+		for exponent, coefficient in self.terms.items():
+			result[exponent - low] = coefficient
+		return result
+
+	def __call__(self, point: Any) -> Any:
+		if not self.terms:
+			return 0
+		exponents: list[int] = sorted(self.terms, reverse=True)
+		result: Any = self.terms[exponents[0]]
+		for current, following in zip(exponents, exponents[1:]):
+			gap: int = current - following
+			result = result * (point if gap == 1 else power(point, gap)) + self.terms[following]
+		if exponents[-1]:
+			result = result * (point if exponents[-1] == 1 else power(point, exponents[-1]))
+		return result
+
+
+def integer_exponent(value: Any) -> int | None:
+	if isinstance(value, int) and value >= 0:
+		return value
+	if isinstance(value, Fraction) and value.denominator == 1 and value >= 0:
+		return value.numerator
+	if isinstance(value, Decimal) and value.is_finite() and value == value.to_integral_value() and value >= 0:
+		return int(value)
+	return None
+
+
+def expand(node: Node, parameter: str, variables: dict[str, Any]) -> Polynomial | None:
+	"""
+		Expands an expression tree into a polynomial in its parameter. Other
+		variables are read as constants, '/' must divide by a constant and '^' must
+		raise to a constant non-negative integer.
+
+		Args:
+			node (Node): The expression tree.
+			parameter (str): The name of the polynomial variable.
+			variables (dict[str, Any]): The values of the other variables.
+
+		Returns:
+			Polynomial | None: The expanded polynomial, or None if the expression is not a
+			polynomial with real coefficients, such as a function call, a matrix or a division
+			by the parameter.
+	"""
+	def constant(polynomial: Polynomial) -> Any:
+		if polynomial.degree != 0:
+			raise ValueError('not a constant')
+		return polynomial.terms.get(0, 0)
+
+	def walk(node: Node) -> Polynomial:
+		if isinstance(node, Number):
+			if not isinstance(node.value, Real | Decimal):
+				raise ValueError('not a real constant')
+			return Polynomial({0: node.value})
+		elif isinstance(node, Name):
+			if node.name == parameter:
+				return Polynomial({1: 1})
+			value: Any = lookup(node.name, variables)
+			if not isinstance(value, Real | Decimal):
+				raise ValueError('not a real constant')
+			return Polynomial({0: value})
+		elif isinstance(node, UnaryOp):
+			return -walk(node.operand)
+		elif not isinstance(node, BinaryOp) or node.operator not in {'+', '-', '*', '/', '^'}:
+			raise ValueError('not a polynomial')
+
+		spine: list[BinaryOp] = []
+		while isinstance(node, BinaryOp) and node.operator in {'+', '-', '*', '/'}:
+			spine.append(node)
+			node = node.left
+		if isinstance(node, BinaryOp) and node.operator == '^':
+			exponent: int | None = integer_exponent(constant(walk(node.right)))
+			if exponent is None:
+				raise ValueError('not a polynomial power')
+			result: Polynomial = walk(node.left) ** exponent
+		else:
+			result = walk(node)
+		for parent in reversed(spine):
+			right: Polynomial = walk(parent.right)
+			if parent.operator == '+':
+				result = result + right
+			elif parent.operator == '-':
+				result = result - right
+			elif parent.operator == '*':
+				result = result * right
+			else:
+				result = result / constant(right)
+		return result
+
+	try:
+		return walk(node)
+	except (ExpressionError, ValueError, ArithmeticError):
+		return None
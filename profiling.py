@@ -0,0 +1,198 @@
+from __future__ import annotations
+import functools
+import os
+import sys
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Callable
+
+STAGES: tuple[str, ...] = ('dispatch', 'parse', 'evaluate', 'matrix', 'solve', 'format', 'output')
+ENVIRONMENT_FLAG: str = 'COMPUTORV2_PROFILE'
+JSON_FLAG: str = 'COMPUTORV2_PROFILE_JSON'
+
+
+class Profiler:
+	"""
+		Per-stage call counts and timings.
+
+		Stages nest: a stage is charged only its own time, the time of the stages it
+		calls being charged to them, so the stage times add up to the time of the lines.
+		'dispatch' is what is left of a line: command routing, validation and the
+		string handling around the other stages.
+	"""
+
+	def __init__(self) -> None:
+		self.calls: dict[str, int] = dict.fromkeys(STAGES, 0)
+		self.seconds: dict[str, float] = dict.fromkeys(STAGES, 0.0)
+		self.lines: int = 0
+		self.total: float = 0.0
+		self.children: list[float] = []
+
+	def run(self, stage: str, function: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+		self.children.append(0.0)
+		start: float = time.perf_counter()
+		try:
+			return function(*args, **kwargs)
+		finally:
+			elapsed: float = time.perf_counter() - start
+			self.seconds[stage] += elapsed - self.children.pop()
+			self.calls[stage] += 1
+			if self.children:
+				self.children[-1] += elapsed
+			elif stage == 'dispatch':
+				self.lines += 1
+				self.total += elapsed
+
+	def merge(self, other: 'Profiler') -> None:
+		for stage in STAGES:
+			self.calls[stage] += other.calls[stage]
+			self.seconds[stage] += other.seconds[stage]
+		if self.children:
+			self.children[-1] += other.total
+		else:
+			self.lines += other.lines
+			self.total += other.total
+
+	def to_json(self) -> dict[str, Any]:
+		return {
+			'lines': self.lines,
+			'seconds': self.total,
+			'stages': {stage: {'calls': self.calls[stage], 'seconds': self.seconds[stage]} for stage in STAGES},
+		}
+
+	def summary(self) -> str:
+		"""
+			Formats the counters as a table, one stage per row.
+
+			Returns:
+				str: The table, with the number of lines and their throughput on the last row.
+		"""
+		rows: list[str] = [f'   {"stage":<10}{"calls":>10}{"total ms":>12}{"avg us":>10}{"share":>8}']
+		for stage in STAGES:
+			calls: int = self.calls[stage]
+			seconds: float = self.seconds[stage]
+			average: float = seconds / calls * 1e6 if calls else 0.0
+			share: float = seconds / self.total if self.total else 0.0
+			rows.append(f'   {stage:<10}{calls:>10}{seconds * 1e3:>12.3f}{average:>10.1f}{share:>8.1%}')
+		rate: str = f', {self.lines / self.total:,.0f} lines/s' if self.total else ''
+		rows.append(f'   {self.lines} lines in {self.total * 1e3:.3f} ms{rate}')
+		return '\n'.join(rows)
+
+	def brief(self) -> str:
+		"""
+			Formats the counters on one line, leaving out the stages that were not reached.
+
+			Returns:
+				str: The total time followed by the time of each stage.
+		"""
+		stages: str = ', '.join(f'{stage} {self.seconds[stage] * 1e3:.3f} ms' for stage in STAGES if self.calls[stage])
+		return f'{self.total * 1e3:.3f} ms ({stages})'
+
+
+# the counters of the line being run, None when it is not profiled
+current: ContextVar[Profiler | None] = ContextVar('profiler', default=None)
+
+
+def timed(stage: str, function: Callable[..., Any]) -> Callable[..., Any]:
+	"""
+		Wraps a function so its calls are charged to a stage of the profiler of the
+		running line. Outside a profiled line, the wrapper only reads the context
+		variable and calls through, so the instrumentation stays in place at little cost.
+
+		Args:
+			stage (str): The stage charged.
+			function (Callable[..., Any]): The function to time.
+
+		Returns:
+			Callable[..., Any]: The timed function.
+	"""
+	@functools.wraps(function)
+	def wrapper(*args: Any, **kwargs: Any) -> Any:
+		profiler: Profiler | None = current.get()
+		if profiler is None:
+			return function(*args, **kwargs)
+		return profiler.run(stage, function, args, kwargs)
+	return wrapper
+
+
+def stage(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+	"""
+		Returns a decorator charging the calls of a function to a stage, see timed.
+
+		Args:
+			name (str): The stage charged.
+
+		Returns:
+			Callable[[Callable[..., Any]], Callable[..., Any]]: The decorator.
+	"""
+	return functools.partial(timed, name)
+
+
+def run(profiler: Profiler, function: Callable[..., Any], *args: Any) -> Any:
+	"""
+		Runs a call as one line whose stages are charged to the given counters.
+
+		Args:
+			profiler (Profiler): The counters.
+			function (Callable[..., Any]): The function to call.
+			*args (Any): Its arguments.
+
+		Returns:
+			Any: What the call returns.
+	"""
+	token: Token[Profiler | None] = current.set(profiler)
+	try:
+		return profiler.run('dispatch', function, args, {})
+	finally:
+		current.reset(token)
+
+
+def measure(function: Callable[..., Any], *args: Any) -> Profiler:
+	"""
+		Profiles a single call on its own counters, whether profiling is on or not.
+		When the running line is profiled, the call is also added to its counters.
+
+		Args:
+			function (Callable[..., Any]): The function to call.
+			*args (Any): Its arguments.
+
+		Returns:
+			Profiler: The counters of the call.
+	"""
+	session: Profiler | None = current.get()
+	single: Profiler = Profiler()
+	try:
+		run(single, function, *args)
+	finally:
+		if session is not None:
+			session.merge(single)
+	return single
+
+
+def requested() -> bool:
+	"""
+		Tells whether the COMPUTORV2_PROFILE environment variable asks for profiling,
+		being set to anything but '0'.
+
+		Returns:
+			bool: Whether profiling was requested.
+	"""
+	return os.environ.get(ENVIRONMENT_FLAG, '0') not in ('', '0')
+
+
+def report(profiler: Profiler) -> None:
+	"""
+		Prints the summary of a session to standard error and, when the COMPUTORV2_PROFILE_JSON
+		environment variable names a file, writes it there as JSON.
+
+		Args:
+			profiler (Profiler): The counters of the session.
+	"""
+	if not profiler.lines:
+		return
+	print(f'profile summary:\n{profiler.summary()}', file=sys.stderr)
+	path: str | None = os.environ.get(JSON_FLAG)
+	if path:
+		import json
+		with open(path, 'w') as output:
+			json.dump(profiler.to_json(), output, indent='\t')
@@ -0,0 +1,165 @@
+from typing import Iterable, NamedTuple
+from expression import Node, parse_expression
+from functions import collect_names
+
+
+class Formula(NamedTuple):
+	"""
+		The expression a reactive variable was assigned.
+
+		Attributes:
+			source (str): The source of the expression.
+			node (Node): The parsed expression.
+	"""
+	source: str
+	node: Node
+
+
+class DependencyGraph:
+	"""
+		Records the formulas of reactive variables and which variables and functions
+		read which names, so a change only recomputes the variables downstream of it.
+	"""
+
+	def __init__(self, mode: str = 'float') -> None:
+		self.mode: str = mode
+		self.formulas: dict[str, Formula] = {}
+		self.reads: dict[str, frozenset[str]] = {}
+		self.dependents: dict[str, set[str]] = {}
+
+	def __contains__(self, name: str) -> bool:
+		return name in self.formulas
+
+	def __len__(self) -> int:
+		return len(self.formulas)
+
+	def record(self, name: str, source: str) -> Formula:
+		"""
+			Records the formula of a variable, replacing its previous one.
+
+			Args:
+				name (str): The variable name.
+				source (str): The expression assigned to the variable.
+
+			Returns:
+				Formula: The recorded formula.
+
+			Raises:
+				ExpressionError: If the expression cannot be parsed.
+				ValueError: If the formula would make the variable depend on itself.
+		"""
+		node: Node = parse_expression(source, self.mode)
+		self.link(name, collect_names(node, calls=True))
+		formula = Formula(source, node)
+		self.formulas[name] = formula
+		return formula
+
+	def link(self, name: str, reads: Iterable[str]) -> None:
+		"""
+			Records the names a variable or a function reads, replacing its previous links.
+
+			Args:
+				name (str): The variable or function name.
+				reads (Iterable[str]): The names it reads.
+
+			Raises:
+				ValueError: If the links would make the name depend on itself.
+		"""
+		reads = frozenset(reads)
+		if name in reads or not reads.isdisjoint(self.reachable([name])):
+			raise ValueError(f'circular dependency on \'{name}\'')
+		self.discard(name)
+		self.reads[name] = reads
+		for read in reads:
+			self.dependents.setdefault(read, set()).add(name)
+
+	def restore(self, name: str, reads: Iterable[str], formula: Formula | None = None) -> None:
+		"""
+			Puts back the links, and the formula if any, of a name from a saved session,
+			without checking for cycles again.
+
+			Args:
+				name (str): The variable or function name.
+				reads (Iterable[str]): The names it reads.
+				formula (Formula | None): The formula of a variable.
+		"""
+		self.discard(name)
+		self.reads[name] = frozenset(reads)
+		for read in self.reads[name]:
+			self.dependents.setdefault(read, set()).add(name)
+		if formula is not None:
+			self.formulas[name] = formula
+
+	def discard(self, name: str) -> None:
+		"""
+			Forgets the formula and links of a name, which keeps its current value from now on.
+
+			Args:
+				name (str): The variable or function name.
+		"""
+		self.formulas.pop(name, None)
+		for read in self.reads.pop(name, ()):
+			self.dependents[read].discard(name)
+
+	def clear(self) -> None:
+		self.formulas.clear()
+		self.reads.clear()
+		self.dependents.clear()
+
+	def set_mode(self, mode: str) -> None:
+		"""
+			Switches the number mode, re-parsing every formula so its literals follow the new mode.
+
+			Args:
+				mode (str): The new number mode.
+		"""
+		self.mode = mode
+		for name, formula in list(self.formulas.items()):
+			self.formulas[name] = formula._replace(node=parse_expression(formula.source, mode))
+
+	def reachable(self, names: Iterable[str]) -> set[str]:
+		"""
+			Collects the names that read one of the given names, directly or through other names.
+
+			Args:
+				names (Iterable[str]): The names to start from.
+
+			Returns:
+				set[str]: The names downstream of the given ones, which are excluded.
+		"""
+		changed: set[str] = set(names)
+		affected: set[str] = set()
+		pending: list[str] = list(changed)
+		while pending:
+			for dependent in self.dependents.get(pending.pop(), ()):
+				if dependent not in affected and dependent not in changed:
+					affected.add(dependent)
+					pending.append(dependent)
+		return affected
+
+	def downstream(self, names: Iterable[str]) -> list[str]:
+		"""
+			Lists the variables that must be recomputed after the given names changed,
+			each once, in an order where every variable comes after the ones it reads.
+			The work is proportional to the affected part of the graph, not to its size.
+
+			Args:
+				names (Iterable[str]): The changed variables and functions.
+
+			Returns:
+				list[str]: The affected variables in topological order, the changed names excluded.
+		"""
+		affected: set[str] = self.reachable(names)
+		waiting: dict[str, int] = {name: len(self.reads[name] & affected) for name in affected}
+		ready: list[str] = sorted((name for name, count in waiting.items() if count == 0), reverse=True)
+		order: list[str] = []
+		while ready:
+			name: str = ready.pop()
+			if name in self.formulas:
+				order.append(name)
+			for dependent in self.dependents.get(name, ()):
+				if dependent in waiting:
+					waiting[dependent] -= 1
+					if waiting[dependent] == 0:
+						ready.append(dependent)
+		return order
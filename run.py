@@ -1,30 +1,164 @@
 from computorv2 import *
+import computorv2
+import argparse
+import atexit
+import os
 import signal
+import profiling
+from history import HISTORY_SIZE, History
+from utils import lazy_import
+from contextlib import redirect_stdout
+
+batch = lazy_import('batch')
+server = lazy_import('server')
+
+BUFFER_SIZE: int = 1 << 16
 
 def signal_handler(sig, frame):
 	print('\n>> (interrupt) use \'quit\' or \'exit\' to exit.\n>> ', end='')
 
-signal.signal(signal.SIGINT, signal_handler)
+def run_batch(path: str) -> None:
+	"""
+		Runs a script line by line without prompts or history.
+		Results go through a buffered writer and errors report the script line they come from.
+
+		Args:
+			path (str): The script to run, or '-' to read the script from standard input.
+	"""
+	stream = sys.stdin if path == '-' else open(path, buffering=BUFFER_SIZE)
+	output = open(sys.stdout.fileno(), 'w', buffering=BUFFER_SIZE, closefd=False)
+	try:
+		with redirect_stdout(output):
+			for line_number, line in enumerate(stream, 1):
+				user_input: str = line.rstrip('\n')
+				if not user_input.strip():
+					continue
+				if user_input.strip() in ['exit', 'quit']:
+					break
+				computorv2.default.current_line = line_number
+				computorv2.default.process_variable_assignment(user_input)
+	finally:
+		computorv2.default.current_line = None
+		output.flush()
+		if stream is not sys.stdin:
+			stream.close()
+
+def run_parallel_batch(path: str, jobs: int) -> None:
+	"""
+		Runs a script with its independent lines spread over several processes.
+
+		Args:
+			path (str): The script to run, or '-' to read the script from standard input.
+			jobs (int): The number of worker processes.
+	"""
+	stream = sys.stdin if path == '-' else open(path, buffering=BUFFER_SIZE)
+	output = open(sys.stdout.fileno(), 'w', buffering=BUFFER_SIZE, closefd=False)
+	try:
+		batch.run_parallel(stream, jobs, output)
+	finally:
+		if stream is not sys.stdin:
+			stream.close()
+
+def print_history(history: History, argument: str) -> None:
+	"""
+		Prints the history, or with '/<pattern>' the entries containing the pattern.
+
+		Args:
+			history (History): The history of the session.
+			argument (str): What follows the 'history' command.
+	"""
+	entries: list[tuple[int, str]] = history.search(argument[1:]) if argument.startswith('/') else history.items()
+	for count, el in entries:
+		print(f'   {count}-> {el}')
+
+def expand_history(history: History, user_input: str) -> str | None:
+	"""
+		Expands '!<n>' to the entry numbered n and '!<prefix>' to the latest entry starting with the prefix.
 
-def main():
+		Args:
+			history (History): The history of the session.
+			user_input (str): The line starting with '!'.
+
+		Returns:
+			str | None: The entry to run, or None if there is none.
+	"""
+	event: str = user_input.strip()[1:]
+	entry: str | None = history.get(int(event)) if event.isdigit() else history.latest(event) if event else None
+	if entry is None:
+		computorv2.default.print_error_message(f'   Error {computorv2.default.error_index}: no history entry \'{event}\'')
+	return entry
+
+def main(history: History | None = None) -> None:
+	signal.signal(signal.SIGINT, signal_handler)
 	print('Welcome to Computorv2, the Python Calculator in command line!\n'
 		'To exit, type "exit" or "quit" and press Enter.')
-	history: list[str] = []
+	if history is None:
+		history = History()
+	if history.path:
+		atexit.register(history.close)
 	while True:
 		try:
 			user_input: str = input(">> ")
-			if user_input == 'history':
-				for count, el in enumerate(history):
-					print(f'   {count}-> {el}')
+			words: list[str] = user_input.split(maxsplit=1)
+			if words[:1] == ['history'] and (len(words) == 1 or words[1].startswith('/')):
+				print_history(history, words[1] if len(words) > 1 else '')
 				continue
-			history.append(user_input)
+			if user_input.lstrip().startswith('!'):
+				user_input = expand_history(history, user_input)
+				if user_input is None:
+					continue
+				print(f'   {user_input}')
 			if not user_input.strip():
 				continue
+			history.append(user_input)
 			if user_input in ['exit', 'quit']:
 				break
-			process_variable_assignment(user_input)
+			computorv2.default.process_variable_assignment(user_input)
 		except EOFError:
 			sys.exit('')
 
+def open_session(path: str) -> None:
+	"""
+		Loads the session file if it exists and saves the session back to it at exit.
+
+		Args:
+			path (str): The session snapshot file.
+	"""
+	if os.path.exists(path):
+		try:
+			computorv2.default.load_saved_session(path)
+		except (OSError, ValueError) as error:
+			sys.exit(f'computorv2: cannot load session \'{path}\': {error}')
+	atexit.register(close_session, path)
+
+def close_session(path: str) -> None:
+	try:
+		computorv2.default.save_current_session(path)
+	except (OSError, ValueError) as error:
+		print(f'computorv2: cannot save session \'{path}\': {error}', file=sys.stderr)
+
 if __name__ == '__main__':
-	main()
+	parser = argparse.ArgumentParser(description='Computorv2, the Python Calculator in command line.')
+	parser.add_argument('-f', '--file', metavar='SCRIPT', help='run a script non-interactively, \'-\' reads it from standard input')
+	parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1, help='evaluate independent lines of the script on N processes')
+	parser.add_argument('-s', '--session', metavar='FILE', help='load the session from FILE if it exists and save it there at exit')
+	parser.add_argument('--history', metavar='FILE', default=os.path.expanduser('~/.computorv2_history'), help='append the interactive history to FILE, \'\' to keep it in memory only')
+	parser.add_argument('--history-size', metavar='N', type=int, default=HISTORY_SIZE, help='entries of the history kept in memory')
+	parser.add_argument('--serve', metavar='ADDRESS', help='serve sessions over TCP (HOST:PORT, :PORT) or a Unix socket (a path)')
+	parser.add_argument('--workers', metavar='N', type=int, default=os.cpu_count() or 1, help='worker processes of the server, 0 to evaluate on the event loop')
+	parser.add_argument('--max-clients', metavar='N', type=int, default=256, help='clients served at once, more connections wait')
+	parser.add_argument('--pipeline', metavar='N', type=int, default=64, help='lines read ahead from a client before the server stops reading')
+	arguments = parser.parse_args()
+	if profiling.requested():
+		computorv2.default.enable_profiling()
+	if arguments.serve:
+		server.serve(arguments.serve, arguments.workers, arguments.max_clients, arguments.pipeline)
+		sys.exit()
+	if arguments.session:
+		open_session(arguments.session)
+	if arguments.file and arguments.jobs > 1:
+		run_parallel_batch(arguments.file, arguments.jobs)
+	elif arguments.file:
+		run_batch(arguments.file)
+	else:
+		main(History(arguments.history or None, max(arguments.history_size, 1)))
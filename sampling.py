@@ -0,0 +1,392 @@
+from __future__ import annotations
+import math
+import sys
+from decimal import Decimal
+from typing import Any, Callable, Iterator, NamedTuple, TextIO
+from functions import ExpandedFunction
+from matrix import Matrix
+from polynomial import Polynomial
+from utils import format_complex, format_real, lazy_import
+
+numpy = lazy_import('numpy')
+
+CHUNK_SIZE: int = 1 << 16
+GRID_SIZE: int = 10001
+MAX_ITERATIONS: int = 200
+EPSILON: float = sys.float_info.epsilon
+
+
+class Pole(ArithmeticError):
+	"""
+		Raised when a function divides by zero or is not finite at a point.
+	"""
+
+
+class Extremum(NamedTuple):
+	"""
+		A local extremum of a function.
+
+		Attributes:
+			kind (str): 'minimum' or 'maximum'.
+			x (float): Where the extremum is.
+			value (Any): The value of the function there.
+	"""
+	kind: str
+	x: float
+	value: Any
+
+
+def grid(start: float, stop: float, count: int, chunk: int = CHUNK_SIZE) -> Iterator[numpy.ndarray]:
+	"""
+		Splits 'count' evenly spaced points from start to stop, both included, into
+		chunks, computing each chunk only when it is needed.
+
+		Args:
+			start (float): The first point.
+			stop (float): The last point.
+			count (int): The number of points, at least 2.
+			chunk (int): The number of points in a chunk.
+
+		Returns:
+			Iterator[numpy.ndarray]: The chunks of points, in order.
+	"""
+	step: float = (stop - start) / (count - 1)
+	for first in range(0, count, chunk):
+		points: numpy.ndarray = start + step * numpy.arange(first, min(first + chunk, count), dtype=float)
+		if first + chunk >= count:
+			points[-1] = stop
+		yield points
+
+
+def evaluate_points(function: Callable[[Any], Any], points: numpy.ndarray) -> numpy.ndarray:
+	"""
+		Evaluates a compiled function on an array of points in one vectorized call.
+
+		Args:
+			function (Callable[[Any], Any]): The compiled function, a lambda or an ExpandedFunction.
+			points (numpy.ndarray): The points.
+
+		Returns:
+			numpy.ndarray: The value at every point, a float or complex array.
+
+		Raises:
+			ValueError: If the function does not return a number.
+	"""
+	try:
+		# poles give infinities and nans, which the callers deal with
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			values: Any = function(points)
+	except (ValueError, TypeError):
+		raise ValueError('the function does not return a number') from None
+	if isinstance(values, Matrix):
+		raise ValueError('the function does not return a number')
+	values = numpy.asarray(values)
+	if values.dtype == object:
+		# exact coefficients applied to float points
+		values = numpy.array(values.tolist())
+	if values.dtype.kind not in 'iufc':
+		raise ValueError('the function does not return a number')
+	return numpy.broadcast_to(values, points.shape) if values.shape != points.shape else values
+
+
+def decimal_points(function: Callable[[Any], Any]) -> Callable[[Any], Any]:
+	"""
+		Adapts a function compiled in decimal mode, whose constants are Decimals that do
+		not mix with floats, to float points: the points are passed as Decimals and
+		the values come back as floats.
+
+		Args:
+			function (Callable[[Any], Any]): The compiled function.
+
+		Returns:
+			Callable[[Any], Any]: The adapted function.
+	"""
+	def call(points: Any) -> Any:
+		if not isinstance(points, numpy.ndarray):
+			return float(function(Decimal(repr(points))))
+		values: Any = function(numpy.array([Decimal(repr(point)) for point in points.tolist()], dtype=object))
+		return numpy.asarray(values).astype(float)
+	call.__wrapped__ = function
+	return call
+
+
+def sample(function: Callable[[Any], Any], start: float, stop: float, count: int, chunk: int = CHUNK_SIZE) -> Iterator[tuple[numpy.ndarray, numpy.ndarray]]:
+	"""
+		Samples a function over a grid, one chunk at a time, so memory does not grow
+		with the number of points.
+
+		Args:
+			function (Callable[[Any], Any]): The compiled function.
+			start (float): The first point.
+			stop (float): The last point.
+			count (int): The number of points.
+			chunk (int): The number of points evaluated at once.
+
+		Returns:
+			Iterator[tuple[numpy.ndarray, numpy.ndarray]]: The points and values of every chunk.
+	"""
+	for points in grid(start, stop, count, chunk):
+		yield points, evaluate_points(function, points)
+
+
+def format_number(value: Any) -> str:
+	return format_complex(value) if isinstance(value, complex) else format_real(value)
+
+
+def write_text(chunks: Iterator[tuple[numpy.ndarray, numpy.ndarray]], stream: TextIO, name: str, csv: bool = False) -> None:
+	"""
+		Writes a table a chunk at a time, as '<name>(x) = y' lines, or as CSV with a header line.
+
+		Args:
+			chunks (Iterator[tuple[numpy.ndarray, numpy.ndarray]]): The sampled chunks.
+			stream (TextIO): Where to write.
+			name (str): The function name.
+			csv (bool): Whether to write CSV.
+	"""
+	if csv:
+		stream.write(f'x,{name}(x)\n')
+	for points, values in chunks:
+		if csv:
+			stream.write(''.join(f'{format_real(x)},{format_number(y)}\n' for x, y in zip(points.tolist(), values.tolist())))
+		else:
+			stream.write(''.join(f'   {name}({format_real(x)}) = {format_number(y)}\n' for x, y in zip(points.tolist(), values.tolist())))
+
+
+def write_binary(chunks: Iterator[tuple[numpy.ndarray, numpy.ndarray]], path: str, count: int) -> numpy.dtype:
+	"""
+		Writes a table as a 'count' x 2 array of (x, y) rows to a .npy file, or to a
+		raw binary file for any other extension, through a memory map filled a chunk
+		at a time. The entries are float64, or complex128 when the function returns
+		complex values.
+
+		Args:
+			chunks (Iterator[tuple[numpy.ndarray, numpy.ndarray]]): The sampled chunks.
+			path (str): The destination file.
+			count (int): The number of points.
+
+		Returns:
+			numpy.dtype: The type of the entries written.
+
+		Raises:
+			ValueError: If the function returns complex values after real ones.
+	"""
+	output: numpy.ndarray | None = None
+	row: int = 0
+	for points, values in chunks:
+		if output is None:
+			dtype: numpy.dtype = numpy.dtype(complex if values.dtype.kind == 'c' else float)
+			if path.endswith('.npy'):
+				output = numpy.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(count, 2))
+			else:
+				output = numpy.memmap(path, dtype=dtype, mode='w+', shape=(count, 2))
+		elif values.dtype.kind == 'c' and output.dtype.kind != 'c':
+			raise ValueError('the function returns complex values past the first points')
+		output[row:row + len(points), 0] = points
+		output[row:row + len(points), 1] = values
+		row += len(points)
+	output.flush()
+	return output.dtype
+
+
+def scalar(function: Callable[[Any], Any]) -> Callable[[float], float]:
+	"""
+		Wraps a compiled function so it takes and returns floats, for the refinement steps.
+
+		Args:
+			function (Callable[[Any], Any]): The compiled function.
+
+		Returns:
+			Callable[[float], float]: The wrapped function.
+
+		Raises:
+			ValueError: If the function returns a complex value.
+			Pole: If the function divides by zero or is not finite at the point.
+	"""
+	def call(x: float) -> float:
+		try:
+			value: Any = function(x)
+		except ZeroDivisionError:
+			raise Pole(f'the function has a pole at {x!r}') from None
+		if isinstance(value, complex):
+			raise ValueError('the function returns complex values')
+		value = float(value)
+		if not math.isfinite(value):
+			raise Pole(f'the function has a pole at {x!r}')
+		return value
+	return call
+
+
+def brent(function: Callable[[float], float], a: float, b: float, fa: float, fb: float) -> float:
+	"""
+		Brent's method: narrows a bracket holding a sign change of a function with
+		inverse quadratic interpolation or secant steps, falling back to bisection
+		whenever they do not shrink the bracket fast enough.
+
+		Args:
+			function (Callable[[float], float]): The function.
+			a (float): One end of the bracket.
+			b (float): The other end.
+			fa (float): The value at a.
+			fb (float): The value at b, of the opposite sign.
+
+		Returns:
+			float: The point where the function changes sign, to machine precision.
+	"""
+	if abs(fa) < abs(fb):
+		a, b, fa, fb = b, a, fb, fa
+	c, fc, d = a, fa, a
+	bisected: bool = True
+	for _ in range(MAX_ITERATIONS):
+		tolerance: float = 2 * EPSILON * max(abs(b), 1.0)
+		if fb == 0 or abs(b - a) <= tolerance:
+			break
+		if fa != fc and fb != fc:
+			s: float = (a * fb * fc / ((fa - fb) * (fa - fc)) + b * fa * fc / ((fb - fa) * (fb - fc))
+				+ c * fa * fb / ((fc - fa) * (fc - fb)))
+		else:
+			s = b - fb * (b - a) / (fb - fa)
+		low, high = sorted(((3 * a + b) / 4, b))
+		if (not low <= s <= high
+				or (bisected and abs(s - b) >= abs(b - c) / 2)
+				or (not bisected and abs(s - b) >= abs(c - d) / 2)
+				or (bisected and abs(b - c) < tolerance)
+				or (not bisected and abs(c - d) < tolerance)):
+			s = (a + b) / 2
+			bisected = True
+		else:
+			bisected = False
+		fs: float = function(s)
+		d, c, fc = c, b, fb
+		if (fa < 0) != (fs < 0):
+			b, fb = s, fs
+		else:
+			a, fa = s, fs
+		if abs(fa) < abs(fb):
+			a, b, fa, fb = b, a, fb, fa
+	return b
+
+
+def real_values(values: numpy.ndarray) -> numpy.ndarray:
+	if values.dtype.kind == 'c':
+		raise ValueError('the function returns complex values')
+	return values.astype(float, copy=False)
+
+
+def find_roots(function: Callable[[Any], Any], start: float, stop: float, count: int = GRID_SIZE, chunk: int = CHUNK_SIZE) -> Iterator[float]:
+	"""
+		Finds the roots of a real function on an interval. The grid is sampled a chunk
+		at a time and every sign change between two neighbouring points is refined
+		with Brent's method; a sign change where the function grows instead of
+		vanishing, or where the refinement lands on a pole, is left out. Roots closer together than the grid
+		spacing may be missed.
+
+		Args:
+			function (Callable[[Any], Any]): The compiled function.
+			start (float): The start of the interval.
+			stop (float): The end of the interval.
+			count (int): The number of grid points.
+			chunk (int): The number of points evaluated at once.
+
+		Returns:
+			Iterator[float]: The roots, in increasing order of the grid.
+
+		Raises:
+			ValueError: If the function does not return real numbers.
+	"""
+	call: Callable[[float], float] = scalar(function)
+	previous: tuple[numpy.ndarray, numpy.ndarray] | None = None
+	for points, values in sample(function, start, stop, count, chunk):
+		values = real_values(values)
+		new: int = 0
+		if previous is not None:
+			points, values = numpy.concatenate((previous[0], points)), numpy.concatenate((previous[1], values))
+			new = 1
+		changes: numpy.ndarray = numpy.flatnonzero(numpy.signbit(values[:-1]) != numpy.signbit(values[1:]))
+		zeros: set[int] = set(numpy.flatnonzero(values[new:] == 0) + new)
+		for index in sorted(zeros | set(changes.tolist())):
+			if index in zeros:
+				yield float(points[index])
+				continue
+			a, b, fa, fb = float(points[index]), float(points[index + 1]), float(values[index]), float(values[index + 1])
+			if fa == 0 or fb == 0 or not (numpy.isfinite(fa) and numpy.isfinite(fb)):
+				continue
+			try:
+				root: float = brent(call, a, b, fa, fb)
+				if abs(call(root)) <= max(abs(fa), abs(fb)):
+					yield root
+			except Pole:
+				continue
+		previous = (points[-1:], values[-1:])
+
+
+def derivative(function: Callable[[Any], Any]) -> Callable[[float], float]:
+	"""
+		Returns the derivative of a function: the exact one for a polynomial, also in
+		decimal mode, a central difference otherwise.
+
+		Args:
+			function (Callable[[Any], Any]): The compiled function.
+
+		Returns:
+			Callable[[float], float]: The derivative.
+	"""
+	inner: Callable[[Any], Any] = getattr(function, '__wrapped__', function)
+	if isinstance(inner, ExpandedFunction):
+		derived: Polynomial = inner.polynomial.derivative()
+		return scalar(derived if inner is function else decimal_points(derived))
+	call: Callable[[float], float] = scalar(function)
+
+	def slope(x: float) -> float:
+		step: float = EPSILON ** (1 / 3) * max(abs(x), 1.0)
+		return (call(x + step) - call(x - step)) / (2 * step)
+	return slope
+
+
+def find_extrema(function: Callable[[Any], Any], start: float, stop: float, count: int = GRID_SIZE, chunk: int = CHUNK_SIZE) -> Iterator[Extremum]:
+	"""
+		Finds the local extrema of a real function inside an interval. The grid is
+		sampled a chunk at a time; where the differences between neighbouring points
+		change sign, the root of the derivative is refined with Brent's method between
+		the two surrounding points. A turn around a pole, where the derivative keeps
+		its sign, is left out.
+
+		Args:
+			function (Callable[[Any], Any]): The compiled function.
+			start (float): The start of the interval.
+			stop (float): The end of the interval.
+			count (int): The number of grid points.
+			chunk (int): The number of points evaluated at once.
+
+		Returns:
+			Iterator[Extremum]: The extrema, in increasing order of the grid.
+
+		Raises:
+			ValueError: If the function does not return real numbers.
+	"""
+	slope: Callable[[float], float] = derivative(function)
+	previous: tuple[numpy.ndarray, numpy.ndarray] | None = None
+	for points, values in sample(function, start, stop, count, chunk):
+		values = real_values(values)
+		if previous is not None:
+			points, values = numpy.concatenate((previous[0], points)), numpy.concatenate((previous[1], values))
+		differences: numpy.ndarray = numpy.diff(values)
+		rising: numpy.ndarray = differences[:-1] > 0
+		falling: numpy.ndarray = differences[:-1] < 0
+		turns: numpy.ndarray = numpy.flatnonzero((rising & (differences[1:] < 0)) | (falling & (differences[1:] > 0)))
+		for index in turns.tolist():
+			if not numpy.isfinite(values[index:index + 3]).all():
+				continue
+			kind: str = 'maximum' if rising[index] else 'minimum'
+			a, b = float(points[index]), float(points[index + 2])
+			try:
+				fa, fb = slope(a), slope(b)
+				if fa == 0 or fb == 0:
+					x: float = a if fa == 0 else b
+				elif (fa < 0) != (fb < 0):
+					x = brent(slope, a, b, fa, fb)
+				else:
+					continue
+			except Pole:
+				continue
+			yield Extremum(kind, x, function(x))
+		previous = (points[-2:], values[-2:])
@@ -0,0 +1,247 @@
+import asyncio
+import io
+import os
+import signal
+import stat
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+from computorv2 import Interpreter
+
+MAX_LINE: int = 1 << 16
+PIPELINE_DEPTH: int = 64
+BATCH_SIZE: int = 32
+MAX_CLIENTS: int = 256
+# commands that touch the server's files or the whole worker process
+RESTRICTED_COMMANDS: set[str] = {'import', 'export', 'save', 'load', 'profile', 'table', 'budget'}
+
+# the sessions held by this process, by client id
+sessions: dict[int, Interpreter] = {}
+
+
+def evaluate_line(interpreter: Interpreter, user_input: str) -> str:
+	"""
+		Runs one line in a session and captures what it prints.
+
+		Args:
+			interpreter (Interpreter): The session of the client.
+			user_input (str): The line to run.
+
+		Returns:
+			str: The output and error messages of the line, in the order they were printed.
+	"""
+	output: io.StringIO = io.StringIO()
+	interpreter.output = interpreter.errors = output
+	words: list[str] = user_input.split()
+	if words[:1] and words[0] in RESTRICTED_COMMANDS and words[1:2] != ['=']:
+		interpreter.print_error_message(f'   Error {interpreter.error_index}: \'{words[0]}\' is not available on the server')
+	elif words:
+		interpreter.process_variable_assignment(user_input)
+	return output.getvalue()
+
+
+def run_session_lines(client: int, lines: list[str]) -> list[str]:
+	"""
+		Worker entry point: runs lines in the session of a client, which stays in
+		this process between calls.
+
+		Args:
+			client (int): The client id.
+			lines (list[str]): The lines to run, in order.
+
+		Returns:
+			list[str]: The captured output of every line.
+	"""
+	interpreter: Interpreter = sessions.setdefault(client, Interpreter())
+	return [evaluate_line(interpreter, line) for line in lines]
+
+
+def close_session(client: int) -> None:
+	sessions.pop(client, None)
+
+
+def ignore_interrupts() -> None:
+	# an interrupt stops the server, which then shuts the workers down itself
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def frame(output: str) -> bytes:
+	"""
+		Encodes the response to one line: the lines it printed, a leading '.' doubled,
+		then a line holding a single '.', so pipelined responses can be told apart.
+
+		Args:
+			output (str): The captured output of the line.
+
+		Returns:
+			bytes: The encoded response.
+	"""
+	lines: list[str] = [f'.{line}' if line.startswith('.') else line for line in output.splitlines()]
+	return ''.join(f'{line}\n' for line in (*lines, '.')).encode()
+
+
+class Server:
+	"""
+		Line-protocol server giving every connection its own session.
+
+		Each session is an Interpreter living in one worker process for its whole life, so a line only
+		ships its text to the worker and its output back, never the session. Workers
+		are single-process pools, the least loaded one taking each new client; with
+		no workers, lines run on the event loop. A client may send lines without
+		waiting for the responses: up to 'depth' lines are read ahead, then the
+		server stops reading from it until they are answered, and lines waiting
+		together go to the worker in one batch.
+	"""
+
+	def __init__(self, workers: int, max_clients: int = MAX_CLIENTS, depth: int = PIPELINE_DEPTH) -> None:
+		self.executors: list[Executor] = [self.start_worker() for _ in range(workers)]
+		# held while a worker is replaced, so the clients that find it dead restart it once
+		self.restarts: list[asyncio.Lock] = [asyncio.Lock() for _ in range(workers)]
+		self.clients: list[int] = [0] * workers
+		self.slots: asyncio.Semaphore = asyncio.Semaphore(max_clients)
+		self.depth: int = depth
+		self.next_client: int = 0
+
+	@staticmethod
+	def start_worker() -> Executor:
+		executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=1, initializer=ignore_interrupts)
+		executor.submit(int).result()
+		return executor
+
+	def shutdown(self) -> None:
+		for executor in self.executors:
+			executor.shutdown(cancel_futures=True)
+
+	async def call(self, worker: int | None, function: Callable[..., Any], *args: Any) -> Any:
+		if worker is None:
+			return function(*args)
+		return await asyncio.get_running_loop().run_in_executor(self.executors[worker], function, *args)
+
+	async def run(self, worker: int | None, client: int, lines: list[str]) -> list[str]:
+		"""
+			Runs lines in the session of a client. When the worker died, the first client
+			to notice replaces it and shuts the broken pool down, and every client of the
+			worker is told its session was lost.
+
+			Args:
+				worker (int | None): The worker holding the session, None for the event loop.
+				client (int): The client id.
+				lines (list[str]): The lines to run.
+
+			Returns:
+				list[str]: The captured output of every line.
+		"""
+		executor: Executor | None = None if worker is None else self.executors[worker]
+		try:
+			return await self.call(worker, run_session_lines, client, lines)
+		except BrokenProcessPool:
+			async with self.restarts[worker]:
+				if self.executors[worker] is executor:
+					executor.shutdown(wait=False, cancel_futures=True)
+					self.executors[worker] = await asyncio.get_running_loop().run_in_executor(None, self.start_worker)
+			return ['   Error: the worker stopped, the session was reset\n'] * len(lines)
+
+	async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		async with self.slots:
+			client: int = self.next_client
+			self.next_client += 1
+			worker: int | None = self.clients.index(min(self.clients)) if self.clients else None
+			if worker is not None:
+				self.clients[worker] += 1
+			queue: asyncio.Queue[str | None] = asyncio.Queue(self.depth)
+			evaluator: asyncio.Task[None] = asyncio.create_task(self.evaluate(worker, client, queue, writer))
+			overflow: bool = False
+			try:
+				while True:
+					try:
+						line: bytes = await reader.readline()
+					except ValueError:
+						overflow = True
+						break
+					except ConnectionError:
+						break
+					if not line:
+						break
+					user_input: str = line.decode(errors='replace').rstrip('\r\n')
+					if user_input.strip() in ('exit', 'quit'):
+						break
+					await queue.put(user_input)
+			finally:
+				await queue.put(None)
+				await evaluator
+				await self.call(worker, close_session, client)
+				if overflow:
+					writer.write(frame(f'   Error: line longer than {MAX_LINE} bytes'))
+				if worker is not None:
+					self.clients[worker] -= 1
+				writer.close()
+				try:
+					await writer.wait_closed()
+				except ConnectionError:
+					pass
+
+	async def evaluate(self, worker: int | None, client: int, queue: 'asyncio.Queue[str | None]', writer: asyncio.StreamWriter) -> None:
+		"""
+			Answers the lines of a client in order until the end marker, batching the
+			lines that are already waiting. Once the client stops reading, the remaining
+			lines still run so the session stays consistent, but nothing more is sent.
+
+			Args:
+				worker (int | None): The worker holding the session.
+				client (int): The client id.
+				queue (asyncio.Queue[str | None]): The lines read from the client, None marking the end.
+				writer (asyncio.StreamWriter): The connection to answer on.
+		"""
+		connected: bool = True
+		while True:
+			lines: list[str | None] = [await queue.get()]
+			while lines[-1] is not None and len(lines) < BATCH_SIZE and not queue.empty():
+				lines.append(queue.get_nowait())
+			finished: bool = lines[-1] is None
+			pending: list[str] = [line for line in lines if line is not None]
+			if pending:
+				responses: list[str] = await self.run(worker, client, pending)
+				if connected:
+					try:
+						writer.write(b''.join(frame(response) for response in responses))
+						await writer.drain()
+					except ConnectionError:
+						connected = False
+			if finished:
+				return
+
+
+async def listen(address: str, server: Server) -> None:
+	if ':' in address:
+		host, port = address.rsplit(':', 1)
+		listener: asyncio.base_events.Server = await asyncio.start_server(server.handle, host or None, int(port), limit=MAX_LINE)
+	else:
+		listener = await asyncio.start_unix_server(server.handle, address, limit=MAX_LINE)
+	names: str = ', '.join(str(socket.getsockname()) for socket in listener.sockets)
+	print(f'computorv2: listening on {names}', file=sys.stderr, flush=True)
+	async with listener:
+		await listener.serve_forever()
+
+
+def serve(address: str, workers: int = os.cpu_count() or 1, max_clients: int = MAX_CLIENTS, depth: int = PIPELINE_DEPTH) -> None:
+	"""
+		Serves sessions over TCP ('host:port', ':port' for every interface) or a Unix
+		socket (a path), until interrupted.
+
+		Args:
+			address (str): Where to listen.
+			workers (int): The number of worker processes, 0 to run lines on the event loop.
+			max_clients (int): The number of clients served at once; more connections wait for a free slot.
+			depth (int): The number of lines read ahead from a client before the server stops reading.
+	"""
+	# the workers are forked before the event loop exists
+	server: Server = Server(workers, max_clients, depth)
+	try:
+		asyncio.run(listen(address, server))
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.shutdown()
+		if ':' not in address and os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+			os.unlink(address)
@@ -0,0 +1,385 @@
+from __future__ import annotations
+import io
+import numbers
+import os
+import struct
+import tempfile
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, BinaryIO, NamedTuple
+from expression import DEFAULT_PRECISION, BinaryOp, Call, MatrixLiteral, Name, Node, Number, Range, UnaryOp
+from functions import ExpandedFunction, FunctionDefinition, FunctionTable
+from matrix import CHUNK_BYTES, Matrix
+from polynomial import Polynomial
+from reactive import DependencyGraph, Formula
+from utils import lazy_import
+
+numpy = lazy_import('numpy')
+
+MAGIC: bytes = b'CV2S'
+VERSION: int = 2
+ALIGNMENT: int = 64
+HEADER: struct.Struct = struct.Struct('<4sBQ')
+INT64: struct.Struct = struct.Struct('<q')
+FLOAT64: struct.Struct = struct.Struct('<d')
+UINT32: struct.Struct = struct.Struct('<I')
+UINT64: struct.Struct = struct.Struct('<Q')
+
+# tag written before each expression tree node
+NODE_TAGS: dict[bytes, type] = {b'N': Number, b'V': Name, b'U': UnaryOp, b'B': BinaryOp, b'C': Call, b'R': Range, b'M': MatrixLiteral}
+
+
+class Snapshot(NamedTuple):
+	"""
+		A session read back from a snapshot file.
+
+		Attributes:
+			mode (str): The number mode.
+			reactive (bool): Whether reactive mode was on.
+			variables (dict[str, Any]): The variables, in their original order; matrices are mapped on the file.
+			functions (list[tuple[str, FunctionDefinition, Polynomial | None]]): The function definitions with their expanded form, if any.
+			links (list[tuple[str, frozenset[str], Formula | None]]): The reactive graph, the names each name reads and its formula.
+			precision (int): The significant digits of decimal mode.
+	"""
+	mode: str
+	reactive: bool
+	variables: dict[str, Any]
+	functions: list[tuple[str, FunctionDefinition, Polynomial | None]]
+	links: list[tuple[str, frozenset[str], Formula | None]]
+	precision: int = DEFAULT_PRECISION
+
+
+class Writer:
+	"""
+		Encodes a session: the metadata is built in memory while array buffers are
+		written straight to the file, each at an aligned offset so it can be mapped back.
+	"""
+
+	def __init__(self, output: BinaryIO) -> None:
+		self.output: BinaryIO = output
+		self.metadata: io.BytesIO = io.BytesIO()
+
+	def write(self, data: bytes) -> None:
+		self.metadata.write(data)
+
+	def count(self, value: int) -> None:
+		self.write(UINT32.pack(value))
+
+	def string(self, value: str) -> None:
+		data: bytes = value.encode()
+		self.count(len(data))
+		self.write(data)
+
+	def integer(self, value: int) -> None:
+		if -(1 << 63) <= value < 1 << 63:
+			self.write(b'i' + INT64.pack(value))
+		else:
+			data: bytes = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+			self.write(b'I')
+			self.count(len(data))
+			self.write(data)
+
+	def value(self, value: Any) -> None:
+		"""
+			Encodes a variable value or a numeric literal. Numbers keep their type,
+			matrices and arrays are written as raw buffers.
+
+			Args:
+				value (Any): The value to encode.
+
+			Raises:
+				ValueError: If the value has no encoding.
+		"""
+		if isinstance(value, str):
+			self.write(b's')
+			self.string(value)
+		elif isinstance(value, Decimal):
+			# the digits as written, so nothing is rounded
+			self.write(b'd')
+			self.string(str(value))
+		elif isinstance(value, Fraction):
+			self.write(b'q')
+			self.integer(value.numerator)
+			self.integer(value.denominator)
+		elif isinstance(value, numbers.Integral):
+			self.integer(int(value))
+		elif isinstance(value, numbers.Real):
+			self.write(b'f' + FLOAT64.pack(float(value)))
+		elif isinstance(value, numbers.Complex):
+			self.write(b'c' + FLOAT64.pack(value.real) + FLOAT64.pack(value.imag))
+		elif isinstance(value, Matrix | numpy.ndarray):
+			self.array(value.array if isinstance(value, Matrix) else value, isinstance(value, Matrix))
+		else:
+			raise ValueError(f'cannot save a value of type {type(value).__name__}')
+
+	def array(self, array: numpy.ndarray, matrix: bool) -> None:
+		if array.dtype.hasobject:
+			raise ValueError('cannot save an array of objects')
+		position: int = self.output.tell()
+		offset: int = -position % ALIGNMENT + position
+		self.output.write(bytes(offset - position))
+		rows: int = max(1, CHUNK_BYTES // max(1, array.itemsize * (array.size // max(1, len(array)))))
+		for start in range(0, len(array), rows):
+			self.output.write(numpy.ascontiguousarray(array[start:start + rows]).tobytes())
+		self.write(b'A' + bytes([matrix, array.ndim]))
+		self.string(array.dtype.str)
+		for dimension in array.shape:
+			self.write(UINT64.pack(dimension))
+		self.write(UINT64.pack(offset))
+
+	def node(self, node: Node) -> None:
+		"""
+			Encodes an expression tree in prefix order, iteratively so long chains do not exhaust the stack.
+
+			Args:
+				node (Node): The root of the tree.
+		"""
+		pending: list[Node] = [node]
+		while pending:
+			current: Node = pending.pop()
+			if isinstance(current, Number):
+				self.write(b'N')
+				self.value(current.value)
+			elif isinstance(current, Name):
+				self.write(b'V')
+				self.string(current.name)
+			elif isinstance(current, UnaryOp):
+				self.write(b'U')
+				self.string(current.operator)
+				pending.append(current.operand)
+			elif isinstance(current, BinaryOp):
+				self.write(b'B')
+				self.string(current.operator)
+				pending.extend((current.right, current.left))
+			elif isinstance(current, Call):
+				self.write(b'C')
+				self.string(current.name)
+				pending.append(current.argument)
+			elif isinstance(current, Range):
+				self.write(b'R')
+				pending.extend(reversed(current))
+			else:
+				self.write(b'M')
+				self.count(len(current.rows))
+				self.count(len(current.rows[0]) if current.rows else 0)
+				pending.extend(reversed([entry for row in current.rows for entry in row]))
+
+	def names(self, names: frozenset[str]) -> None:
+		self.count(len(names))
+		for name in sorted(names):
+			self.string(name)
+
+
+class Reader:
+	"""
+		Decodes the metadata of a session; arrays are mapped on the file, not read.
+	"""
+
+	def __init__(self, path: str, metadata: bytes) -> None:
+		self.path: str = path
+		self.data: memoryview = memoryview(metadata)
+		self.position: int = 0
+
+	def read(self, size: int) -> memoryview:
+		data: memoryview = self.data[self.position:self.position + size]
+		self.position += size
+		return data
+
+	def count(self) -> int:
+		return UINT32.unpack(self.read(UINT32.size))[0]
+
+	def string(self) -> str:
+		return bytes(self.read(self.count())).decode()
+
+	def value(self) -> Any:
+		tag: bytes = bytes(self.read(1))
+		if tag == b'i':
+			return INT64.unpack(self.read(INT64.size))[0]
+		elif tag == b'I':
+			return int.from_bytes(self.read(self.count()), 'little', signed=True)
+		elif tag == b'f':
+			return FLOAT64.unpack(self.read(FLOAT64.size))[0]
+		elif tag == b'c':
+			return complex(*struct.unpack('<2d', self.read(2 * FLOAT64.size)))
+		elif tag == b'd':
+			return Decimal(self.string())
+		elif tag == b'q':
+			return Fraction(self.value(), self.value())
+		elif tag == b's':
+			return self.string()
+		elif tag == b'A':
+			matrix, dimensions = self.read(2)
+			dtype: numpy.dtype = numpy.dtype(self.string())
+			shape: tuple[int, ...] = tuple(UINT64.unpack(self.read(UINT64.size))[0] for _ in range(dimensions))
+			offset: int = UINT64.unpack(self.read(UINT64.size))[0]
+			array: numpy.ndarray = numpy.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape) if all(shape) else numpy.empty(shape, dtype)
+			return Matrix(array) if matrix else array
+		raise ValueError(f'unknown value tag {tag!r}')
+
+	def node(self) -> Node:
+		"""
+			Decodes an expression tree written by Writer.node.
+
+			Returns:
+				Node: The root of the tree.
+		"""
+		# each frame: node type, payload, number of children still expected, children read so far
+		frames: list[tuple[type, Any, int, list[Node]]] = []
+		while True:
+			tag: bytes = bytes(self.read(1))
+			kind: type = NODE_TAGS[tag]
+			node: Node | None = None
+			if kind is Number:
+				node = Number(self.value())
+			elif kind is Name:
+				node = Name(self.string())
+			elif kind is UnaryOp or kind is BinaryOp or kind is Call:
+				frames.append((kind, self.string(), 1 if kind is not BinaryOp else 2, []))
+			elif kind is Range:
+				frames.append((kind, None, 3, []))
+			else:
+				rows, columns = self.count(), self.count()
+				frames.append((kind, columns, rows * columns, []))
+				if not rows * columns:
+					node = MatrixLiteral(())
+					frames.pop()
+
+			while node is not None:
+				if not frames:
+					return node
+				kind, payload, expected, children = frames[-1]
+				children.append(node)
+				node = None
+				if len(children) == expected:
+					frames.pop()
+					if kind is Range:
+						node = Range(*children)
+					elif kind is MatrixLiteral:
+						node = MatrixLiteral(tuple(tuple(children[start:start + payload]) for start in range(0, len(children), payload)))
+					else:
+						node = kind(payload, *children)
+
+	def names(self) -> frozenset[str]:
+		return frozenset(self.string() for _ in range(self.count()))
+
+
+def save_session(path: str, variables: dict[str, Any], functions: FunctionTable, graph: DependencyGraph, mode: str, reactive: bool, precision: int = DEFAULT_PRECISION) -> None:
+	"""
+		Writes a session snapshot. The file is written next to its destination and
+		renamed over it, so matrices mapped on a previous snapshot stay valid.
+
+		Args:
+			path (str): The snapshot file.
+			variables (dict[str, Any]): The session variables.
+			functions (FunctionTable): The session functions.
+			graph (DependencyGraph): The reactive graph.
+			mode (str): The number mode.
+			reactive (bool): Whether reactive mode is on.
+			precision (int): The significant digits of decimal mode.
+
+		Raises:
+			ValueError: If a variable holds a value that cannot be saved.
+			OSError: If the file cannot be written.
+	"""
+	descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+	try:
+		with os.fdopen(descriptor, 'wb') as output:
+			output.write(HEADER.pack(MAGIC, VERSION, 0))
+			writer = Writer(output)
+			writer.string(mode)
+			writer.write(bytes([reactive]))
+			writer.count(precision)
+
+			writer.count(len(variables))
+			for name, value in variables.items():
+				writer.string(name)
+				writer.value(value)
+
+			writer.count(len(functions.definitions))
+			for name, definition in functions.definitions.items():
+				writer.string(name)
+				writer.string(definition.parameter)
+				writer.string(definition.body)
+				writer.node(definition.node)
+				writer.names(definition.dependencies)
+				writer.names(definition.calls)
+				compiled: Any = functions.compiled.get(name)
+				expanded: Polynomial | None = compiled.polynomial if isinstance(compiled, ExpandedFunction) else None
+				writer.write(bytes([expanded is not None]))
+				if expanded is not None:
+					writer.count(len(expanded.terms))
+					for exponent, coefficient in expanded.terms.items():
+						writer.integer(exponent)
+						writer.value(coefficient)
+
+			writer.count(len(graph.reads))
+			for name, reads in graph.reads.items():
+				writer.string(name)
+				writer.names(reads)
+				formula: Formula | None = graph.formulas.get(name)
+				writer.write(bytes([formula is not None]))
+				if formula is not None:
+					writer.string(formula.source)
+					writer.node(formula.node)
+
+			metadata_offset: int = output.tell()
+			output.write(writer.metadata.getvalue())
+			output.seek(0)
+			output.write(HEADER.pack(MAGIC, VERSION, metadata_offset))
+		os.replace(temporary, path)
+	except BaseException:
+		os.unlink(temporary)
+		raise
+
+
+def load_session(path: str) -> Snapshot:
+	"""
+		Reads a session snapshot. Only the metadata is read: matrices and arrays are
+		mapped on the file and paged in when used, and function bodies come back as
+		parsed trees, compiled on their first call.
+
+		Args:
+			path (str): The snapshot file.
+
+		Returns:
+			Snapshot: The saved session.
+
+		Raises:
+			ValueError: If the file is not a session snapshot.
+			OSError: If the file cannot be read.
+	"""
+	with open(path, 'rb') as stream:
+		magic, version, metadata_offset = HEADER.unpack(stream.read(HEADER.size).ljust(HEADER.size, b'\0'))
+		if magic != MAGIC or version != VERSION:
+			raise ValueError(f'\'{path}\' is not a session snapshot')
+		stream.seek(metadata_offset)
+		reader = Reader(path, stream.read())
+
+	mode: str = reader.string()
+	reactive: bool = bool(reader.read(1)[0])
+	precision: int = reader.count()
+	variables: dict[str, Any] = {}
+	for _ in range(reader.count()):
+		name: str = reader.string()
+		variables[name] = reader.value()
+
+	functions: list[tuple[str, FunctionDefinition, Polynomial | None]] = []
+	for _ in range(reader.count()):
+		name = reader.string()
+		definition = FunctionDefinition(reader.string(), reader.string(), reader.node(), reader.names(), reader.names())
+		polynomial: Polynomial | None = None
+		if reader.read(1)[0]:
+			terms: dict[int, Any] = {}
+			for _ in range(reader.count()):
+				exponent: int = reader.value()
+				terms[exponent] = reader.value()
+			polynomial = Polynomial(terms)
+		functions.append((name, definition, polynomial))
+
+	links: list[tuple[str, frozenset[str], Formula | None]] = []
+	for _ in range(reader.count()):
+		name = reader.string()
+		reads: frozenset[str] = reader.names()
+		formula: Formula | None = Formula(reader.string(), reader.node()) if reader.read(1)[0] else None
+		links.append((name, reads, formula))
+	return Snapshot(mode, reactive, variables, functions, links, precision)
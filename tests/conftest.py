@@ -0,0 +1,41 @@
+import io
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from computorv2 import Interpreter
+
+
+class Session:
+	"""
+		An interpreter whose results and errors are collected in memory.
+	"""
+
+	def __init__(self) -> None:
+		self.interpreter: Interpreter = Interpreter(io.StringIO(), io.StringIO())
+
+	def run(self, *lines: str) -> tuple[list[str], list[str]]:
+		"""
+			Runs lines and returns what they printed.
+
+			Args:
+				lines (str): The lines to run.
+
+			Returns:
+				tuple[list[str], list[str]]: The result lines and the error lines, stripped.
+		"""
+		output, errors = self.interpreter.output, self.interpreter.errors
+		output.seek(0)
+		output.truncate()
+		errors.seek(0)
+		errors.truncate()
+		for line in lines:
+			self.interpreter.process_variable_assignment(line)
+		return [line.strip() for line in output.getvalue().splitlines()], [line.strip() for line in errors.getvalue().splitlines()]
+
+
+@pytest.fixture
+def session() -> Session:
+	return Session()
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''a = 2
+b = a * 3
+f(x) = x ^ 2 + a
+g(x) = f(x) * 2
+f(b)
+g(1)
+c = 1 2
+d = [[1,2];[3,4]]
+e = d ** d
+h(x) = 5
+h([0..3])
+variables
+mode exact
+p = 1/3 + b
+q = p * 3
+f(x) = x ^ 3
+f(p)
+reactive on
+r = q + 1
+q = 10
+r
+reactive off
+mode float
+s = 1 / 0
+t(x) = x / (x - 0.5)
+roots t -1 1 100
+u = 2 ^ 9999999
+v = b + a
+'''
+
+
+def run(path: str, *arguments: str) -> subprocess.CompletedProcess:
+	return subprocess.run([sys.executable, 'run.py', '-f', path, *arguments], cwd=ROOT, capture_output=True, text=True, timeout=120)
+
+
+@pytest.mark.parametrize('jobs', ['2', '3'])
+def test_parallel_run_matches_serial_run(tmp_path, jobs):
+	path = tmp_path / 'script.txt'
+	path.write_text(SCRIPT)
+	serial, parallel = run(str(path)), run(str(path), '-j', jobs)
+	assert serial.returncode == parallel.returncode == 0
+	assert serial.stdout and serial.stderr
+	assert parallel.stdout == serial.stdout
+	assert parallel.stderr == serial.stderr
+
+
+def test_batch_prints_results_without_prompts_and_numbers_errors_by_script_line(tmp_path):
+	path = tmp_path / 'script.txt'
+	path.write_text('a = 2\n\nb = a +\nc = a * 4\nexit\nd = 5\n')
+	result = run(str(path))
+	assert result.returncode == 0
+	assert result.stdout == '   2\n   8\n'
+	assert result.stderr == '   Error 0: syntax error (line 3)\n'
+
+
+def test_batch_reads_the_script_from_standard_input():
+	result = subprocess.run([sys.executable, 'run.py', '-f', '-'], cwd=ROOT, input='a = 3\nb = a ^ 2\n', capture_output=True, text=True, timeout=120)
+	assert result.returncode == 0
+	assert result.stdout == '   3\n   9\n'
+	assert not result.stderr
@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def suite(*arguments: str) -> subprocess.CompletedProcess:
+	return subprocess.run([sys.executable, 'benchmarks/suite.py', '-s', '0.01', '-r', '1', *arguments], cwd=ROOT, capture_output=True, text=True, timeout=300)
+
+
+def test_every_benchmark_is_listed():
+	result = suite('--list')
+	assert result.returncode == 0
+	names = result.stdout.split()
+	for path in ['operator_chain', 'nested_parentheses', 'complex_numbers', 'matrix_product_8', 'function_define', 'function_call', 'reduced_form', 'solve_polynomial', 'end_to_end']:
+		assert path in names
+
+
+def test_saved_baseline_is_compared_and_regressions_fail(tmp_path):
+	path = tmp_path / 'baseline.json'
+	result = suite('-k', 'reduced_form', '-k', 'function_call', '--save', str(path))
+	assert result.returncode == 0
+	baseline = json.loads(path.read_text())
+	assert set(baseline['results']) == {'reduced_form', 'function_call', 'function_call_hot'}
+	assert all(entry['lines'] > 0 and entry['lines_per_second'] > 0 for entry in baseline['results'].values())
+
+	assert suite('-k', 'reduced_form', '--compare', str(path), '--threshold', '1e9').returncode == 0
+	baseline['results']['reduced_form']['lines_per_second'] *= 1e9
+	path.write_text(json.dumps(baseline))
+	regressed = suite('-k', 'reduced_form', '--compare', str(path))
+	assert regressed.returncode == 1
+	assert 'reduced_form' in regressed.stdout and '!' in regressed.stdout
@@ -0,0 +1,37 @@
+def test_polynomial_expansion_stops_at_the_time_budget(session):
+	output, errors = session.run('budget time 0.5', 'f(x) = (x + 3) ^ 2000', 'f(1)')
+	assert errors[0] == 'Error 0: the line took more than its time budget of 0.5 s'
+	assert 'f' not in session.interpreter.variables
+
+
+def test_polynomial_expansion_is_checked_against_the_memory_budget(session):
+	output, errors = session.run('budget memory 0.1', 'f(x) = (x + 3) ^ 2000')
+	assert errors == ['Error 0: the result would take about 1.431 MiB, more than the memory budget of 102.4 KiB']
+
+
+def test_polynomial_expansion_within_the_budget(session):
+	output, errors = session.run('f(x) = (x + 1) ^ 3', 'f(1)')
+	assert output == ['x ^ 3 + 3 * x ^ 2 + 3 * x + 1', '8']
+	assert not errors
+
+
+def test_power_stops_at_the_time_budget(session):
+	output, errors = session.run('budget time 0.5', '3 ^ 9999999')
+	assert errors == ['Error 0: the line took more than its time budget of 0.5 s']
+
+
+def test_range_larger_than_the_memory_budget_is_rejected(session):
+	output, errors = session.run('[0..1e12]')
+	assert errors == ['Error 0: the result would take about 7451 GiB, more than the memory budget of 1 GiB']
+
+
+def test_unprintable_result_is_not_assigned(session):
+	output, errors = session.run('a = 2 ^ 9999999', 'variables')
+	assert output == []
+	assert errors == ['Error 0: the result has about 3010300 digits, more than the 4300 that can be printed']
+
+
+def test_budget_command(session):
+	output, errors = session.run('budget', 'budget time 2', 'budget memory 64', 'budget time off', 'budget off', 'budget nope')
+	assert output == ['time 10 s, memory 1 GiB', 'time 2 s, memory 1 GiB', 'time 2 s, memory 64 MiB', 'time off, memory 64 MiB', 'time off, memory off']
+	assert errors == ['Error 0: use \'budget off\', \'budget time <seconds>|off\' or \'budget memory <MiB>|off\'']
@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize('name', ['mode', 'cache', 'reactive', 'precision', 'time', 'profile', 'budget'])
+def test_command_names_can_be_assigned(session, name):
+	output, errors = session.run(f'{name} = 2', 'variables')
+	assert output == ['2', f'{name}-> 2']
+	assert not errors
+
+
+def test_mode_command_still_switches_modes(session):
+	output, errors = session.run('mode exact', '1/3 + 1/6')
+	assert output == ['exact', '1/2']
+	assert not errors
+
+
+def test_stored_numbers_follow_mode_switches_back_and_forth(session):
+	output, errors = session.run('mode exact', 'a = 1/3', 'mode float', 'a', 'b = a * 3', 'mode exact', 'c = 1/4', 'mode decimal', 'c', 'mode float', 'c')
+	assert output == ['exact', '1/3', 'float', '0.3333333333333333', '1.0', 'exact', '1/4', 'decimal', '0.25', 'float', '0.25']
+	assert not errors
@@ -0,0 +1,38 @@
+import pytest
+
+from utils import format_complex
+
+
+@pytest.mark.parametrize('line, result', [
+	('(3 - 4i) * i = ?', '4 + 3i'),
+	('(3 - 4i) / (4 + 3i) = ?', '-i'),
+	('i ^ 2 = ?', '-1'),
+	('(3 - 4i) ^ 2 = ?', '-7 - 24i'),
+	('(1 + i) * (1 - i) = ?', '2'),
+	('-2.5i = ?', '-2.5i'),
+	('3i - 3i = ?', '0'),
+])
+def test_complex_arithmetic(session, line, result):
+	assert session.run(line) == ([result], [])
+
+
+def test_complex_variables_are_stored_as_numbers(session):
+	assert session.run('z = 3 - 4i', 'y = z', 'z = 1', 'y * i = ?') == (['3 - 4i', '3 - 4i', '1', '4 + 3i'], [])
+	assert session.interpreter.variables['y'] == 3 - 4j
+
+
+def test_complex_values_in_functions(session):
+	output, errors = session.run('z = 3 - 4i', 'f(x) = x * i + 1', 'f(z) = ?', 'table f 0 2 3')
+	assert output[2:] == ['5 + 3i', 'f(0) = 1', 'f(1) = 1 + i', 'f(2) = 1 + 2i']
+	assert not errors
+
+
+def test_complex_values_in_matrices(session):
+	output, errors = session.run('m = [[1, i];[3 - 4i, 0]]', 'm ** m', 'm * 2i')
+	assert output[2:] == ['[ 5 + 3i , i ]', '[ 3 - 4i , 4 + 3i ]', '[ 2i , -2 ]', '[ 8 + 6i , 0 ]']
+	assert not errors
+
+
+@pytest.mark.parametrize('number, text', [(3 - 2.5j, '3 - 2.5i'), (-1j, '-i'), (1j, 'i'), (4 + 0j, '4'), (0.1 + 0.2j, '0.1 + 0.2i')])
+def test_complex_formatting(number, text):
+	assert format_complex(number) == text
@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.mark.parametrize('line', ['q = 3 + 2i', 'r = 1.5 * i', 'f(x) = x + i', 'i'])
+def test_complex_literals_are_rejected_in_decimal_mode(session, line):
+	output, errors = session.run('mode decimal', line)
+	assert output == ['decimal']
+	assert errors == ['Error 0: complex numbers are not supported in decimal mode']
+
+
+@pytest.mark.parametrize('command', ['mode decimal', 'precision 40'])
+def test_switch_to_decimal_mode_with_a_complex_variable_is_refused(session, command):
+	session.run('q = 3 + 2i')
+	output, errors = session.run(command, 'mode')
+	assert output == ['float']
+	assert errors == ['Error 0: complex numbers are not supported in decimal mode, \'q\' is complex']
+
+
+def test_decimal_arithmetic_follows_the_precision(session):
+	output, errors = session.run('precision 30', '1 / 3', 'x = 2 ^ 0.5')
+	assert output == ['30 digits', '0.333333333333333333333333333333', '1.41421356237309504880168872421']
+	assert not errors
+
+
+def test_solver_roots_are_correctly_rounded_at_every_precision(session):
+	output, _ = session.run('f(x) = x ^ 2', 'precision 10', 'f(x) = 8 ?', 'precision 11', 'f(x) = 8 ?')
+	assert output[5:7] == ['-2.828427125', '2.828427125']
+	assert output[11:13] == ['-2.8284271247', '2.8284271247']
+	output, errors = session.run('precision 50', 'f(x) = 2 ?', '2 ^ 0.5')
+	assert output[5] == output[6] == '1.4142135623730950488016887242096980785696718753769'
+	assert not errors
+
+
+def test_function_results_follow_a_precision_change(session):
+	session.run('precision 50', 'f(x) = x / 3', 'g(x) = (x + 1/3) ^ 2', 'f(2)', 'g(1)')
+	output, errors = session.run('precision 10', 'f(2)', 'g(1)')
+	assert output == ['10 digits', '0.6666666667', '1.777777777']
+	assert not errors
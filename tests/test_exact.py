@@ -0,0 +1,19 @@
+def test_exact_mode_keeps_rationals(session):
+	output, errors = session.run('mode exact', 'a = 1/3 + 1/6', 'b = 0.1 + 0.2', 'b * 10 - 3')
+	assert output == ['exact', '1/2', '3/10', '0']
+	assert not errors
+
+
+def test_exact_function_calls(session):
+	session.run('mode exact', 'a = 1/2', 'f(x) = x / 3 + a')
+	output, errors = session.run('f(1/2)', 'c = 1/4', 'f(c)')
+	assert output == ['2/3', '1/4', '7/12']
+	assert not errors
+
+
+def test_exact_solver_prints_rational_roots(session):
+	session.run('mode exact', 'g(x) = 6 * x ^ 2 - 5 * x + 1', 'h(x) = 3 * x + 1')
+	output, errors = session.run('g(x) = 0 ?', 'h(x) = 0 ?')
+	assert output[3:5] == ['1/3', '1/2']
+	assert output[-1] == '-1/3'
+	assert not errors
@@ -0,0 +1,48 @@
+import pytest
+
+
+@pytest.mark.parametrize('line', ['x = 1 2', 'y = 3 4 + 1', 'q = a b', '3 4'])
+def test_adjacent_operands_are_a_syntax_error(session, line):
+	output, errors = session.run('a = 1', 'b = 2', line)
+	assert output == ['1', '2']
+	assert errors == ['Error 0: syntax error']
+
+
+def test_spacing_does_not_change_the_value(session):
+	output, errors = session.run('x = 2 *   3 + 1', 'y = 2*3+1')
+	assert output == ['7', '7']
+	assert not errors
+
+
+@pytest.mark.parametrize('line', ['[1..0]', '[0..1 step -1]', '[3..1 step 0.5]'])
+def test_range_going_away_from_its_stop_is_empty(session, line):
+	output, errors = session.run(line)
+	assert output == ['[]']
+	assert not errors
+
+
+def test_reversed_range_with_negative_step(session):
+	output, errors = session.run('[1..0 step -0.5]')
+	assert output == ['[ 1.0 , 0.5 , 0.0 ]']
+	assert not errors
+
+
+def test_constant_function_maps_every_point_of_a_range(session):
+	output, errors = session.run('h(x) = 5', 'h([0..3])')
+	assert output == ['5', '[ 5 , 5 , 5 , 5 ]']
+	assert not errors
+
+
+def test_range_division_by_zero_is_quiet(session, recwarn):
+	output, errors = session.run('g(x) = 1 / x', 'g([0..2])', '1 / [-1..1]')
+	assert output == ['1 / x', '[ inf , 1.0 , 0.5 ]', '[ -1.0 , inf , 1.0 ]']
+	assert not errors
+	assert not recwarn.list
+
+
+def test_nesting_deeper_than_the_parser_limit_is_a_syntax_error(session):
+	deep = '(' * 150 + 'x' + ')' * 150
+	too_deep = '(' * 1000 + 'x' + ')' * 1000
+	output, errors = session.run(f'x = 2 * {deep}', f'y = {too_deep}', f'f(x) = {too_deep}')
+	assert output == ['0']
+	assert errors == ['Error 0: syntax error', 'Error 1: syntax error']
@@ -0,0 +1,54 @@
+def test_variables_show_functions_with_current_values(session):
+	session.run('a = 2', 'f(x) = x * a', 'a = 5')
+	output, errors = session.run('f(3)', 'variables')
+	assert output == ['15', 'a-> 5', 'f-> 5 * x']
+	assert not errors
+
+
+def test_function_definition_prints_expanded_polynomial(session):
+	output, errors = session.run('f(x) = (x + 1) * (x - 1)')
+	assert output == ['x ^ 2 - 1']
+	assert not errors
+
+
+def test_float_arguments_do_not_cancel_in_expanded_polynomials(session):
+	session.run('p(x) = (x + 1) ^ 40 * (x - 2) ^ 30', 'q(x) = (x - 1) ^ 20', 't = 2.01')
+	output, errors = session.run('p(t)', 'q(t)', 'q(3)', 'a = 1/3', 'q(a)')
+	assert abs(float(output[0]) / 1.3888643287891e-41 - 1) < 1e-9
+	assert abs(float(output[1]) - 1.22019003995) < 1e-10
+	assert output[2] == '1048576'
+	assert not errors
+
+
+def test_function_with_a_long_body_compiles(session):
+	body = ' + '.join(f'{k} / (x + {k})' for k in range(1, 3001))
+	session.run(f'f(x) = {body}', 'y = 1')
+	output, errors = session.run('f(y)')
+	assert output == [str(sum(k / (1 + k) for k in range(1, 3001)))]
+	assert not errors
+
+
+def test_function_is_compiled_once_and_recompiled_when_a_variable_it_reads_changes(session):
+	session.run('a = 2', 'b = 3', 'f(x) = x * a + 1')
+	functions = session.interpreter.functions
+	compiled = functions.resolve('f')
+	session.run('b = 4', 'f(1)')
+	assert functions.resolve('f') is compiled
+	output, errors = session.run('a = 5', 'f(1)')
+	assert functions.resolve('f') is not compiled
+	assert output == ['5', '6']
+	assert not errors
+
+
+def test_caller_follows_a_redefined_callee(session):
+	session.run('f(x) = x * 2', 'g(x) = f(x) + 1', 'y = 3')
+	output, errors = session.run('g(y)', 'f(x) = x * 3', 'g(y)')
+	assert output == ['7', '3 * x', '10']
+	assert not errors
+
+
+def test_function_reads_variables_by_value_not_by_text(session):
+	session.run('ab = 10', 'a = 1', 'b = 2', 'f(x) = ab + a * b + x')
+	output, errors = session.run('f(a)', 'b = 1/3', 'f(b)')
+	assert output == ['13', '0.3333333333333333', str(10 + 1 / 3 + 1 / 3)]
+	assert not errors
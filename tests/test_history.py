@@ -0,0 +1,79 @@
+import builtins
+import pytest
+
+import computorv2
+import run
+from computorv2 import Interpreter
+from history import History
+
+
+def test_the_ring_keeps_the_latest_entries_and_their_numbers():
+	history = History(capacity=3)
+	assert history.items() == []
+	for line in ['a = 1', 'b = 2', 'c = 3', 'd = 4']:
+		history.append(line)
+	assert history.items() == [(1, 'b = 2'), (2, 'c = 3'), (3, 'd = 4')]
+	assert history.get(0) is None and history.get(3) == 'd = 4' and history.get(4) is None
+	history.append('e = 5')
+	assert history.get(1) is None and history.get(4) == 'e = 5'
+	assert history.search('= 2') == []
+
+
+def test_entries_are_saved_in_batches_and_reloaded(tmp_path):
+	path = tmp_path / 'history'
+	history = History(str(path), batch=2)
+	history.append('a = 1')
+	assert not path.exists()
+	history.append('b = 2')
+	history.append('c = 3')
+	assert path.read_text() == 'a = 1\nb = 2\n'
+	history.close()
+	assert path.read_text() == 'a = 1\nb = 2\nc = 3\n'
+	reloaded = History(str(path))
+	reloaded.append('d = 4')
+	assert reloaded.items() == [(0, 'a = 1'), (1, 'b = 2'), (2, 'c = 3'), (3, 'd = 4')]
+
+
+def test_a_long_log_is_read_from_its_tail_and_compacted(tmp_path):
+	path = tmp_path / 'history'
+	path.write_text(''.join(f'x = {number}\n' for number in range(100)))
+	history = History(str(path), capacity=10)
+	assert history.items() == [(number - 90, f'x = {number}') for number in range(90, 100)]
+	assert path.read_text() == ''.join(f'x = {number}\n' for number in range(90, 100))
+
+
+def test_search_and_prefix_lookup():
+	history = History()
+	for line in ['f(x) = x ^ 2', 'a = 2', 'F(2) = ?', 'fa = 3', 'g(x) = 2 * x']:
+		history.append(line)
+	assert history.search('f(') == [(0, 'f(x) = x ^ 2'), (2, 'F(2) = ?')]
+	assert history.search('(x) =') == [(0, 'f(x) = x ^ 2'), (4, 'g(x) = 2 * x')]
+	assert history.search('h(') == []
+	assert history.latest('f') == 'fa = 3'
+	assert history.latest('f(') == 'f(x) = x ^ 2'
+	assert history.latest('z') is None
+
+
+def test_history_commands_in_the_interactive_loop(monkeypatch, capsys):
+	monkeypatch.setattr(computorv2, 'default', Interpreter())
+	lines = iter(['a = 2', 'b = a * 3', 'history', '!0', 'history /b', '!b', '!9', '!c'])
+
+	def read(prompt: str) -> str:
+		try:
+			return next(lines)
+		except StopIteration:
+			raise EOFError
+	monkeypatch.setattr(builtins, 'input', read)
+	history = History()
+	with pytest.raises(SystemExit):
+		run.main(history)
+	output = capsys.readouterr()
+	assert output.out.splitlines()[2:] == [
+		'   2', '   6',
+		'   0-> a = 2', '   1-> b = a * 3',
+		'   a = 2', '   2',
+		'   1-> b = a * 3',
+		'   b = a * 3', '   6',
+	]
+	assert output.err.splitlines() == ['   Error 0: no history entry \'9\'', '   Error 1: no history entry \'c\'']
+	assert history.items() == [(0, 'a = 2'), (1, 'b = a * 3'), (2, 'a = 2'), (3, 'b = a * 3')]
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import Session
+
+
+def script(index: int) -> list[str]:
+	return [
+		f'a = {index}',
+		'b = a * 2 + 1',
+		'f(x) = x ^ 2 - (a + 2) * x + 2 * a',
+		'f(x) = 0 ?',
+		'f(b) = ?',
+		'm = [[a, 1];[0, b]]',
+		'n = m ** m',
+		f'z = {index} + 2i',
+		'z * z = ?',
+		'c = (2',
+		'variables',
+	]
+
+
+def test_sessions_in_threads_do_not_share_state():
+	barrier = threading.Barrier(8)
+
+	def run(index: int, wait: bool = True) -> tuple[list[str], list[str]]:
+		session = Session()
+		if wait:
+			barrier.wait()
+		return session.run(*script(index) * 20)
+
+	expected = [run(index, False) for index in range(16)]
+	with ThreadPoolExecutor(8) as pool:
+		assert list(pool.map(run, range(16))) == expected
+	assert expected[3][0][:2] == ['3', '7'] and expected[3][1][-1] == 'Error 19: syntax error'
+	assert expected[3] != expected[4]
+
+
+def test_errors_are_numbered_per_session(session):
+	other = Session()
+	assert session.run('a = (', 'b = (')[1] == ['Error 0: syntax error', 'Error 1: syntax error']
+	assert other.run('a = (')[1] == ['Error 0: syntax error']
+	assert session.run('c = 1', 'c = ?')[0] == ['1', '1']
+	assert other.run('c = ?')[0] == ['0']
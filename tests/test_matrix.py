@@ -0,0 +1,57 @@
+import warnings
+from matrix import make_matrix
+
+
+def test_export_reports_evaluation_errors_as_value_errors(session, tmp_path):
+	path = tmp_path / 'out.npy'
+	output, errors = session.run('a = [[1,2];[3,4]]', 'r = [[1,2,3]]', f'export a ** r {path}')
+	assert errors == ['Error 0: value error']
+	assert not path.exists()
+
+
+def test_export_and_import_round_trip(session, tmp_path):
+	path = tmp_path / 'out.npy'
+	output, errors = session.run('a = [[1,2];[3,4]]', f'export a {path}', f'import m {path}', 'm')
+	assert output[-2:] == ['[ 1 , 2 ]', '[ 3 , 4 ]']
+	assert not errors
+
+
+def test_import_of_a_missing_file_cannot_map_it(session, tmp_path):
+	path = tmp_path / 'missing.npy'
+	output, errors = session.run(f'import m {path}')
+	assert errors == [f'Error 0: cannot map file \'{path}\'']
+
+
+def test_matrix_division_by_zero_gives_inf_without_warnings():
+	matrix = make_matrix([[1, 0], [-2, 3]])
+	with warnings.catch_warnings():
+		warnings.simplefilter('error')
+		assert str(matrix / 0) == '[ inf , nan ]\n[ -inf , inf ]'
+		assert str(1 / matrix) == '[ 1.0 , inf ]\n[ -0.5 , 0.3333333333333333 ]'
+
+
+def test_double_star_is_the_matrix_product_and_star_is_term_by_term(session):
+	session.run('a = [[1,2];[3,4]]', 'b = [[0.5,1];[1,0]]')
+	output, errors = session.run('a ** b', 'a * b', '[[1,2]] ** a')
+	assert output == ['[ 2.5 , 1.0 ]', '[ 5.5 , 3.0 ]', '[ 0.5 , 2.0 ]', '[ 3.0 , 0.0 ]', '[ 7 , 10 ]']
+	assert not errors
+
+
+def test_matrix_addition_subtraction_and_scaling(session):
+	session.run('a = [[1,2];[3,4]]')
+	output, errors = session.run('a + a', 'a - [[1,1];[1,1]]', '2 * a', 'a / 2')
+	assert output == ['[ 2 , 4 ]', '[ 6 , 8 ]', '[ 0 , 1 ]', '[ 2 , 3 ]', '[ 2 , 4 ]', '[ 6 , 8 ]', '[ 0.5 , 1.0 ]', '[ 1.5 , 2.0 ]']
+	assert not errors
+
+
+def test_complex_matrix_product(session):
+	output, errors = session.run('z = [[1 + i, 2];[0, i]]', 'z ** z')
+	assert output[2:] == ['[ 2i , 2 + 4i ]', '[ 0 , -1 ]']
+	assert not errors
+
+
+def test_mismatched_matrix_dimensions_are_a_value_error(session):
+	session.run('a = [[1,2];[3,4]]', 'c = [[1,2,3]]')
+	output, errors = session.run('a ** c', 'a + c')
+	assert not output
+	assert errors == ['Error 0: value error', 'Error 1: value error']
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import Session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_profiling_counts_only_the_lines_of_its_own_session(session):
+	other = Session()
+	session.run('profile on')
+	session.run('a = 2', 'b = a * 3')
+	other.run('c = 4', 'd = c * 5')
+	assert session.interpreter.profiler.lines == 2
+	assert session.interpreter.profiler.calls['evaluate'] == 2
+	assert other.interpreter.profiler.lines == 0
+	assert other.interpreter.profiler.calls['evaluate'] == 0
+
+
+def test_time_reports_the_stages_of_one_line(session):
+	output, errors = session.run('a = 2', 'time b = a * 3 + 1')
+	assert errors == []
+	assert output[0] == '2'
+	assert output[1] == '7'
+	assert output[2].startswith('time: ') and 'parse' in output[2] and 'evaluate' in output[2]
+	assert session.run('b = ?')[0] == ['7']
+	assert session.interpreter.profiler.lines == 0
+
+
+def test_profile_summarises_resets_and_stops(session):
+	session.run('profile on', 'a = 2', 'b = [[1, 2]; [3, 4]] * [[1, 0]; [0, 1]]')
+	output, _ = session.run('profile')
+	assert output[0].split() == ['stage', 'calls', 'total', 'ms', 'avg', 'us', 'share']
+	rows = {line.split()[0]: int(line.split()[1]) for line in output[1:-1]}
+	assert rows['evaluate'] == 2 and rows['matrix'] >= 1 and rows['format'] == 2
+	assert output[-1].startswith('2 lines in ')
+	assert session.run('profile reset')[0] == ['profile on']
+	assert session.interpreter.profiler.lines == 0
+	session.run('profile off')
+	lines = session.interpreter.profiler.lines
+	assert session.run('c = 3')[0] == ['3']
+	assert session.interpreter.profiler.lines == lines
+	assert session.run('profile sometimes')[1][0].endswith('use \'profile on\', \'profile off\' or \'profile reset\'')
+
+
+def test_environment_flag_reports_at_exit(tmp_path):
+	script = tmp_path / 'script.txt'
+	script.write_text('a = 2\nb = a * 3\n')
+	path = tmp_path / 'profile.json'
+	environment = dict(os.environ, COMPUTORV2_PROFILE='1', COMPUTORV2_PROFILE_JSON=str(path))
+	result = subprocess.run([sys.executable, 'run.py', '-f', str(script)], cwd=ROOT, env=environment, capture_output=True, text=True, timeout=60)
+	assert result.stdout.split() == ['2', '6']
+	assert result.stderr.startswith('profile summary:\n')
+	report = json.loads(path.read_text())
+	assert report['lines'] == 2
+	assert report['stages']['evaluate']['calls'] == 2
+	environment['COMPUTORV2_PROFILE'] = '0'
+	path.unlink()
+	result = subprocess.run([sys.executable, 'run.py', '-f', str(script)], cwd=ROOT, env=environment, capture_output=True, text=True, timeout=60)
+	assert result.stderr == '' and not path.exists()
@@ -0,0 +1,19 @@
+def test_variable_follows_a_chain_of_function_calls(session):
+	session.run('reactive on', 'b = 1', 'g(x) = x + b', 'f(x) = g(x) * 2', 'd = f(1)')
+	output, errors = session.run('b = 10', 'd', 'f(1)')
+	assert output == ['10', '22', '22']
+	output, errors = session.run('g(x) = x * 100', 'd')
+	assert output == ['100 * x', '200']
+	assert not errors
+
+
+def test_mutually_calling_functions_are_circular(session):
+	output, errors = session.run('reactive on', 'h(x) = k(x)', 'k(x) = h(x)')
+	assert errors == ['Error 0: circular dependency on \'k\'']
+
+
+def test_reactive_off_keeps_values(session):
+	session.run('reactive on', 'b = 1', 'a = b + 1', 'reactive off')
+	output, errors = session.run('b = 5', 'a')
+	assert output == ['5', '2']
+	assert not errors
@@ -0,0 +1,27 @@
+import warnings
+
+
+def test_roots_skip_a_pole_hit_by_the_refinement(session):
+	output, errors = session.run('g(x) = x / (x - 0.5)', 'roots g -1 1 100')
+	assert output[1:] == ['x = 7.703719777548943e-34']
+	assert not errors
+
+
+def test_roots_and_extrema_of_a_function_with_a_pole_on_the_grid(session):
+	with warnings.catch_warnings():
+		warnings.simplefilter('error')
+		output, errors = session.run('k(x) = 1/x', 'roots k -1 1 101', 'extrema k -1 1 101', 'table k -1 1 3')
+	assert output[1:] == ['no roots between -1 and 1', 'no extrema between -1 and 1', 'k(-1) = -1', 'k(0) = inf', 'k(1) = 1']
+	assert not errors
+
+
+def test_extrema_of_a_polynomial_are_exact_in_decimal_mode(session):
+	output, errors = session.run('mode decimal', 'h(x) = x^3 - 3*x', 'extrema h -2 2 100')
+	assert output[2:] == ['maximum: h(-1) = 2', 'minimum: h(1) = -2']
+	assert not errors
+
+
+def test_roots_of_a_polynomial(session):
+	output, errors = session.run('p(x) = x^2 - 2', 'roots p 0 2')
+	assert output[1:] == ['x = 1.4142135623730951']
+	assert not errors
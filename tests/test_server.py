@@ -0,0 +1,93 @@
+import asyncio
+import os
+import signal
+import pytest
+import server
+
+
+def test_a_dead_worker_is_restarted_once_for_all_its_clients(monkeypatch):
+	pool = server.Server(1)
+	try:
+		starts = []
+		start_worker = server.Server.start_worker
+		monkeypatch.setattr(server.Server, 'start_worker', staticmethod(lambda: starts.append(1) or start_worker()))
+		broken = pool.executors[0]
+		for process in list(broken._processes.values()):
+			os.kill(process.pid, signal.SIGKILL)
+
+		async def clients():
+			return await asyncio.gather(pool.run(0, 1, ['a = 1']), pool.run(0, 2, ['b = 2']))
+		responses = asyncio.run(clients())
+		assert responses == [['   Error: the worker stopped, the session was reset\n']] * 2
+		assert len(starts) == 1
+		assert pool.executors[0] is not broken
+		assert asyncio.run(pool.run(0, 1, ['c = 3'])) == ['   3\n']
+	finally:
+		pool.shutdown()
+
+
+async def responses(reader: asyncio.StreamReader, count: int) -> list[list[str]]:
+	framed: list[list[str]] = []
+	lines: list[str] = []
+	while len(framed) < count:
+		line = (await reader.readline()).decode().rstrip('\n')
+		if line == '.':
+			framed.append(lines)
+			lines = []
+		else:
+			lines.append(line[1:] if line.startswith('..') else line)
+	return framed
+
+
+def serve(workers: int, clients) -> list:
+	async def main():
+		pool = server.Server(workers)
+		listener = await asyncio.start_server(pool.handle, '127.0.0.1', 0, limit=server.MAX_LINE)
+		port = listener.sockets[0].getsockname()[1]
+		try:
+			return await asyncio.gather(*(client(port) for client in clients))
+		finally:
+			listener.close()
+			await listener.wait_closed()
+			pool.shutdown()
+	return asyncio.run(main())
+
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_pipelined_lines_are_answered_in_order_in_separate_sessions(workers):
+	async def client(port: int, value: int) -> list[list[str]]:
+		reader, writer = await asyncio.open_connection('127.0.0.1', port)
+		lines = [f'a = {value}', 'b = a * 2', '', 'b = ?', 'c = (2', 'f(x) = x ^ 2', 'f(a) = ?']
+		writer.write(''.join(f'{line}\n' for line in lines).encode())
+		await writer.drain()
+		framed = await responses(reader, len(lines))
+		writer.write(b'exit\n')
+		assert await reader.read() == b''
+		writer.close()
+		return framed
+
+	first, second = serve(workers, [lambda port: client(port, 3), lambda port: client(port, 5)])
+	assert first == [['   3'], ['   6'], [], ['   6'], ['   Error 0: syntax error'], ['   x ^ 2'], ['   9']]
+	assert second[:2] == [['   5'], ['   10']] and second[-1] == ['   25']
+
+
+def test_restricted_commands_and_long_lines_are_refused():
+	async def client(port: int) -> list[list[str]]:
+		reader, writer = await asyncio.open_connection('127.0.0.1', port)
+		writer.write(b'save /tmp/session.json\nprofile on\na = 1\n')
+		writer.write(b'b = ' + b'1' * server.MAX_LINE + b'\n')
+		await writer.drain()
+		framed = await responses(reader, 4)
+		writer.close()
+		return framed
+
+	[framed] = serve(0, [client])
+	assert framed[0] == ['   Error 0: \'save\' is not available on the server']
+	assert framed[1] == ['   Error 1: \'profile\' is not available on the server']
+	assert framed[2] == ['   1']
+	assert framed[3] == [f'   Error: line longer than {server.MAX_LINE} bytes']
+
+
+def test_lines_starting_with_a_dot_are_escaped():
+	assert server.frame('.5\nx\n') == b'..5\nx\n.\n'
+	assert server.frame('') == b'.\n'
@@ -0,0 +1,44 @@
+import struct
+import pytest
+import session as snapshots
+
+
+def test_save_and_load_round_trip(session, tmp_path):
+	path = tmp_path / 'session.bin'
+	session.run('mode exact', 'a = 1/3', 'f(x) = x ^ 2 + a', 'reactive on', 'b = a * 3', f'save {path}')
+	restored = type(session)()
+	restored.run(f'load {path}')
+	output, errors = restored.run('a + b', 'f(3)', 'mode', 'reactive', 'a = 1', 'b')
+	assert output == ['4/3', '28/3', 'exact', 'reactive on', '1', '3']
+	assert not errors
+
+
+def test_float_matrix_round_trip(session, tmp_path):
+	path = tmp_path / 'session.bin'
+	session.run('m = [[1.5,2];[3,4]]', f'save {path}')
+	restored = type(session)()
+	restored.run(f'load {path}')
+	output, errors = restored.run('m')
+	assert output == ['[ 1.5 , 2.0 ]', '[ 3.0 , 4.0 ]']
+	assert not errors
+
+
+def test_decimal_precision_round_trip(session, tmp_path):
+	path = tmp_path / 'session.bin'
+	session.run('precision 40', 'a = 1 / 7', f'save {path}')
+	restored = type(session)()
+	restored.run(f'load {path}')
+	output, errors = restored.run('precision', 'a')
+	assert output == ['40 digits', '0.1428571428571428571428571428571428571429']
+	assert not errors
+
+
+def test_other_format_versions_are_rejected(session, tmp_path):
+	path = tmp_path / 'session.bin'
+	session.run('a = 1', f'save {path}')
+	data = bytearray(path.read_bytes())
+	magic, version, offset = snapshots.HEADER.unpack_from(data)
+	snapshots.HEADER.pack_into(data, 0, magic, version - 1, offset)
+	path.write_bytes(bytes(data))
+	with pytest.raises(ValueError):
+		snapshots.load_session(str(path))
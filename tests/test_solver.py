@@ -0,0 +1,38 @@
+import numpy
+from computorv1 import polynomial_roots, solve_equations
+
+
+def test_cubic_with_complex_roots_keeps_the_session_running(session):
+	output, errors = session.run('f(x) = x ^ 3 - 1', 'f(x) = 0 ?', 'a = 2')
+	assert output[2:] == ['Polynomial degree: 3', 'The 3 solutions, with multiplicity, are:', '-0.5 - 0.866025i', '-0.5 + 0.866025i', '1', '2']
+	assert not errors
+
+
+def test_quintic_with_integer_roots(session):
+	output, errors = session.run('g(x) = x ^ 5 - 15 * x ^ 4 + 85 * x ^ 3 - 225 * x ^ 2 + 274 * x - 120', 'g(x) = 0 ?')
+	assert output[-5:] == ['1', '2', '3', '4', '5']
+	assert not errors
+
+
+def test_roots_of_a_degree_50_polynomial():
+	roots = polynomial_roots({50: 1.0, 0: -1.0})
+	assert len(roots) == 50
+	assert numpy.allclose(roots ** 50, 1)
+
+
+def test_solve_equations_groups_degrees_and_keeps_input_order():
+	equations = ['1 * X^0 - 2 * X^1 = 0', '2 * X^0 - 3 * X^1 + 1 * X^2 = 0', '4 * X^0 = 4 * X^0', '-6 * X^0 + 11 * X^1 - 6 * X^2 + 1 * X^3 = 0', '3 * X^0 = 0']
+	solutions = list(solve_equations(equations, chunk_size=2))
+	assert [solution.index for solution in solutions] == [0, 1, 2, 3, 4]
+	assert [solution.degree for solution in solutions] == [1, 2, 0, 3, 0]
+	assert numpy.allclose(solutions[0].roots, [0.5])
+	assert numpy.allclose(sorted(solutions[1].roots.real), [1, 2])
+	assert solutions[2].every_number and not solutions[4].every_number
+	assert numpy.allclose(sorted(solutions[3].roots.real), [1, 2, 3])
+
+
+def test_solve_equations_from_a_coefficient_matrix():
+	matrix = numpy.array([[-1.0, 0.0, 1.0], [1.0, 0.0, 1.0]])
+	solutions = list(solve_equations(matrix))
+	assert numpy.allclose(sorted(solutions[0].roots.real), [-1, 1])
+	assert numpy.allclose(sorted(solutions[1].roots, key=lambda root: root.imag), [-1j, 1j])
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+from utils import lazy_import
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['batch', 'computorv1', 'numpy', 'sampling', 'session']
+# runs a script through run.py and prints the heavy modules it loaded
+PROBE = (
+	'import sys, runpy\n'
+	'sys.argv = ["run.py", "-f", sys.argv[1]]\n'
+	'runpy.run_path("run.py", run_name="__main__")\n'
+	f'print(" ".join(name for name in {HEAVY_MODULES!r} if name in sys.modules), file=sys.stderr)\n'
+)
+
+
+def launch(tmp_path, *lines: str) -> tuple[list[str], list[str]]:
+	script = tmp_path / 'script.txt'
+	script.write_text(''.join(f'{line}\n' for line in lines))
+	result = subprocess.run([sys.executable, '-c', PROBE, str(script)], cwd=ROOT, capture_output=True, text=True, timeout=60)
+	assert result.returncode == 0
+	return result.stdout.split(), result.stderr.split()
+
+
+def test_scalar_scripts_load_no_heavy_module(tmp_path):
+	output, modules = launch(tmp_path, 'a = 2', 'b = a * 3 + 1', 'f(x) = x ^ 2 + b', 'c = f(4)', 'b / 2 = ?')
+	assert output == ['2', '7', 'x', '^', '2', '+', '7', '23', '3.5']
+	assert modules == []
+
+
+def test_heavy_modules_load_on_first_use(tmp_path):
+	output, modules = launch(tmp_path, 'a = 2', 'm = [[1,2];[3,4]]', 'm ** m')
+	assert output[-5:] == ['[', '15', ',', '22', ']']
+	assert modules == ['numpy']
+	output, modules = launch(tmp_path, 'f(x) = x ^ 2 - 2 * x + 1', 'f(x) = 0 ?')
+	assert 'computorv1' in modules and 'numpy' not in modules
+
+
+def test_lazy_import_defers_the_module_until_an_attribute_is_used():
+	name = 'colorsys'
+	sys.modules.pop(name, None)
+	module = lazy_import(name)
+	assert name not in sys.modules
+	assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+	assert name in sys.modules
+	assert lazy_import(name) is sys.modules[name]
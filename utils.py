@@ -1,36 +1,36 @@
-from typing import KeysView
-
-def is_integer(string: str) -> bool:
+import importlib
+import sys
+from decimal import Decimal
+from fractions import Fraction
+from math import isqrt
+from types import ModuleType
+from typing import Any, KeysView
+
+class LazyModule(ModuleType):
 	"""
-		Checks if the given string can be converted to an integer.
-
-		Args:
-			string (str): The string to be checked for integer conversion.
-
-		Returns:
-			bool: `True` if the string can be converted to an integer, `False` otherwise.
+		Stands for a module that is only imported when one of its attributes is first
+		used. The first lookup goes through the import system, whose locks make a first
+		use from several threads at once safe, then copies the attributes of the module
+		onto the stand-in so later lookups are plain attribute reads.
 	"""
-	try:
-		int(string)
-		return True
-	except ValueError:
-		return False
 
-def is_float(string: str) -> bool:
+	def __getattr__(self, attribute: str) -> Any:
+		module: ModuleType = importlib.import_module(self.__name__)
+		self.__dict__.update(vars(module))
+		return getattr(module, attribute)
+
+def lazy_import(name: str) -> ModuleType:
 	"""
-		Checks if the given string can be converted to a float.
+		Returns a module that is only executed when one of its attributes is first used,
+		so heavy dependencies like numpy cost nothing to sessions that never need them.
 
 		Args:
-			string (str): The string to be checked for float conversion.
+			name (str): The absolute name of the module.
 
 		Returns:
-			bool: `True` if the string can be converted to a float, `False` otherwise.
+			(ModuleType): The module itself if it was imported before, otherwise a stand-in for it.
 	"""
-	try:
-		float(string)
-		return True
-	except ValueError:
-		return False
+	return sys.modules.get(name) or LazyModule(name)
 
 def absolute(num: float) -> float:
 	"""
@@ -45,18 +45,101 @@ def absolute(num: float) -> float:
 	abs_num: float = num if num >= 0 else -num
 	return abs_num
 
-def square_root(num: float) -> float:
+def square_root(num: float | Decimal) -> float | Decimal:
 	"""
-		Returns the square root of a given number.
+		Returns the square root of a given number. A Decimal is rooted to the
+		precision of the current decimal context by decimal_square_root.
 
 		Args:
-			num (float): The number to find the square root of.
+			num (float | Decimal): The number to find the square root of.
 
 		Returns:
-			num (float): The square root of num.
+			num (float | Decimal): The square root of num.
 	"""
+	if isinstance(num, Decimal):
+		return decimal_square_root(num)
 	return num ** 0.5
 
+def decimal_square_root(num: Decimal) -> Decimal:
+	"""
+		Returns the square root of a non-negative Decimal, correctly rounded to the
+		precision of the current decimal context.
+
+		Args:
+			num (Decimal): The number to find the square root of.
+
+		Returns:
+			Decimal: The square root of num.
+
+		Raises:
+			ValueError: If num is negative or not finite.
+	"""
+	if num < 0 or not num.is_finite():
+		raise ValueError('square root of a negative or infinite number')
+	return num.sqrt()
+
+def exact_square_root(num: Fraction) -> Fraction | float:
+	"""
+		Returns the square root of a non-negative rational, exactly when it is a perfect square.
+
+		Args:
+			num (Fraction): The number to find the square root of.
+
+		Returns:
+			Fraction | float: The exact root if numerator and denominator are perfect squares, the float root otherwise.
+	"""
+	numerator: int = isqrt(num.numerator)
+	denominator: int = isqrt(num.denominator)
+	if numerator * numerator == num.numerator and denominator * denominator == num.denominator:
+		return Fraction(numerator, denominator)
+	return square_root(float(num))
+
+def simplify_number(num: int | float | Fraction | Decimal) -> int | float | Fraction | Decimal:
+	"""
+		Returns a whole number as an int, other numbers unchanged.
+
+		Args:
+			num (int | float | Fraction | Decimal): The number to simplify.
+
+		Returns:
+			int | float | Fraction | Decimal: The int value of num if it is whole, num otherwise.
+	"""
+	if isinstance(num, Fraction):
+		return num.numerator if num.denominator == 1 else num
+	if isinstance(num, Decimal):
+		return int(num) if num.is_finite() and num == num.to_integral_value() else num
+	return int(num) if float(num).is_integer() else num
+
+def format_real(num: float) -> str:
+	"""
+		Formats a real number in its shortest exact form, without a trailing '.0'.
+
+		Args:
+			num (float): The number to format, a Python or NumPy float.
+
+		Returns:
+			str: The number, such as '2', '-0.5' or '1e+20'.
+	"""
+	text: str = repr(float(num) + 0.0)
+	return text[:-2] if text.endswith('.0') else text
+
+def format_complex(num: complex) -> str:
+	"""
+		Formats a complex number with 'i' as the imaginary unit, leaving out a zero part.
+
+		Args:
+			num (complex): The number to format.
+
+		Returns:
+			str: The number, such as '3 - 2.5i', '-i' or '4'.
+	"""
+	if num.imag == 0:
+		return format_real(num.real)
+	imaginary: str = 'i' if abs(num.imag) == 1 else f'{format_real(abs(num.imag))}i'
+	if num.real == 0:
+		return imaginary if num.imag > 0 else f'-{imaginary}'
+	return f'{format_real(num.real)} {"+" if num.imag > 0 else "-"} {imaginary}'
+
 def max_key(keys: KeysView[int]) -> int:
 	"""
 		Returns the max integer key